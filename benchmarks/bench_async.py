@@ -0,0 +1,63 @@
+"""Сравнение пропускной способности синхронного и asyncio-опроса.
+
+Запуск: python -m benchmarks.bench_async [подписчиков] [задержка, мс]
+Оба режима опрашивают локальную заглушку API с одинаковой задержкой.
+"""
+import asyncio
+import logging
+import sys
+import time
+
+import homework
+from benchmarks.stub_server import StubServer
+from bot.aio import AsyncClient, AsyncPollScheduler
+from bot.subscriptions import Subscriber
+
+
+def make_subscribers(count):
+    return [
+        Subscriber(index, f'token-{index}', index, current_timestamp=1)
+        for index in range(count)
+    ]
+
+
+def bench_sync(endpoint, subscribers):
+    started = time.perf_counter()
+    for subscriber in subscribers:
+        homework.fetch_homework_statuses(
+            endpoint, subscriber.current_timestamp,
+            subscriber.practicum_token)
+    return len(subscribers) / (time.perf_counter() - started)
+
+
+async def bench_async(endpoint, subscribers, concurrency):
+    async with AsyncClient('telegram-token') as client:
+        scheduler = AsyncPollScheduler(
+            subscribers, homework.RETRY_TIME,
+            poll=lambda subscriber: client.get_api_answer(
+                endpoint, subscriber.current_timestamp,
+                subscriber.practicum_token),
+            concurrency=concurrency)
+        started = time.perf_counter()
+        await scheduler.run_once()
+        return len(subscribers) / (time.perf_counter() - started)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 20) / 1000
+    logging.disable(logging.CRITICAL)
+    subscribers = make_subscribers(count)
+    with StubServer(latency=latency) as server:
+        sync_rate = bench_sync(server.endpoint, subscribers)
+        print(f'sync:               {sync_rate:8.1f} опросов/с')
+        for concurrency in (10, 50):
+            async_rate = asyncio.run(
+                bench_async(server.endpoint, subscribers, concurrency))
+            print(
+                f'asyncio, limit={concurrency:<3}: {async_rate:8.1f} '
+                f'опросов/с (x{async_rate / sync_rate:.1f})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""Всплеск одинаковых запросов к API с объединением и без него.
+
+Запуск: python -m benchmarks.bench_coalesce [вызовов] [задержка, мс]
+Все вызовы идут одновременно из разных потоков с одним токеном и
+from_date к локальной заглушке API.
+"""
+import logging
+import sys
+import threading
+import time
+
+import homework
+from benchmarks.stub_server import StubServer
+from bot.coalesce import Coalescer
+
+
+def burst(function, callers):
+    barrier = threading.Barrier(callers)
+
+    def call():
+        barrier.wait()
+        function()
+
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started
+
+
+def main():
+    callers = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    latency = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.1
+    logging.disable(logging.CRITICAL)
+    with StubServer(latency=latency) as server:
+        elapsed = burst(
+            lambda: homework.request_homework_statuses(
+                server.endpoint, 1, 'token'), callers)
+        direct = server.requests['get']
+        print(
+            f'Без объединения: запросов к API {direct}, {elapsed:.3f} с')
+        homework.coalescer = Coalescer(ttl=5)
+        elapsed = burst(
+            lambda: homework.fetch_homework_statuses(
+                server.endpoint, 1, 'token'), callers)
+        stats = homework.coalescer.stats
+        print(
+            f'С объединением: запросов к API {server.requests["get"] - direct}'
+            f', {elapsed:.3f} с; общих ответов: {stats["shared"]}, '
+            f'из кеша: {stats["cached"]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Рассылка одного статуса во много чатов через заглушку Telegram.
+
+Запуск: python -m benchmarks.bench_fanout [чатов] [задержка, мс]
+Лимит Telegram (30 сообщений в секунду) в замерах снят, чтобы мерить
+сам механизм рассылки; с лимитом 10 000 чатов займут 10 000 / 30 с.
+"""
+import asyncio
+import logging
+import sys
+import time
+
+import telegram
+from telegram.utils.request import Request
+
+from benchmarks.stub_server import StubServer
+from bot.aio import AsyncClient
+from bot.fanout import SENT, FanOut
+
+TEXT = 'Изменился статус проверки работы "hw1". Работа проверена.'
+
+
+def report(name, results, elapsed):
+    sent = sum(delivery.status == SENT for delivery in results.values())
+    print(
+        f'{name}: {elapsed:.2f} с, {len(results) / elapsed:,.0f} чатов/с, '
+        f'доставлено {sent} из {len(results)}')
+
+
+def run_threads(server, chats, workers):
+    bot = telegram.Bot(
+        '123:abc', base_url=server.base_url + '/bot',
+        request=Request(con_pool_size=workers))
+    fanout = FanOut(
+        bot.send_message, global_rate=0, per_chat_interval=0,
+        workers=workers)
+    started = time.perf_counter()
+    results = fanout.broadcast(chats, TEXT)
+    elapsed = time.perf_counter() - started
+    fanout.close()
+    report(f'потоки, {workers}', results, elapsed)
+
+
+def run_async(server, chats, workers):
+    async def run():
+        async with AsyncClient(
+                'bot-token', telegram_api=server.base_url,
+                limit=workers) as client:
+            fanout = FanOut(
+                client.deliver, global_rate=0, per_chat_interval=0,
+                workers=workers)
+            started = time.perf_counter()
+            results = await fanout.broadcast_async(chats, TEXT)
+            return results, time.perf_counter() - started
+
+    results, elapsed = asyncio.run(run())
+    report(f'asyncio, {workers}', results, elapsed)
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    latency = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.005
+    logging.disable(logging.CRITICAL)
+    chats = list(range(1, total + 1))
+    print(f'Чатов: {total}, ответ заглушки: {latency * 1000:.0f} мс')
+    for workers in (1, 8, 32):
+        with StubServer(latency=latency) as server:
+            run_threads(server, chats, workers)
+        with StubServer(latency=latency) as server:
+            run_async(server, chats, workers)
+    print(
+        f'С лимитом Telegram 30 в секунду: {total / 30:,.0f} с '
+        'при любом числе потоков')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Перцентили времени проверки по корзинам и по всем строкам.
+
+Запуск: python -m benchmarks.bench_history [проверок]
+История пишется во временный файл SQLite; для каждой проверки — два
+перехода, reviewing и вердикт.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+from bot.history import TransitionStore
+
+FRACTIONS = (0.5, 0.9, 0.99)
+CHUNK = 10000
+
+
+def fill(store, count):
+    generator = random.Random(1)
+    for start in range(0, count, CHUNK):
+        transitions = []
+        for number in range(start, min(start + CHUNK, count)):
+            started = number * 10.0
+            verdict = 'approved' if number % 3 else 'rejected'
+            transitions.append(('s', f'hw{number}', 'reviewing', started))
+            transitions.append((
+                's', f'hw{number}', verdict,
+                started + generator.lognormvariate(10, 1)))
+        store.record_many(transitions)
+
+
+def timed(function):
+    started = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - started
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    with tempfile.TemporaryDirectory() as directory:
+        store = TransitionStore(os.path.join(directory, 'history.db'))
+        _, elapsed = timed(lambda: fill(store, count))
+        print(
+            f'Проверок: {count}, запись: {count * 2 / elapsed:,.0f} '
+            'переходов в секунду')
+        (_, approximate), bucket_time = timed(
+            lambda: store.percentiles(FRACTIONS, 'approved'))
+        exact, exact_time = timed(lambda: [
+            store.exact_percentile(fraction, 'approved')
+            for fraction in FRACTIONS])
+        _, scan_time = timed(lambda: sorted(
+            row[0] for row in store.connection.execute(
+                "SELECT duration FROM reviews WHERE verdict = 'approved'")))
+        store.close()
+    for fraction, value in zip(FRACTIONS, exact):
+        error = approximate[fraction] / value - 1
+        print(
+            f'p{fraction * 100:g}: {value:,.0f} с, '
+            f'по корзинам {approximate[fraction]:,.0f} с (+{error:.1%})')
+    print(f'По корзинам: {bucket_time * 1000:.2f} мс')
+    print(f'По индексу reviews: {exact_time * 1000:.1f} мс')
+    print(f'Чтение и сортировка всех строк: {scan_time * 1000:.0f} мс')
+
+
+if __name__ == '__main__':
+    main()
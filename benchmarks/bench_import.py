@@ -0,0 +1,90 @@
+"""Время импорта homework по данным python -X importtime.
+
+Запуск: python -m benchmarks.bench_import [запусков]
+Каждый запуск — отдельный процесс во временном каталоге. Выводим
+минимальное время импорта, самые тяжёлые модули и проверяем, что
+тяжёлые зависимости не загружаются при импорте. Если импорт дольше
+IMPORT_BUDGET_MS, код выхода 1.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_BUDGET_MS = 200
+HEAVY = ('telegram', 'requests', 'aiohttp', 'asyncio', 'urllib3')
+PROBE = (
+    'import sys, homework; '
+    'print(",".join(name for name in {heavy!r} '
+    'if name in sys.modules '
+    'and type(sys.modules[name]).__name__ != "_LazyModule"))')
+
+
+def parse_importtime(stderr):
+    """Строки importtime: (модуль, вложенность, своё время, общее), мкс."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), depth, int(own), int(cumulative)))
+    return rows
+
+
+def children(rows, module):
+    """Модули, импортированные непосредственно модулем module.
+
+    importtime печатает вложенные импорты раньше родителя, поэтому идём
+    назад от строки модуля до предыдущего модуля верхнего уровня.
+    """
+    index = max(
+        position for position, row in enumerate(rows)
+        if row[0] == module and row[1] == 0)
+    direct = []
+    for row in reversed(rows[:index]):
+        if row[1] == 0:
+            break
+        if row[1] == 1:
+            direct.append(row)
+    return direct
+
+
+def measure(module='homework'):
+    """Один импорт в чистом процессе: строки importtime и загруженное."""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    with tempfile.TemporaryDirectory() as directory:
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c',
+             PROBE.format(heavy=HEAVY).replace('homework', module)],
+            cwd=directory, env=env, capture_output=True, text=True,
+            check=True)
+        created = os.listdir(directory)
+    rows = parse_importtime(result.stderr)
+    total = next(
+        cumulative for name, _, _, cumulative in reversed(rows)
+        if name == module)
+    loaded = [name for name in result.stdout.strip().split(',') if name]
+    return total, rows, loaded, created
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    results = [measure() for _ in range(runs)]
+    total, rows, loaded, created = min(results, key=lambda item: item[0])
+    print(f'Импорт homework: {total / 1000:.1f} мс (минимум из {runs})')
+    print('Самые тяжёлые модули, с вложенными:')
+    direct = children(rows, 'homework')
+    for name, _, _, cumulative in sorted(
+            direct, key=lambda row: row[3], reverse=True)[:10]:
+        print(f'  {cumulative / 1000:7.1f} мс  {name}')
+    print(f'Тяжёлые зависимости загружены при импорте: {loaded or "нет"}')
+    print(f'Файлы, созданные при импорте: {created or "нет"}')
+    if total / 1000 > IMPORT_BUDGET_MS:
+        print(f'Импорт дольше бюджета {IMPORT_BUDGET_MS} мс')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
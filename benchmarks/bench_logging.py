@@ -0,0 +1,95 @@
+"""Скорость вызовов логгера из цикла опроса до и после очереди.
+
+Запуск: python -m benchmarks.bench_logging [вызовов] [задержка диска, мкс]
+«До» — прежний logging.basicConfig с записью в файл в том же потоке,
+«после» — setup_logging с записью из потока QueueListener. Задержка
+диска имитирует медленную запись (сетевой диск, fsync соседей).
+"""
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from bot.logs import FORMAT, SizeAndTimeRotatingFileHandler, setup_logging
+
+
+def slow_emit(handler_class, delay):
+    if not delay:
+        return handler_class
+
+    class SlowHandler(handler_class):
+        def emit(self, record):
+            time.sleep(delay)
+            super().emit(record)
+    return SlowHandler
+
+
+def hot_loop(logger, calls):
+    worst = 0.0
+    started = time.perf_counter()
+    for index in range(calls):
+        before = time.perf_counter()
+        logger.info(
+            f'Изменений нет для Subscriber(id={index}), проверим API позже',
+            extra={'subscriber': f'{index}:abc'})
+        worst = max(worst, time.perf_counter() - before)
+    return time.perf_counter() - started, worst
+
+
+def reset_root():
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+
+
+def report(title, calls, elapsed, worst, drain=None):
+    line = (
+        f'{title:<14} {calls / elapsed:10,.0f} вызовов/с в цикле, '
+        f'худший вызов {worst * 1000:.2f} мс')
+    if drain is not None:
+        line += f', дозапись очереди {drain:.2f} с'
+    print(line)
+
+
+def bench_before(directory, calls, delay):
+    reset_root()
+    handler = slow_emit(logging.FileHandler, delay)(
+        str(Path(directory) / 'before.log'), mode='w')
+    handler.setFormatter(logging.Formatter(FORMAT))
+    root = logging.getLogger()
+    root.addHandler(handler)
+    root.setLevel(logging.DEBUG)
+    elapsed, worst = hot_loop(logging.getLogger('bench'), calls)
+    report('до', calls, elapsed, worst)
+    reset_root()
+
+
+def bench_after(directory, calls, delay, json_lines):
+    listener = setup_logging(
+        str(Path(directory) / f'after-{json_lines}.log'),
+        json_lines=json_lines)
+    file_handler, console_handler = listener.handlers
+    console_handler.setLevel(logging.CRITICAL)
+    file_handler.__class__ = slow_emit(SizeAndTimeRotatingFileHandler, delay)
+    elapsed, worst = hot_loop(logging.getLogger('bench'), calls)
+    started = time.perf_counter()
+    listener.stop()
+    drain = time.perf_counter() - started
+    reset_root()
+    title = 'после (JSON)' if json_lines else 'после (текст)'
+    report(title, calls, elapsed, worst, drain)
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    delay = (float(sys.argv[2]) if len(sys.argv) > 2 else 0) / 1e6
+    with tempfile.TemporaryDirectory() as directory:
+        bench_before(directory, calls, delay)
+        bench_after(directory, calls, delay, json_lines=False)
+        bench_after(directory, calls, delay, json_lines=True)
+
+
+if __name__ == '__main__':
+    main()
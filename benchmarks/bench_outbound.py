@@ -0,0 +1,74 @@
+"""Задержка и доля потерь в очереди исходящих сообщений.
+
+Запуск: python -m benchmarks.bench_outbound [сообщений] [чатов] [очередь]
+Поддельный бот отвечает за 5 мс и изредка возвращает RetryAfter.
+"""
+import logging
+import random
+import statistics
+import sys
+import threading
+import time
+
+import telegram
+
+from bot.outbound import OutboundQueue
+
+
+class FakeBot:
+
+    def __init__(self, latency=0.005, retry_share=0.01, seed=0):
+        self.latency = latency
+        self.retry_share = retry_share
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = 0
+
+    def send_message(self, chat_id, text):
+        time.sleep(self.latency)
+        with self.lock:
+            self.calls += 1
+            if self.random.random() < self.retry_share:
+                raise telegram.error.RetryAfter(0.05)
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    chats = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    maxsize = int(sys.argv[3]) if len(sys.argv) > 3 else total
+    logging.disable(logging.CRITICAL)
+    bot = FakeBot()
+    queue = OutboundQueue(
+        bot, maxsize=maxsize, per_chat_interval=1.0, global_rate=30)
+    queue.start()
+    started = time.perf_counter()
+    enqueue = []
+    for index in range(total):
+        before = time.perf_counter()
+        queue.send_message(index % chats, f'status {index}')
+        enqueue.append(time.perf_counter() - before)
+    queue.stop()
+    elapsed = time.perf_counter() - started
+    stats = queue.stats
+    latencies = list(queue.latencies)
+    print(f'Сообщений: {total}, чатов: {chats}, за {elapsed:.1f} с')
+    print(
+        f'Постановка в очередь: среднее '
+        f'{statistics.mean(enqueue) * 1e6:.1f} мкс')
+    print(
+        f'Отправлено запросов: {stats["sent"]}, склеено: '
+        f'{stats["coalesced"]}, повторов RetryAfter: {stats["retried"]}')
+    print(f'Потери: {stats["dropped"] / total:.1%}')
+    print(
+        f'Задержка доставки: p50 {percentile(latencies, 0.5):.3f} с, '
+        f'p95 {percentile(latencies, 0.95):.3f} с, '
+        f'p99 {percentile(latencies, 0.99):.3f} с')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Усиление записи outbox и время восстановления очереди.
+
+Запуск: python -m benchmarks.bench_outbox [сообщений] [на один fsync]
+"""
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from bot.outbound import OutboundQueue
+from bot.outbox import Outbox
+
+TEXT = (
+    'Изменился статус проверки работы "hw". '
+    'Работа проверена: ревьюеру всё понравилось. Ура!')
+
+
+def bench_writes(path, total, batch):
+    outbox = Outbox(path)
+    started = time.perf_counter()
+    refs = []
+    for index in range(total):
+        refs.append(outbox.add(index % 1000, TEXT))
+        if len(refs) == batch:
+            outbox.flush()
+            outbox.ack(refs)
+            refs = []
+    outbox.ack(refs)
+    outbox.close()
+    elapsed = time.perf_counter() - started
+    return outbox.stats, elapsed
+
+
+def bench_replay(path, total):
+    outbox = Outbox(path)
+    for index in range(total):
+        outbox.add(index % 1000, TEXT)
+    outbox.close()
+    size = Path(path).stat().st_size
+    started = time.perf_counter()
+    queue = OutboundQueue(bot=None, maxsize=total, outbox=Outbox(path))
+    replayed = queue.replay()
+    return replayed, size, time.perf_counter() - started
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    batch = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    logging.disable(logging.CRITICAL)
+    with tempfile.TemporaryDirectory() as directory:
+        stats, elapsed = bench_writes(
+            str(Path(directory) / 'writes.log'), total, batch)
+        print(f'Сообщений: {total}, по {batch} на fsync, {elapsed:.2f} с')
+        print(
+            f'fsync: {stats["fsyncs"]}, '
+            f'сжатий журнала: {stats["compactions"]}')
+        print(
+            'Усиление записи (байт на диск / байт текста): '
+            f'{stats["bytes_written"] / stats["payload_bytes"]:.2f}')
+        replayed, size, elapsed = bench_replay(
+            str(Path(directory) / 'replay.log'), total)
+        print(
+            f'Восстановление {replayed} сообщений '
+            f'({size / 2 ** 20:.1f} МБ): {elapsed:.2f} с')
+
+
+if __name__ == '__main__':
+    main()
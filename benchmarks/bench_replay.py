@@ -0,0 +1,171 @@
+"""Прогон цикла опроса на сценарии из нескольких дней за секунды.
+
+Запуск: python -m benchmarks.bench_replay [подписчиков] [дней] [доля сбоев]
+Заглушка API отдаёт статусы по сценарию на виртуальных часах, часть
+ответов — 503 или битый JSON. Опрос идёт теми же poll_subscriber,
+PollScheduler и RetryPolicy, что и в run_sync, сообщения уходят через
+telegram.Bot в заглушку Telegram. Выводим опросы в секунду реального
+времени, задержку уведомления в виртуальном времени и рост числа
+объектов и памяти процесса по дням.
+"""
+import gc
+import logging
+import re
+import resource
+import statistics
+import sys
+import time
+
+import telegram
+
+import homework
+from benchmarks.stub_server import Faults, StubServer, Timeline
+from bot import session
+from bot.scheduler import FakeClock, PollScheduler
+from bot.subscriptions import Subscriber
+
+START = 1700000000.0
+DAY = 86400
+NAME = re.compile(r'"(.+?)"')
+
+
+class SimulationFinished(Exception):
+    """Виртуальное время сценария вышло."""
+
+
+class VirtualClock(FakeClock):
+    """Часы сценария: после until sleep завершает прогон."""
+
+    def __init__(self, now, until, on_day=None):
+        super().__init__(now)
+        self.until = until
+        self.on_day = on_day
+        self.day = 0
+
+    def sleep(self, seconds):
+        super().sleep(seconds)
+        day = int((self.now - START) // DAY)
+        if day != self.day and self.on_day is not None:
+            self.day = day
+            self.on_day(day)
+        if self.now >= self.until:
+            raise SimulationFinished
+
+
+def notification_latencies(timeline, delivered, tokens, until):
+    """Задержка от вердикта в сценарии до сообщения в Telegram.
+
+    Вердикты последних двух интервалов опроса не учитываются: бот мог
+    ещё не успеть их увидеть.
+    """
+    statuses = {text: status for status, text in
+                homework.HOMEWORK_STATUSES.items()}
+    arrived = {}
+    for at, chat_id, text in delivered:
+        match = NAME.search(text)
+        status = next(
+            (status for verdict, status in statuses.items()
+             if text.endswith(verdict)), None)
+        if match and status:
+            arrived.setdefault((chat_id, match.group(1), status), at)
+    latencies = []
+    missed = 0
+    for token, at, name, status in timeline.verdicts():
+        if at > until - 2 * homework.RETRY_TIME:
+            continue
+        delivered_at = arrived.get((tokens[token], name, status))
+        if delivered_at is None:
+            missed += 1
+        else:
+            latencies.append(delivered_at - at)
+    return latencies, missed
+
+
+def memory_usage():
+    """Число объектов под gc и пиковая память процесса, КБ."""
+    return len(gc.get_objects()), resource.getrusage(
+        resource.RUSAGE_SELF).ru_maxrss
+
+
+def simulate(subscribers=20, days=3, error_rate=0.02, malformed_rate=0.01,
+             latency=0.5, seed=0):
+    """Прогон сценария; возвращает словарь с результатами."""
+    memory = [memory_usage()]
+    clock = VirtualClock(
+        START, START + days * DAY,
+        on_day=lambda day: memory.append(memory_usage()))
+    tokens = {f'token-{index}': str(index) for index in range(subscribers)}
+    timeline = Timeline.generate(clock, tokens, days, seed)
+    faults = Faults(error_rate, malformed_rate, latency, seed)
+    pooled = session.install(pool_size=2)
+    with StubServer(timeline=timeline, faults=faults) as server:
+        endpoint = homework.ENDPOINT
+        homework.ENDPOINT = server.endpoint
+        homework.api_breaker.clock = clock
+        bot = telegram.Bot('123:abc', base_url=server.base_url + '/bot')
+        polled = [
+            Subscriber(index, token, chat_id, current_timestamp=int(START))
+            for index, (token, chat_id) in enumerate(tokens.items())]
+        scheduler = PollScheduler(
+            polled, homework.RETRY_TIME,
+            poll=lambda subscriber: homework.poll_subscriber(
+                bot, subscriber),
+            clock=clock, sleep=clock.sleep, policy=homework.retry_policy())
+        started = time.perf_counter()
+        try:
+            scheduler.run_forever()
+        except SimulationFinished:
+            pass
+        finally:
+            elapsed = time.perf_counter() - started
+            homework.ENDPOINT = endpoint
+            homework.api_breaker.clock = time.monotonic
+            pooled.close()
+            session._shared = None
+        latencies, missed = notification_latencies(
+            timeline, server.delivered, tokens, clock.until)
+        return {
+            'elapsed': elapsed,
+            'polls': server.requests['get'],
+            'requests': dict(server.requests),
+            'messages': len(server.delivered),
+            'latencies': latencies,
+            'missed': missed,
+            'memory': memory,
+            'breaker': dict(homework.api_breaker.stats),
+        }
+
+
+def main():
+    subscribers = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    days = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    error_rate = float(sys.argv[3]) if len(sys.argv) > 3 else 0.02
+    logging.disable(logging.CRITICAL)
+    result = simulate(subscribers, days, error_rate)
+    latencies = sorted(result['latencies'])
+    print(
+        f'Подписчиков: {subscribers}, дней: {days}, '
+        f'реальное время: {result["elapsed"]:.1f} с')
+    print(
+        f'Опросов: {result["polls"]}, '
+        f'{result["polls"] / result["elapsed"]:,.0f} в секунду; '
+        f'ответы API: {result["requests"]}')
+    print(
+        f'Сообщений в Telegram: {result["messages"]}, '
+        f'вердиктов доставлено: {len(latencies)}, '
+        f'потеряно: {result["missed"]}')
+    if latencies:
+        p95 = latencies[int(len(latencies) * 0.95)]
+        print(
+            f'Задержка уведомления: медиана '
+            f'{statistics.median(latencies):.0f} с, p95 {p95:.0f} с, '
+            f'максимум {latencies[-1]:.0f} с')
+    print(f'Предохранитель API: {result["breaker"]}')
+    objects, rss = zip(*result['memory'])
+    print(
+        'Объектов по дням: ' + ', '.join(map(str, objects))
+        + f'; пиковая память процесса: {rss[0]} -> {rss[-1]} КБ')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Время процессора на опрос с кешем ответа и без него.
+
+Запуск: python -m benchmarks.bench_response_cache
+Ответ API отдаётся из памяти, чтобы измерить только разбор и проверку;
+между опросами меняется лишь current_date, как в реальном API.
+"""
+import json
+import logging
+import time
+
+import requests
+
+import homework
+from bot import response_cache
+from bot.coalesce import Coalescer
+from bot.subscriptions import Subscriber
+
+
+class FakeResponse:
+
+    status_code = 200
+    headers = {}
+
+    def __init__(self, content):
+        self.content = content
+
+    def json(self):
+        return json.loads(self.content)
+
+
+def make_content(count, current_date):
+    return json.dumps({
+        'homeworks': [
+            {
+                'id': index,
+                'homework_name': f'student__hw{index:05}.zip',
+                'status': 'approved',
+                'reviewer_comment': 'Всё нравится',
+                'date_updated': '2020-02-13T14:40:57Z',
+                'lesson_name': 'Итоговый проект',
+            }
+            for index in range(count)
+        ],
+        'current_date': current_date,
+    }).encode()
+
+
+class NullBot:
+
+    def send_message(self, chat_id, text):
+        return None
+
+
+def cpu_per_poll(count, polls, use_cache):
+    template = make_content(count, 1_000_000_000)
+    responses = iter([
+        FakeResponse(template.replace(
+            b'1000000000', str(1_000_000_000 + index).encode()))
+        for index in range(polls + 1)
+    ])
+    requests.get = lambda *args, **kwargs: next(responses)
+    # Без ttl ответы не переживают опрос: иначе «без кеша» мерил бы
+    # ответы прошлого прогона из памяти Coalescer.
+    homework.coalescer = Coalescer(ttl=0)
+    subscriber = Subscriber(1, 'token', 1, current_timestamp=1)
+    if not use_cache:
+        subscriber.cache = None
+    homework.poll_subscriber(NullBot(), subscriber)
+    started = time.process_time()
+    for _ in range(polls):
+        homework.poll_subscriber(NullBot(), subscriber)
+    return (time.process_time() - started) / polls
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    print(f'{"работ":>8} {"без кеша":>12} {"с кешем":>12}')
+    for count in (10, 1_000, 10_000, 100_000):
+        polls = max(3, 20_000 // count)
+        without = cpu_per_poll(count, polls, use_cache=False)
+        with_cache = cpu_per_poll(count, polls, use_cache=True)
+        print(
+            f'{count:>8} {without * 1000:>10.3f}мс '
+            f'{with_cache * 1000:>10.3f}мс')
+    print(f'Счётчики кеша: {dict(response_cache.STATS)}')
+
+
+if __name__ == '__main__':
+    main()
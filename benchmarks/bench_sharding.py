@@ -0,0 +1,76 @@
+"""Масштабирование опроса на несколько процессов-воркеров.
+
+Запуск: python -m benchmarks.bench_sharding [воркеров] [подписчиков]
+Воркеры делят подписчиков через общий SQLite-файл аренды; опрос
+имитирует ожидание сети через time.sleep. Для 1..N воркеров выводим
+число опросов в секунду и проверяем, что ни один подписчик не
+опрашивался двумя воркерами.
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from bot.sharding import LeaseStore, ShardCoordinator
+
+IO_DELAY = 0.002
+DURATION = 2.0
+
+
+def worker(path, worker_id, keys, barrier, results):
+    coordinator = ShardCoordinator(LeaseStore(path), worker_id, ttl=60)
+    coordinator.refresh()
+    barrier.wait()
+    coordinator.refresh()
+    polled = set()
+    polls = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < DURATION:
+        for key in keys:
+            if coordinator.owns(key):
+                time.sleep(IO_DELAY)
+                polled.add(key)
+                polls += 1
+                if time.perf_counter() - started >= DURATION:
+                    break
+    results.put((worker_id, polls, polled))
+
+
+def run(workers, keys):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'shards.db')
+        LeaseStore(path).close()
+        barrier = multiprocessing.Barrier(workers)
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(
+                target=worker,
+                args=(path, f'w{index}', keys, barrier, results))
+            for index in range(workers)]
+        for process in processes:
+            process.start()
+        collected = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+    total = sum(polls for _, polls, _ in collected)
+    seen = [key for _, _, polled in collected for key in polled]
+    return total / DURATION, len(seen) - len(set(seen))
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    keys = [f'chat-{index}' for index in range(count)]
+    baseline = None
+    for number in range(1, workers + 1):
+        rate, duplicates = run(number, keys)
+        baseline = baseline or rate
+        print(
+            f'Воркеров: {number}, опросов в секунду: {rate:,.0f}, '
+            f'ускорение: {rate / baseline:.2f}x, '
+            f'опрошено дважды: {duplicates}')
+
+
+if __name__ == '__main__':
+    main()
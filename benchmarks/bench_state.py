@@ -0,0 +1,69 @@
+"""Чтение и запись статусов работ в хранилищах состояния.
+
+Запуск: python -m benchmarks.bench_state [работ] [работ на подписчика]
+Redis проверяется на заглушке из stub_server: она однопоточная и на
+Python, поэтому цифры для настоящего Redis будут выше.
+"""
+import random
+import sys
+import tempfile
+import time
+
+from benchmarks.stub_server import FakeRedis
+from bot.state import (MemoryStateStore, RedisStateStore, RespClient,
+                       SQLiteStateStore)
+
+STATUSES = ('reviewing', 'approved', 'rejected')
+
+
+def workload(total, per_owner, seed=0):
+    generator = random.Random(seed)
+    return {
+        f'subscriber-{owner}': {
+            str(owner * per_owner + number): (
+                generator.choice(STATUSES), f'hw{number}')
+            for number in range(per_owner)}
+        for owner in range(total // per_owner)}
+
+
+def measure(store, owners):
+    total = sum(map(len, owners.values()))
+    started = time.perf_counter()
+    for owner, states in owners.items():
+        store.set_many(owner, states)
+    store.flush()
+    writes = total / (time.perf_counter() - started)
+    started = time.perf_counter()
+    found = 0
+    for owner, states in owners.items():
+        found += len(store.get_many(owner, list(states)))
+    reads = total / (time.perf_counter() - started)
+    assert found == total, 'Хранилище потеряло состояния'
+    return writes, reads
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    per_owner = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    owners = workload(total, per_owner)
+    print(f'Работ: {total}, подписчиков: {len(owners)}')
+    with tempfile.TemporaryDirectory() as directory, FakeRedis() as redis:
+        stores = {
+            'память (LRU)': MemoryStateStore(maxsize=total),
+            'SQLite WAL, пачки по 1000': SQLiteStateStore(
+                f'{directory}/state.db', batch_size=1000),
+            'SQLite WAL, запись на каждый вызов': SQLiteStateStore(
+                f'{directory}/unbatched.db', batch_size=1),
+            'Redis (заглушка), пачки по 1000': RedisStateStore(
+                RespClient(*redis.address), batch_size=1000),
+        }
+        for name, store in stores.items():
+            writes, reads = measure(store, owners)
+            print(
+                f'{name}: запись {writes:,.0f} оп/с, '
+                f'чтение {reads:,.0f} оп/с')
+            store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Память на подписчика и пропускная способность планировщика.
+
+Запуск: python -m benchmarks.bench_subscriptions [подписчиков] [задержка, мс]
+Опросы идут по HTTP к локальной заглушке API с заданной задержкой, как в
+bench_async. Отдельно ответ API подменяется готовым словарём, чтобы
+измерить накладные расходы процесса без сети.
+"""
+import itertools
+import logging
+import sys
+import time
+import tracemalloc
+
+import homework
+from benchmarks.stub_server import StubServer
+from bot.coalesce import Coalescer
+from bot.scheduler import PollScheduler
+from bot.subscriptions import SubscriptionRegistry
+
+RESPONSE = {
+    'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+    'current_date': 0,
+}
+
+
+class NullBot:
+
+    def send_message(self, chat_id, text):
+        return None
+
+
+def measure_memory(count):
+    registry = SubscriptionRegistry()
+    for index in range(count):
+        registry.add(f'token-{index}', index)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    subscribers = registry.load(current_timestamp=int(time.time()))
+    scheduler = PollScheduler(subscribers, homework.RETRY_TIME, lambda s: s)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(
+        stat.size_diff for stat in after.compare_to(before, 'filename'))
+    return scheduler, subscribers, size / count
+
+
+def measure_throughput(subscribers, seconds=2.0):
+    """Опросов в минуту в одном потоке за seconds секунд."""
+    homework.coalescer = Coalescer(ttl=0)
+    bot = NullBot()
+    polls = 0
+    started = time.perf_counter()
+    for subscriber in itertools.cycle(subscribers):
+        if time.perf_counter() - started >= seconds:
+            break
+        subscriber.homeworks.statuses.clear()
+        homework.poll_subscriber(bot, subscriber)
+        polls += 1
+    elapsed = time.perf_counter() - started
+    return polls / elapsed * 60
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 20) / 1000
+    logging.disable(logging.CRITICAL)
+    _, subscribers, per_subscriber = measure_memory(count)
+    with StubServer(
+            latency=latency, homeworks=RESPONSE['homeworks']) as server:
+        homework.ENDPOINT = server.endpoint
+        per_minute = measure_throughput(subscribers)
+    fetch = homework.fetch_homework_statuses
+    homework.fetch_homework_statuses = lambda *args: RESPONSE
+    overhead = measure_throughput(subscribers)
+    homework.fetch_homework_statuses = fetch
+    per_worker = per_minute * homework.RETRY_TIME / 60
+    print(f'Подписчиков: {count}')
+    print(f'Память на подписчика: {per_subscriber:.0f} байт')
+    print(
+        f'Опросов в минуту через HTTP, задержка API {latency * 1000:g} мс: '
+        f'{per_minute:,.0f}')
+    print(
+        f'Подписчиков на воркер при RETRY_TIME={homework.RETRY_TIME} с: '
+        f'{per_worker:,.0f}')
+    print(f'Опросов в минуту без сети (только CPU): {overhead:,.0f}')
+
+
+if __name__ == '__main__':
+    main()
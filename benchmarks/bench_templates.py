@@ -0,0 +1,51 @@
+"""Отрисовка сообщений о статусе: f-строка, шаблоны и кеш.
+
+Запуск: python -m benchmarks.bench_templates [сообщений] [разных работ]
+Сообщения повторяются, как у подписчиков одного потока: разных работ
+немного, статусов три. render с parse_mode=None идёт без кеша: шаблон
+без экранирования дешевле поиска в нём.
+"""
+import itertools
+import sys
+import time
+
+import homework
+from bot.templates import VERDICTS, MessageRenderer
+
+STATUSES = {'ru': homework.HOMEWORK_STATUSES, **VERDICTS}
+
+
+def fstring(status, name):
+    verdict = homework.HOMEWORK_STATUSES[status]
+    return f'Изменился статус проверки работы "{name}". {verdict}'
+
+
+def measure(render, calls):
+    started = time.perf_counter()
+    for status, name in calls:
+        render(status, name)
+    return (time.perf_counter() - started) / len(calls) * 1e9
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    names = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    calls = list(itertools.islice(itertools.cycle(
+        (status, f'username__hw{number:03d}_python.zip')
+        for number in range(names)
+        for status in homework.HOMEWORK_STATUSES), total))
+    print(f'f-строка: {measure(fstring, calls):.0f} нс')
+    for parse_mode in (None, 'MarkdownV2', 'HTML'):
+        uncached = MessageRenderer(STATUSES, parse_mode=parse_mode)
+        cached = MessageRenderer(STATUSES, parse_mode=parse_mode)
+        plain = measure(
+            lambda status, name: uncached._render(status, name, 'ru', None),
+            calls)
+        hits = measure(cached.render, calls)
+        print(
+            f'parse_mode={parse_mode}: шаблон {plain:.0f} нс, '
+            f'render {hits:.0f} нс, {cached.cache_info()}')
+
+
+if __name__ == '__main__':
+    main()
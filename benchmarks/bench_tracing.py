@@ -0,0 +1,52 @@
+"""Цена трассировки на вызов: выключенной, включённой и декоратора.
+
+Запуск: python -m benchmarks.bench_tracing [вызовов]
+"""
+import sys
+import tempfile
+import time
+
+from bot.tracing import Tracer, trace
+
+
+def per_call(func, calls):
+    started = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - started) / calls * 1e9
+
+
+def nested(tracer):
+    def cycle():
+        with tracer.span('poll_cycle', subscriber='s'):
+            with tracer.span('get_api_answer'):
+                pass
+            with tracer.span('parse_status'):
+                pass
+    return cycle
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    with tempfile.TemporaryDirectory() as directory:
+        tracer = Tracer(max_spans=calls, flush_interval=3600)
+        decorated = trace('call', tracer=tracer)(lambda: None)
+        print(f'вызов без span: {per_call(lambda: None, calls):.0f} нс')
+        print(f'выключено, декоратор: {per_call(decorated, calls):.0f} нс')
+        print(
+            'выключено, цикл из трёх span: '
+            f'{per_call(nested(tracer), calls):.0f} нс')
+        tracer.start(f'{directory}/trace.json')
+        print(f'включено, декоратор: {per_call(decorated, calls):.0f} нс')
+        print(
+            'включено, цикл из трёх span: '
+            f'{per_call(nested(tracer), calls):.0f} нс')
+        started = time.perf_counter()
+        tracer.stop()
+        print(
+            f'запись {len(tracer.spans)} span: '
+            f'{time.perf_counter() - started:.2f} с')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Проверка и сравнение больших ответов API с индексом статусов.
+
+Запуск: python -m benchmarks.bench_tracker
+"""
+import logging
+import random
+import time
+
+import homework
+from bot.subscriptions import Subscriber
+
+STATUSES = list(homework.HOMEWORK_STATUSES)
+
+
+def make_response(count, seed=0):
+    rnd = random.Random(seed)
+    return {'homeworks': [
+        {
+            'id': index,
+            'homework_name': f'hw{index}',
+            'status': rnd.choice(STATUSES),
+        }
+        for index in range(count)
+    ], 'current_date': 0}
+
+
+def changed_copy(response, share):
+    rnd = random.Random(1)
+    homeworks = [dict(homework) for homework in response['homeworks']]
+    for homework_ in rnd.sample(homeworks, int(len(homeworks) * share)):
+        homework_['status'] = rnd.choice(
+            [s for s in STATUSES if s != homework_['status']])
+    rnd.shuffle(homeworks)
+    return {'homeworks': homeworks, 'current_date': 0}
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, (time.perf_counter() - started) * 1000
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    print(f'{"работ":>8} {"первый":>10} {"без изм.":>10} {"1% изм.":>10}')
+    for count in (1_000, 10_000, 100_000, 1_000_000):
+        subscriber = Subscriber(1, 'token', 1)
+        response = make_response(count)
+        _, first = timed(homework.detect_changes, subscriber, response)
+        _, same = timed(
+            homework.detect_changes, subscriber, changed_copy(response, 0))
+        messages, some = timed(
+            homework.detect_changes, subscriber,
+            changed_copy(response, 0.01))
+        assert len(messages) == count // 100
+        print(
+            f'{count:>8} {first:>8.1f}мс {same:>8.1f}мс {some:>8.1f}мс')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Декодирование и проверка ответа homework_statuses.
+
+Запуск: python -m benchmarks.bench_validation
+Сравниваются stdlib json и orjson (если установлен), а также
+поэлементная проверка через dict.get и HomeworkValidator.
+"""
+import json
+import logging
+import timeit
+
+import homework
+from bot import validation
+from bot.exceptions import UndocumentedStatusError
+
+SIZES = (10, 1_000, 100_000)
+
+
+def make_body(count):
+    return json.dumps({
+        'homeworks': [
+            {
+                'id': index,
+                'homework_name': f'student__hw{index:05}.zip',
+                'status': ('approved', 'rejected', 'reviewing')[index % 3],
+                'reviewer_comment': 'Всё нравится',
+                'date_updated': '2020-02-13T14:40:57Z',
+                'lesson_name': 'Итоговый проект',
+            }
+            for index in range(count)
+        ],
+        'current_date': 1_600_000_000,
+    }).encode()
+
+
+def validate_with_get(response):
+    """Прежняя проверка: dict.get для каждой работы."""
+    homeworks = response.get('homeworks')
+    for homework_ in homeworks:
+        if homework_.get('status') not in homework.HOMEWORK_STATUSES:
+            raise UndocumentedStatusError(homework_.get('status'))
+        if homework_.get('homework_name') is None:
+            raise UndocumentedStatusError('homework_name')
+    return homeworks
+
+
+def best(func, count):
+    number = max(1, 20_000 // count)
+    return min(timeit.repeat(func, number=number, repeat=5)) / number
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    validator = validation.HomeworkValidator(homework.HOMEWORK_STATUSES)
+    decoders = {'json': json.loads}
+    if validation.orjson is not None:
+        decoders['orjson'] = validation.orjson.loads
+    else:
+        print('orjson не установлен, сравнение только с stdlib')
+    print(f'{"работ":>7} {"этап":<28} {"время":>12}')
+    for count in SIZES:
+        body = make_body(count)
+        data = json.loads(body)
+        rows = [
+            ('проверка dict.get', lambda: validate_with_get(data)),
+            ('HomeworkValidator', lambda: validator(data)),
+        ]
+        for name, decode in decoders.items():
+            rows.append((f'{name}', lambda decode=decode: decode(body)))
+            rows.append((
+                f'{name} + HomeworkValidator',
+                lambda decode=decode: validator(decode(body))))
+        for name, func in rows:
+            elapsed = best(func, count)
+            print(f'{count:>7} {name:<28} {elapsed * 1e3:>10.3f}мс')
+
+
+if __name__ == '__main__':
+    main()
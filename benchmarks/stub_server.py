@@ -0,0 +1,337 @@
+"""Локальная заглушка API YP и Telegram Bot API для бенчмарков и тестов."""
+import bisect
+import collections
+import datetime
+import json
+import random
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+HOMEWORKS_PATH = '/api/user_api/homework_statuses/'
+MALFORMED_BODY = b'{"homeworks": [{"status": "appr'
+
+
+def isoformat(timestamp):
+    """Время в формате date_updated API."""
+    moment = datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc)
+    return moment.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+class Timeline:
+    """Сценарий статусов работ по токенам на виртуальных часах.
+
+    Ответ, как и настоящий API, содержит работы, изменившиеся начиная с
+    from_date, в последнем на текущий момент статусе, от новых к старым.
+    """
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.events = collections.defaultdict(list)
+
+    def add(self, token, at, homework_name, status, comment=''):
+        """Смена статуса работы в момент at."""
+        bisect.insort(
+            self.events[token], (at, homework_name, status, comment))
+
+    def response(self, token, from_date):
+        """Ответ API для токена на текущий виртуальный момент."""
+        now = self.clock()
+        events = self.events.get(token, ())
+        latest = {}
+        for at, name, status, comment in events[
+                bisect.bisect_left(events, (from_date,)):]:
+            if at > now:
+                break
+            latest[name] = {
+                'homework_name': name, 'status': status,
+                'reviewer_comment': comment, 'date_updated': isoformat(at),
+                'lesson_name': name}
+        return {
+            'homeworks': list(reversed(latest.values())),
+            'current_date': int(now)}
+
+    def verdicts(self):
+        """Все вердикты сценария: (токен, время, работа, статус)."""
+        return [
+            (token, at, name, status)
+            for token, events in self.events.items()
+            for at, name, status, _ in events
+            if status != 'reviewing']
+
+    @classmethod
+    def generate(cls, clock, tokens, days, seed=0):
+        """Случайный сценарий: работа в день, проверка — часы."""
+        generator = random.Random(seed)
+        timeline = cls(clock)
+        start = clock()
+        for token in tokens:
+            at = start + generator.uniform(0, 86400)
+            number = 0
+            while at < start + days * 86400:
+                name = f'{token}-hw{number}'
+                timeline.add(token, at, name, 'reviewing')
+                at += generator.lognormvariate(9, 0.8)
+                verdict = generator.choice(('approved', 'rejected'))
+                timeline.add(token, at, name, verdict, 'Комментарий')
+                at += generator.uniform(3600, 86400)
+                number += 1
+        return timeline
+
+
+class Faults:
+    """Сбои API: доля ответов 5xx и битого JSON, задержка ответа.
+
+    С виртуальными часами задержка сдвигает их, а не ждёт по-настоящему.
+    """
+
+    def __init__(self, error_rate=0.0, malformed_rate=0.0, latency=0.0,
+                 seed=0):
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.latency = latency
+        self.random = random.Random(seed)
+
+    def pick(self):
+        """Исход очередного запроса: 'error', 'malformed' или None."""
+        value = self.random.random()
+        if value < self.error_rate:
+            return 'error'
+        if value < self.error_rate + self.malformed_rate:
+            return 'malformed'
+        return None
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        return None
+
+    def _reply(self, status, body):
+        self._send(status, json.dumps(body).encode())
+
+    def _send(self, status, data):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        stub = self.server.stub
+        time.sleep(stub.latency)
+        stub.count('get')
+        if not self.path.startswith(HOMEWORKS_PATH):
+            return self._reply(404, {})
+        if stub.timeline is None:
+            return self._reply(200, stub.homeworks_response())
+        fault = stub.faults.pick()
+        stub.timeline.clock.sleep(stub.faults.latency)
+        stub.count(fault or 'ok')
+        if fault == 'error':
+            return self._reply(503, {'error': 'Service Unavailable'})
+        if fault == 'malformed':
+            return self._send(200, MALFORMED_BODY)
+        query = parse_qs(urlsplit(self.path).query)
+        token = self.headers.get('Authorization', '').replace('OAuth ', '')
+        from_date = int(query.get('from_date', ['0'])[0])
+        self._reply(200, stub.timeline.response(token, from_date))
+
+    def do_POST(self):
+        stub = self.server.stub
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        if self.path.endswith('/getUpdates'):
+            updates = stub.wait_updates(
+                int(payload.get('offset') or 0),
+                float(payload.get('timeout') or 0))
+            return self._reply(200, {'ok': True, 'result': updates})
+        time.sleep(stub.latency)
+        stub.count('post')
+        stub.sent.append(payload)
+        if stub.timeline is not None:
+            stub.delivered.append((
+                stub.timeline.clock(), str(payload.get('chat_id')),
+                payload.get('text', '')))
+        self._reply(200, {'ok': True, 'result': stub.message(payload)})
+
+
+class StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+class StubServer:
+    """Сервер в отдельном потоке; latency задаёт задержку ответа.
+
+    С timeline API отвечает по сценарию на виртуальных часах с
+    заданными faults, а отправленные в Telegram сообщения попадают в
+    delivered вместе с виртуальным временем доставки.
+    """
+
+    def __init__(self, latency=0.0, homeworks=None, timeline=None,
+                 faults=None):
+        self.latency = latency
+        self.homeworks = homeworks or []
+        self.timeline = timeline
+        self.faults = faults or Faults()
+        self.requests = collections.Counter(get=0, post=0)
+        self.sent = []
+        self.delivered = []
+        self.updates = []
+        self._lock = threading.Lock()
+        self._updates_ready = threading.Condition()
+        self.httpd = StubHTTPServer(('127.0.0.1', 0), StubHandler)
+        self.httpd.stub = self
+        self.thread = threading.Thread(
+            target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address
+        return f'http://{host}:{port}'
+
+    @property
+    def endpoint(self):
+        return self.base_url + HOMEWORKS_PATH
+
+    def count(self, outcome):
+        with self._lock:
+            self.requests[outcome] += 1
+
+    def push_update(self, chat_id, text):
+        """Входящее сообщение пользователя для getUpdates."""
+        with self._updates_ready:
+            update_id = len(self.updates) + 1
+            self.updates.append({
+                'update_id': update_id,
+                'message': self.message(
+                    {'chat_id': chat_id, 'text': text}, update_id),
+            })
+            self._updates_ready.notify_all()
+
+    def wait_updates(self, offset, timeout):
+        """Сообщения начиная с offset; ждём их не дольше timeout."""
+        with self._updates_ready:
+            self._updates_ready.wait_for(
+                lambda: len(self.updates) >= max(offset, 1), timeout)
+            return self.updates[max(offset, 1) - 1:]
+
+    @staticmethod
+    def message(payload, message_id=1):
+        return {
+            'message_id': message_id,
+            'date': int(time.time()),
+            'chat': {'id': int(payload.get('chat_id', 0)), 'type': 'private'},
+            'text': payload.get('text', ''),
+        }
+
+    def homeworks_response(self):
+        return {'homeworks': self.homeworks, 'current_date': int(time.time())}
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class FakeRedisHandler(socketserver.StreamRequestHandler):
+    """Команды RESP по одной, ответы в том же формате."""
+
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        command = []
+        for _ in range(int(line[1:])):
+            size = int(self.rfile.readline()[1:])
+            command.append(self.rfile.read(size + 2)[:-2])
+        return command
+
+    def handle(self):
+        while True:
+            command = self.read_command()
+            if command is None:
+                return
+            self.wfile.write(self.server.redis.execute(command))
+
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class FakeRedis:
+    """Заглушка Redis в отдельном потоке: строки, хеши и счётчик команд.
+
+    Понимает PING, SELECT, HSET, HMGET, HGETALL, DEL и FLUSHALL.
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.commands = collections.Counter()
+        self._lock = threading.Lock()
+        self.server = FakeRedisServer(('127.0.0.1', 0), FakeRedisHandler)
+        self.server.redis = self
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, daemon=True)
+
+    @property
+    def address(self):
+        return self.server.server_address
+
+    @property
+    def url(self):
+        host, port = self.address
+        return f'redis://{host}:{port}/0'
+
+    @staticmethod
+    def bulk(value):
+        if value is None:
+            return b'$-1\r\n'
+        return b'$%d\r\n%s\r\n' % (len(value), value)
+
+    def execute(self, command):
+        name = command[0].upper().decode()
+        args = command[1:]
+        with self._lock:
+            self.commands[name] += 1
+            if name in ('PING', 'SELECT', 'FLUSHALL'):
+                if name == 'FLUSHALL':
+                    self.data.clear()
+                return b'+OK\r\n' if name != 'PING' else b'+PONG\r\n'
+            if name == 'DEL':
+                removed = sum(
+                    self.data.pop(key, None) is not None for key in args)
+                return b':%d\r\n' % removed
+            if name == 'HSET':
+                fields = self.data.setdefault(args[0], {})
+                added = 0
+                for field, value in zip(args[1::2], args[2::2]):
+                    added += field not in fields
+                    fields[field] = value
+                return b':%d\r\n' % added
+            fields = self.data.get(args[0], {}) if args else {}
+            if name == 'HMGET':
+                return b'*%d\r\n' % len(args[1:]) + b''.join(
+                    self.bulk(fields.get(field)) for field in args[1:])
+            if name == 'HGETALL':
+                return b'*%d\r\n' % (2 * len(fields)) + b''.join(
+                    self.bulk(part) for item in fields.items()
+                    for part in item)
+        return b'-ERR unknown command %s\r\n' % name.encode()
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
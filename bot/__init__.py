@@ -0,0 +1 @@
+"""Вспомогательные модули бота для проверки статуса домашней работы."""
@@ -0,0 +1,215 @@
+import asyncio
+import logging
+import time
+
+import aiohttp
+
+from bot.exceptions import (CircuitOpenError, RequestExceptionError,
+                            TheAnswerIsNot200Error)
+from bot.metrics import instrument
+from bot.scheduler import RetryPolicy, parse_retry_after
+from bot.tracing import TRACER
+from bot.validation import loads
+
+TELEGRAM_API = 'https://api.telegram.org'
+
+logger = logging.getLogger(__name__)
+
+PHASES = {
+    'http.request': ('on_request_start', 'on_request_end'),
+    'http.dns': ('on_dns_resolvehost_start', 'on_dns_resolvehost_end'),
+    'http.connect': (
+        'on_connection_create_start', 'on_connection_create_end'),
+    'http.queue': (
+        'on_connection_queued_start', 'on_connection_queued_end'),
+}
+
+
+def trace_config(tracer=TRACER):
+    """Фазы запросов aiohttp как span трассировки."""
+    config = aiohttp.TraceConfig()
+    for name, (start_signal, end_signal) in PHASES.items():
+        async def on_start(session, context, params, name=name):
+            setattr(context, name, time.perf_counter_ns())
+
+        async def on_end(session, context, params, name=name):
+            started = getattr(context, name, None)
+            if started is not None:
+                tracer.record(name, started, time.perf_counter_ns())
+
+        getattr(config, start_signal).append(on_start)
+        getattr(config, end_signal).append(on_end)
+    return config
+
+
+class AsyncClient:
+    """Асинхронные запросы к API YP и Telegram через один aiohttp-сеанс."""
+
+    def __init__(self, telegram_token, telegram_api=TELEGRAM_API,
+                 connect_timeout=5, read_timeout=30, limit=100,
+                 breaker=None, parse_mode=None):
+        self.telegram_token = telegram_token
+        self.parse_mode = parse_mode
+        self.breaker = breaker
+        self.telegram_api = telegram_api
+        self.timeout = aiohttp.ClientTimeout(
+            connect=connect_timeout, sock_read=read_timeout)
+        self.limit = limit
+        self.session = None
+
+    async def __aenter__(self):
+        self.session = aiohttp.ClientSession(
+            timeout=self.timeout,
+            connector=aiohttp.TCPConnector(limit=self.limit),
+            trace_configs=[trace_config()] if TRACER.enabled else None)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.session.close()
+
+    @instrument('get_api_answer')
+    async def get_api_answer(self, url, current_timestamp, token):
+        """Получение данных с API YP."""
+        current_timestamp = current_timestamp or int(time.time())
+        headers = {'Authorization': f'OAuth {token}'}
+        payload = {'from_date': current_timestamp}
+        try:
+            async with self.session.get(
+                    url, headers=headers, params=payload) as response:
+                if response.status != 200:
+                    code_api_msg = (
+                        f'Эндпоинт {url} недоступен.'
+                        f' Код ответа API: {response.status}')
+                    logger.error(code_api_msg)
+                    raise TheAnswerIsNot200Error(
+                        code_api_msg, parse_retry_after(
+                            response.headers.get('Retry-After')),
+                        response.status)
+                return loads(await response.read())
+        except (aiohttp.ClientError, asyncio.TimeoutError) as request_error:
+            code_api_msg = (
+                f'Код ответа API (ClientError): {request_error!r}')
+            logger.error(code_api_msg)
+            raise RequestExceptionError(code_api_msg) from request_error
+
+    async def _post_message(self, chat_id, message):
+        url = f'{self.telegram_api}/bot{self.telegram_token}/sendMessage'
+        payload = {'chat_id': chat_id, 'text': message}
+        if self.parse_mode is not None:
+            payload['parse_mode'] = self.parse_mode
+        async with self.session.post(url, json=payload) as response:
+            if response.status != 200:
+                error = aiohttp.ClientResponseError(
+                    response.request_info, response.history,
+                    status=response.status)
+                error.retry_after = parse_retry_after(
+                    response.headers.get('Retry-After'))
+                raise error
+
+    async def deliver(self, chat_id, message):
+        """Отправка через предохранитель, ошибки не перехватываются."""
+        if self.breaker is None:
+            await self._post_message(chat_id, message)
+        else:
+            await self.breaker.call_async(
+                self._post_message, chat_id, message)
+
+    @instrument('telegram_send')
+    async def send_message(self, chat_id, message):
+        """Отправка сообщения в Телеграм через Bot API."""
+        try:
+            await self.deliver(chat_id, message)
+            logger.info(
+                f'Сообщение в Telegram отправлено: {message}')
+        except (aiohttp.ClientError, asyncio.TimeoutError,
+                CircuitOpenError) as send_error:
+            logger.error(
+                f'Сообщение в Telegram не отправлено: {send_error!r}')
+
+
+class AsyncPollScheduler:
+    """Опрос подписчиков корутинами, не более concurrency одновременно.
+
+    У каждого подписчика своя задача; stop() прерывает ожидание между
+    опросами, а начатые опросы успевают завершиться.
+    """
+
+    def __init__(self, subscribers, interval, poll, concurrency=50,
+                 policy=None, owns=None):
+        self.subscribers = list(subscribers)
+        self.interval = interval
+        self.poll = poll
+        self.owns = owns
+        self.policy = policy or RetryPolicy(interval)
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self._stopping = asyncio.Event()
+        self._tasks = {}
+
+    async def _poll(self, subscriber):
+        if self.owns is not None and not self.owns(subscriber):
+            return
+        async with self.semaphore:
+            await self.poll(subscriber)
+
+    async def run_once(self):
+        """Опрашиваем всех подписчиков один раз."""
+        await asyncio.gather(
+            *(self._poll(subscriber) for subscriber in self.subscribers))
+
+    async def _wait(self, delay):
+        """Ждём delay секунд; True, если за это время пришёл stop()."""
+        try:
+            await asyncio.wait_for(self._stopping.wait(), delay)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    async def _loop(self, subscriber, delay):
+        while not await self._wait(delay):
+            await self._poll(subscriber)
+            delay = self.policy.delay(subscriber)
+
+    def _start(self, subscribers):
+        step = self.interval / len(subscribers) if subscribers else 0
+        for index, subscriber in enumerate(subscribers):
+            self._tasks[subscriber.key] = asyncio.ensure_future(
+                self._loop(subscriber, step * index))
+
+    def stop(self):
+        """Останавливаем опрос после начатых запросов."""
+        self._stopping.set()
+
+    def call_soon(self, function):
+        """Выполнить function() в цикле событий."""
+        asyncio.get_running_loop().call_soon(function)
+
+    def replace(self, subscribers):
+        """Новый набор подписчиков: задачи оставшихся не прерываются.
+
+        Возвращает число добавленных и удалённых.
+        """
+        keys = {subscriber.key for subscriber in subscribers}
+        removed = [key for key in self._tasks if key not in keys]
+        for key in removed:
+            self._tasks.pop(key).cancel()
+        added = [
+            subscriber for subscriber in subscribers
+            if subscriber.key not in self._tasks]
+        self.subscribers = list(subscribers)
+        self._start(added)
+        return len(added), len(removed)
+
+    async def run_forever(self, drain_timeout=None):
+        """Опрос до stop(), первые запросы распределены по интервалу.
+
+        После stop() начатые опросы ждём не дольше drain_timeout секунд,
+        остальные отменяются.
+        """
+        self._start(self.subscribers)
+        await self._stopping.wait()
+        tasks = list(self._tasks.values())
+        if not tasks:
+            return
+        _, pending = await asyncio.wait(tasks, timeout=drain_timeout)
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,158 @@
+import collections
+import logging
+import sys
+import threading
+import time
+
+from bot.exceptions import (CircuitOpenError, RequestExceptionError,
+                            TheAnswerIsNot200Error)
+from bot.lazy import lazy_import
+
+asyncio = lazy_import('asyncio')
+telegram = lazy_import('telegram')
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+logger = logging.getLogger(__name__)
+
+
+def is_api_outage(error):
+    """Сбой API YP целиком: сеть или ответ 5xx, а не ошибка подписчика."""
+    if isinstance(error, RequestExceptionError):
+        return True
+    return isinstance(error, TheAnswerIsNot200Error) and (
+        error.status_code is None or error.status_code >= 500)
+
+
+def is_telegram_outage(error):
+    """Сбой Telegram: сеть, таймаут или 5xx, а не отказ по конкретному чату.
+
+    Понимает ошибки python-telegram-bot и aiohttp из asyncio-режима;
+    aiohttp не загружается ради проверки, если его ещё нет.
+    """
+    aiohttp = sys.modules.get('aiohttp')
+    if aiohttp is not None:
+        if isinstance(error, aiohttp.ClientResponseError):
+            return error.status >= 500
+        if isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError)):
+            return True
+    return isinstance(error, telegram.error.NetworkError) and not isinstance(
+        error, telegram.error.BadRequest)
+
+
+class CircuitBreaker:
+    """Предохранитель для внешней зависимости.
+
+    После failure_threshold сбоев подряд цепь размыкается, и вызовы
+    сразу получают CircuitOpenError без похода в сеть. Через
+    reset_timeout секунд пропускается один пробный вызов: успех замыкает
+    цепь, сбой снова размыкает её. Сбоем считается исключение, для
+    которого is_failure истинен; остальные исключения значат, что
+    зависимость отвечает. on_change вызывается при размыкании и
+    восстановлении с аргументами (breaker, state).
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=60,
+                 is_failure=None, on_change=None, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.is_failure = is_failure or (lambda error: True)
+        self.on_change = on_change
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.stats = collections.Counter()
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def retry_after(self):
+        """Секунд до пробного вызова; 0, если цепь не разомкнута."""
+        if self.state != OPEN:
+            return 0.0
+        return max(self.opened_at + self.reset_timeout - self.clock(), 0.0)
+
+    def allow(self):
+        """Можно ли выполнить вызов сейчас."""
+        with self._lock:
+            if self.state == OPEN and not self.retry_after():
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self.stats['rejected'] += 1
+            return False
+
+    def record_success(self):
+        """Зависимость ответила."""
+        with self._lock:
+            self.failures = 0
+            recovered = self.state != CLOSED
+            self.state = CLOSED
+            self._probing = False
+        if recovered:
+            self._changed(CLOSED)
+
+    def record_failure(self):
+        """Сбой зависимости."""
+        with self._lock:
+            self.failures += 1
+            opened = self.state == CLOSED and (
+                self.failures >= self.failure_threshold)
+            if opened or self.state == HALF_OPEN:
+                self.state = OPEN
+                self.opened_at = self.clock()
+                self._probing = False
+        if opened:
+            self.stats['opened'] += 1
+            self._changed(OPEN)
+
+    def _changed(self, state):
+        logger.warning(f'Предохранитель {self.name}: {state}')
+        if self.on_change is not None:
+            self.on_change(self, state)
+
+    def _check(self):
+        if not self.allow():
+            raise CircuitOpenError(
+                f'{self.name} недоступен, вызов пропущен',
+                self.retry_after())
+
+    def _record(self, error):
+        if self.is_failure(error):
+            self.record_failure()
+        else:
+            self.record_success()
+
+    def call(self, function, *args, **kwargs):
+        """Вызов function(*args, **kwargs) через предохранитель."""
+        self._check()
+        try:
+            result = function(*args, **kwargs)
+        except Exception as error:
+            self._record(error)
+            raise
+        self.record_success()
+        return result
+
+    async def call_async(self, function, *args):
+        """То же для корутин."""
+        self._check()
+        try:
+            result = await function(*args)
+        except Exception as error:
+            self._record(error)
+            raise
+        self.record_success()
+        return result
+
+    def value(self):
+        """Состояние числом для метрик: 0 — замкнута, 2 — разомкнута."""
+        return STATE_VALUES[self.state]
@@ -0,0 +1,108 @@
+import collections
+import threading
+import time
+
+from bot.lazy import lazy_import
+
+asyncio = lazy_import('asyncio')
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class Coalescer:
+    """Один запрос на ключ для одновременных вызовов и короткий кеш.
+
+    Пока запрос по ключу выполняется, остальные вызовы с тем же ключом
+    ждут его и получают тот же результат или то же исключение. Успешный
+    результат ещё ttl секунд отдаётся из памяти. stats считает исходы:
+    request — настоящий запрос, shared — ожидание чужого запроса,
+    cached — ответ из памяти.
+    """
+
+    def __init__(self, ttl=5.0, clock=time.monotonic):
+        self.ttl = ttl
+        self.clock = clock
+        self.stats = collections.Counter()
+        self._results = collections.OrderedDict()
+        self._calls = {}
+        self._tasks = {}
+        self._lock = threading.Lock()
+
+    def _cached(self, key, now):
+        results = self._results
+        while results:
+            oldest, (expires, _) = next(iter(results.items()))
+            if expires > now:
+                break
+            del results[oldest]
+        return results.get(key)
+
+    def _store(self, key, result):
+        if self.ttl > 0:
+            self._results[key] = (self.clock() + self.ttl, result)
+            self._results.move_to_end(key)
+
+    def call(self, key, function, remember=True):
+        """Результат function(), общий для одновременных вызовов с key.
+
+        С remember=False результат не кешируется после завершения.
+        """
+        with self._lock:
+            entry = self._cached(key, self.clock())
+            if entry is not None:
+                self.stats['cached'] += 1
+                return entry[1]
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            self.stats['request' if leader else 'shared'] += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = function()
+        except Exception as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                if remember and call.error is None:
+                    self._store(key, call.result)
+            call.done.set()
+        return call.result
+
+    async def call_async(self, key, function):
+        """То же для корутин: function() возвращает awaitable."""
+        with self._lock:
+            entry = self._cached(key, self.clock())
+            if entry is not None:
+                self.stats['cached'] += 1
+                return entry[1]
+            task = self._tasks.get(key)
+            leader = task is None
+            if leader:
+                task = self._tasks[key] = asyncio.ensure_future(function())
+                task.add_done_callback(
+                    lambda task: self._finish_task(key, task))
+            self.stats['request' if leader else 'shared'] += 1
+        return await asyncio.shield(task)
+
+    def _finish_task(self, key, task):
+        with self._lock:
+            self._tasks.pop(key, None)
+            if not task.cancelled() and task.exception() is None:
+                self._store(key, task.result())
+
+    def __len__(self):
+        return len(self._results)
@@ -0,0 +1,139 @@
+import collections
+import logging
+import threading
+import time
+
+HELP = (
+    'Команды:\n'
+    '/status — текущие статусы работ\n'
+    '/history — последние изменения статусов\n'
+    '/pause — приостановить или возобновить уведомления')
+
+logger = logging.getLogger(__name__)
+
+
+class CommandHandler:
+    """Ответы на команды из памяти процесса, без запросов к API."""
+
+    def __init__(self, subscribers, verdicts):
+        self.verdicts = verdicts
+        self.update(subscribers)
+        self.commands = {
+            '/status': self.status,
+            '/history': self.history,
+            '/pause': self.pause,
+            '/start': self.help,
+            '/help': self.help,
+        }
+
+    def update(self, subscribers):
+        """Новый набор подписчиков, например после перезагрузки."""
+        chats = collections.defaultdict(list)
+        for subscriber in subscribers:
+            chats[str(subscriber.chat_id)].append(subscriber)
+        self.chats = chats
+
+    def handle(self, chat_id, text):
+        """Ответ на сообщение или None, если отвечать не нужно."""
+        if not text.startswith('/'):
+            return None
+        command = text.split(maxsplit=1)[0].split('@', 1)[0].lower()
+        subscribers = self.chats.get(str(chat_id))
+        if not subscribers:
+            return 'Этот чат не подписан на уведомления.'
+        action = self.commands.get(command, self.help)
+        return action(subscribers)
+
+    def verdict(self, status):
+        """Человекочитаемый статус работы."""
+        return self.verdicts.get(status, status)
+
+    def status(self, subscribers):
+        """Текущие статусы всех работ чата."""
+        lines = [
+            f'{name}: {self.verdict(status)}'
+            for subscriber in subscribers
+            for name, status in subscriber.homeworks.items()]
+        if not lines:
+            return 'Пока нет данных о работах, проверю API позже.'
+        return '\n'.join(lines)
+
+    def history(self, subscribers):
+        """Последние изменения статусов, от старых к новым."""
+        events = sorted(
+            event
+            for subscriber in subscribers
+            for event in list(subscriber.history))
+        if not events:
+            return 'Статусы работ ещё не менялись.'
+        return '\n'.join(
+            f'{time.strftime("%d-%m-%Y %H:%M", time.localtime(changed_at))} '
+            f'{name}: {self.verdict(status)}'
+            for changed_at, name, status in events)
+
+    def pause(self, subscribers):
+        """Переключаем паузу опроса для чата."""
+        paused = not subscribers[0].paused
+        for subscriber in subscribers:
+            subscriber.paused = paused
+        if paused:
+            return 'Уведомления приостановлены, /pause — возобновить.'
+        return 'Уведомления возобновлены.'
+
+    def help(self, subscribers):
+        """Список команд."""
+        return HELP
+
+
+class UpdatePoller:
+    """Long polling getUpdates в отдельном потоке.
+
+    Ответ уходит напрямую через bot, минуя очередь исходящих сообщений:
+    пользователь ждёт его сразу, а очередь держит паузу между
+    сообщениями в один чат.
+    """
+
+    def __init__(self, bot, handler, timeout=30, retry_delay=5):
+        self.bot = bot
+        self.handler = handler
+        self.timeout = timeout
+        self.retry_delay = retry_delay
+        self.offset = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def poll_once(self):
+        """Забираем новые сообщения и отвечаем на команды."""
+        updates = self.bot.get_updates(
+            offset=self.offset, timeout=self.timeout,
+            allowed_updates=['message'])
+        for update in updates:
+            self.offset = update.update_id + 1
+            message = update.effective_message
+            if message is None or not message.text:
+                continue
+            reply = self.handler.handle(message.chat_id, message.text)
+            if reply is not None:
+                self.bot.send_message(message.chat_id, reply)
+        return len(updates)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+            except Exception as error:
+                logger.error(f'Не удалось получить команды: {error}')
+                self._stop.wait(self.retry_delay)
+
+    def start(self):
+        """Запускаем поток приёма команд."""
+        self._thread = threading.Thread(
+            target=self._run, name='commands', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Останавливаем приём после текущего long poll."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
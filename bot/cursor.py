@@ -0,0 +1,82 @@
+import json
+import os
+import tempfile
+import threading
+import time
+
+
+class CursorStore:
+    """Курсоры from_date подписчиков в JSON-файле.
+
+    advance сдвигает курсор только в памяти; на диск курсоры попадают
+    через commit не чаще раза в flush_interval секунд или через flush.
+    Файл перезаписывается атомарно: данные пишутся во временный файл
+    рядом, сбрасываются на диск и заменяют старый через os.replace.
+    """
+
+    def __init__(self, path, flush_interval=0, clock=time.monotonic):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.clock = clock
+        self.cursors = {}
+        self._dirty = False
+        self._flushed_at = float('-inf')
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as cursor_file:
+                self.cursors = json.load(cursor_file)
+
+    def get(self, key, default=None):
+        """Сохранённый курсор подписчика."""
+        return self.cursors.get(key, default)
+
+    def advance(self, key, current_date):
+        """Сдвигаем курсор вперёд, назад он не двигается."""
+        with self._lock:
+            if current_date <= self.cursors.get(key, 0):
+                return False
+            self.cursors[key] = current_date
+            self._dirty = True
+        return True
+
+    def due(self):
+        """Есть ли незаписанные курсоры и прошёл ли flush_interval."""
+        return (self._dirty
+                and self.clock() - self._flushed_at >= self.flush_interval)
+
+    def commit(self):
+        """Записываем курсоры, если пора; True, если записали."""
+        if not self.due():
+            return False
+        self.flush()
+        return True
+
+    def flush(self):
+        """Атомарно записываем курсоры на диск."""
+        with self._write_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                snapshot = dict(self.cursors)
+                self._dirty = False
+                self._flushed_at = self.clock()
+            try:
+                self._write(snapshot)
+            except BaseException:
+                self._dirty = True
+                raise
+
+    def _write(self, cursors):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        descriptor, tmp_path = tempfile.mkstemp(
+            dir=directory, prefix='.cursor-', suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'w', encoding='utf-8') as tmp_file:
+                json.dump(cursors, tmp_file)
+                tmp_file.flush()
+                os.fsync(tmp_file.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
@@ -0,0 +1,31 @@
+class TheAnswerIsNot200Error(Exception):
+    """Ответ сервера не равен 200."""
+
+    def __init__(self, message, retry_after=None, status_code=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.status_code = status_code
+
+
+class EmptyDictionaryOrListError(Exception):
+    """Пустой словарь или список."""
+
+
+class UndocumentedStatusError(Exception):
+    """Недокументированный статус."""
+
+
+class RequestExceptionError(Exception):
+    """Ошибка запроса."""
+
+
+class CircuitOpenError(Exception):
+    """Зависимость недоступна, вызов пропущен предохранителем."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RespError(Exception):
+    """Ошибка в ответе Redis."""
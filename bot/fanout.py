@@ -0,0 +1,256 @@
+import asyncio
+import collections
+import concurrent.futures
+import logging
+import threading
+import time
+
+from bot.outbound import RateLimit
+
+logger = logging.getLogger(__name__)
+
+SENT = 'sent'
+DUPLICATE = 'duplicate'
+FAILED = 'failed'
+
+
+class Delivery:
+    """Итог отправки одного сообщения в один чат."""
+
+    __slots__ = ('chat_id', 'status', 'error', 'attempts')
+
+    def __init__(self, chat_id, status=None, error=None):
+        self.chat_id = chat_id
+        self.status = status
+        self.error = error
+        self.attempts = 0
+
+    def __repr__(self):
+        return (
+            f'Delivery(chat_id={self.chat_id!r}, status={self.status!r}, '
+            f'attempts={self.attempts})')
+
+
+class FanOut:
+    """Рассылка одного текста во много чатов параллельно.
+
+    Отправки идут в workers потоков (или корутин в broadcast_async), но
+    не чаще global_rate в секунду на всего бота и per_chat_interval на
+    чат — это лимиты Telegram. Одинаковый текст в один чат в течение
+    dedup_window секунд уходит один раз, повтор получает статус
+    duplicate. Ошибка с retry_after (RetryAfter, разомкнутая цепь)
+    приостанавливает всю рассылку на эту паузу и повторяется до
+    max_retries попыток, остальные ошибки сразу дают failed.
+
+    send(chat_id, text) — функция для broadcast и submit и корутина
+    для broadcast_async. rate — RateLimit, общий с OutboundQueue того же
+    бота; без него у рассылки свой лимит global_rate. С outbox каждая
+    копия пишется в журнал при постановке в рассылку и подтверждается
+    только после отправки; неотправленные досылаются из журнала при
+    следующем запуске.
+    """
+
+    def __init__(self, send, global_rate=30, per_chat_interval=1.0,
+                 workers=8, max_retries=3, dedup_window=60,
+                 dedup_size=100_000, rate=None, outbox=None,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.send = send
+        self.outbox = outbox
+        self.rate = rate or RateLimit(global_rate, clock)
+        self.per_chat_interval = per_chat_interval
+        self.workers = workers
+        self.max_retries = max_retries
+        self.dedup_window = dedup_window
+        self.dedup_size = dedup_size
+        self.clock = clock
+        self.sleep = sleep
+        self.stats = collections.Counter()
+        self._recent = collections.OrderedDict()
+        self._ready_at = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._tasks = set()
+
+    def claim(self, chat_id, text):
+        """Отмечаем текст для чата; False, если он недавно уже был."""
+        key = (chat_id, text)
+        now = self.clock()
+        with self._lock:
+            recent = self._recent
+            while recent:
+                oldest, claimed_at = next(iter(recent.items()))
+                if (len(recent) < self.dedup_size
+                        and now - claimed_at < self.dedup_window):
+                    break
+                del recent[oldest]
+            if key in recent:
+                self.stats[DUPLICATE] += 1
+                return False
+            recent[key] = now
+            return True
+
+    def release(self, chat_id, text):
+        """Снимаем отметку, чтобы неотправленный текст можно было повторить."""
+        with self._lock:
+            self._recent.pop((chat_id, text), None)
+
+    def _reserve(self, chat_id):
+        """Пауза до отправки и занято ли уже окно для неё.
+
+        Сначала ждём, пока освободится чат, и только потом занимаем
+        общее окно, чтобы ожидание одного чата не задерживало другие.
+        """
+        now = self.clock()
+        with self._lock:
+            ready_at = self._ready_at.get(chat_id, 0.0)
+            if ready_at > now:
+                return ready_at - now, False
+            delay = self.rate.reserve()
+            self._ready_at[chat_id] = now + delay + self.per_chat_interval
+        return delay, True
+
+    def _failed(self, delivery, text, error):
+        """Пауза перед повтором или None, если попытки кончились."""
+        retry_after = getattr(error, 'retry_after', None)
+        if retry_after is not None and delivery.attempts < self.max_retries:
+            self.stats['retried'] += 1
+            self.rate.postpone(retry_after)
+            return retry_after
+        delivery.status, delivery.error = FAILED, error
+        self.stats[FAILED] += 1
+        self.release(delivery.chat_id, text)
+        logger.error(
+            f'Сообщение в чат {delivery.chat_id} не отправлено: {error!r}')
+        return None
+
+    def _sent(self, delivery, ref):
+        delivery.status = SENT
+        self.stats[SENT] += 1
+        if ref is not None:
+            self.outbox.ack([ref])
+        return delivery
+
+    def deliver(self, chat_id, text, ref=None):
+        """Отправка в один чат с ожиданием лимитов и повторами.
+
+        ref — запись копии в outbox, она подтверждается после отправки.
+        """
+        delivery = Delivery(chat_id)
+        while True:
+            reserved = False
+            while not reserved:
+                delay, reserved = self._reserve(chat_id)
+                if delay > 0:
+                    self.sleep(delay)
+            delivery.attempts += 1
+            try:
+                self.send(chat_id, text)
+            except Exception as error:
+                if self._failed(delivery, text, error) is None:
+                    return delivery
+                continue
+            return self._sent(delivery, ref)
+
+    async def deliver_async(self, chat_id, text, ref=None):
+        """То же, что deliver, для корутины send."""
+        delivery = Delivery(chat_id)
+        while True:
+            reserved = False
+            while not reserved:
+                delay, reserved = self._reserve(chat_id)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            delivery.attempts += 1
+            try:
+                await self.send(chat_id, text)
+            except Exception as error:
+                if self._failed(delivery, text, error) is None:
+                    return delivery
+                continue
+            return self._sent(delivery, ref)
+
+    def _split(self, chat_ids, text):
+        """Чаты к отправке с записями в outbox и итоги для повторов."""
+        targets, duplicates = {}, {}
+        for chat_id in dict.fromkeys(map(str, chat_ids)):
+            if not self.claim(chat_id, text):
+                duplicates[chat_id] = Delivery(chat_id, DUPLICATE)
+            elif self.outbox is None:
+                targets[chat_id] = None
+            else:
+                targets[chat_id] = self.outbox.add(chat_id, text)
+        return targets, duplicates
+
+    def submit(self, chat_ids, text):
+        """Ставим рассылку в пул потоков: {чат: Future с Delivery}."""
+        targets, duplicates = self._split(chat_ids, text)
+        futures = {}
+        for chat_id, delivery in duplicates.items():
+            futures[chat_id] = concurrent.futures.Future()
+            futures[chat_id].set_result(delivery)
+        if targets and self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = concurrent.futures.ThreadPoolExecutor(
+                        self.workers, thread_name_prefix='telegram-fanout')
+        for chat_id, ref in targets.items():
+            futures[chat_id] = self._executor.submit(
+                self.deliver, chat_id, text, ref)
+        return futures
+
+    def broadcast(self, chat_ids, text):
+        """Рассылаем и ждём итогов: {чат: Delivery}."""
+        return {
+            chat_id: future.result()
+            for chat_id, future in self.submit(chat_ids, text).items()}
+
+    async def broadcast_async(self, chat_ids, text):
+        """Рассылка корутинами, не больше workers отправок сразу."""
+        targets, results = self._split(chat_ids, text)
+        return await self._deliver_all(targets, text, results)
+
+    async def _deliver_all(self, targets, text, results):
+        semaphore = asyncio.Semaphore(self.workers)
+
+        async def deliver(chat_id, ref):
+            async with semaphore:
+                return await self.deliver_async(chat_id, text, ref)
+
+        for delivery in await asyncio.gather(
+                *(deliver(chat_id, ref) for chat_id, ref in targets.items())):
+            results[delivery.chat_id] = delivery
+        return results
+
+    def submit_async(self, chat_ids, text):
+        """Запускаем рассылку корутинами отдельной задачей, не дожидаясь её.
+
+        Копии попадают в outbox сразу, отправка идёт в задаче. Ссылка на
+        задачу хранится до её завершения, чтобы цикл событий не потерял
+        её; дождаться оставшихся можно через close_async.
+        """
+        targets, results = self._split(chat_ids, text)
+        task = asyncio.get_running_loop().create_task(
+            self._deliver_all(targets, text, results))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def close_async(self, timeout=None):
+        """Дожидаемся задач submit_async не дольше timeout секунд."""
+        if not self._tasks:
+            return True
+        _, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+        for task in pending:
+            task.cancel()
+        return not pending
+
+    def close(self, timeout=None):
+        """Дожидаемся начатых рассылок не дольше timeout секунд."""
+        executor, self._executor = self._executor, None
+        if executor is None:
+            return True
+        executor.shutdown(wait=False)
+        waiter = threading.Thread(target=executor.shutdown)
+        waiter.start()
+        waiter.join(timeout)
+        return not waiter.is_alive()
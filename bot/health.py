@@ -0,0 +1,84 @@
+import threading
+import time
+
+
+class Health:
+    """Живость и готовность воркера для проверок платформы.
+
+    Процесс жив, пока ни один опрос не висит дольше stale_after секунд.
+    Готов — если запущен, не останавливается и успешно опрашивал API не
+    дольше stale_after секунд назад; до первого успешного опроса отсчёт
+    идёт от запуска.
+    """
+
+    def __init__(self, stale_after=1800, clock=time.time):
+        self.stale_after = stale_after
+        self.clock = clock
+        self.started_at = None
+        self.stopping_at = None
+        self.last_poll = None
+        self.polls = 0
+        self._busy = {}
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Подписчики загружены, начинаем опрос."""
+        self.started_at = self.clock()
+
+    def stop(self):
+        """Запрошена остановка."""
+        if self.stopping_at is None:
+            self.stopping_at = self.clock()
+
+    def time_left(self, timeout):
+        """Сколько секунд из timeout осталось с момента остановки."""
+        if self.stopping_at is None:
+            return timeout
+        return max(timeout - (self.clock() - self.stopping_at), 0.0)
+
+    def polled(self):
+        """Успешный ответ API."""
+        self.last_poll = self.clock()
+        self.polls += 1
+
+    def watch(self, function):
+        """Обёртка, которая отмечает время начала каждого вызова."""
+        def watched(*args):
+            ident = threading.get_ident()
+            with self._lock:
+                self._busy[ident] = self.clock()
+            try:
+                return function(*args)
+            finally:
+                with self._lock:
+                    del self._busy[ident]
+
+        return watched
+
+    def live(self):
+        """Ни один опрос не завис."""
+        now = self.clock()
+        with self._lock:
+            started = list(self._busy.values())
+        return all(now - since < self.stale_after for since in started)
+
+    def ready(self):
+        """Процесс опрашивает API и не останавливается."""
+        if self.started_at is None or self.stopping_at is not None:
+            return False
+        since = self.last_poll or self.started_at
+        return self.clock() - since < self.stale_after
+
+    def report(self):
+        """Состояние для /healthz и /readyz."""
+        now = self.clock()
+        return {
+            'live': self.live(),
+            'ready': self.ready(),
+            'stopping': self.stopping_at is not None,
+            'started_at': self.started_at,
+            'last_poll': self.last_poll,
+            'last_poll_age': (
+                None if self.last_poll is None else now - self.last_poll),
+            'polls': self.polls,
+        }
@@ -0,0 +1,212 @@
+"""История статусов работ и время проверки.
+
+Запуск: python -m bot.history [путь к базе] [--percentiles 50,90,99]
+"""
+import argparse
+import datetime
+import math
+import sqlite3
+import time
+
+VERDICTS = ('approved', 'rejected')
+BUCKET_GROWTH = 1.05
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transitions (
+    id INTEGER PRIMARY KEY,
+    subscriber TEXT NOT NULL,
+    homework TEXT NOT NULL,
+    status TEXT NOT NULL,
+    changed_at REAL NOT NULL,
+    comment TEXT,
+    UNIQUE (subscriber, homework, status, changed_at)
+);
+CREATE INDEX IF NOT EXISTS transitions_homework
+    ON transitions (homework, changed_at);
+CREATE TABLE IF NOT EXISTS open_reviews (
+    subscriber TEXT NOT NULL,
+    homework TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    PRIMARY KEY (subscriber, homework)
+);
+CREATE TABLE IF NOT EXISTS reviews (
+    id INTEGER PRIMARY KEY,
+    subscriber TEXT NOT NULL,
+    homework TEXT NOT NULL,
+    verdict TEXT NOT NULL,
+    finished_at REAL NOT NULL,
+    duration REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reviews_duration ON reviews (verdict, duration);
+CREATE TABLE IF NOT EXISTS turnaround_buckets (
+    verdict TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (verdict, bucket)
+) WITHOUT ROWID;
+"""
+
+
+def bucket_of(duration):
+    """Номер логарифмической корзины: ширина корзины — 5% значения."""
+    return int(math.log(max(duration, 1.0), BUCKET_GROWTH))
+
+
+def bucket_bound(bucket):
+    """Верхняя граница корзины в секундах."""
+    return BUCKET_GROWTH ** (bucket + 1)
+
+
+def parse_timestamp(value, default):
+    """Время из date_updated API или default, если разобрать не вышло."""
+    if not value:
+        return default
+    try:
+        moment = datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except (TypeError, ValueError):
+        return default
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=datetime.timezone.utc)
+    return moment.timestamp()
+
+
+def percentile_of_buckets(buckets, total, fraction):
+    """Перцентиль по отсортированным парам (корзина, количество)."""
+    rank = max(1, math.ceil(total * fraction))
+    seen = 0
+    for bucket, count in buckets:
+        seen += count
+        if seen >= rank:
+            return bucket_bound(bucket)
+    return None
+
+
+class TransitionStore:
+    """Переходы статусов работ в SQLite.
+
+    Каждый переход пишется в transitions. Начало проверки (reviewing)
+    запоминается в open_reviews, а вердикт закрывает её: длительность
+    попадает в reviews и в счётчик логарифмической корзины. Перцентили
+    считаются по сотням корзин, а не по всем строкам, поэтому время
+    запроса не зависит от размера истории; погрешность — ширина корзины.
+    """
+
+    def __init__(self, path=':memory:'):
+        self.path = path
+        self.connection = sqlite3.connect(
+            path, timeout=30, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript(SCHEMA)
+        self.connection.commit()
+
+    def record(self, subscriber, homework, status, changed_at, comment=None):
+        """Сохраняем переход; повтор того же перехода игнорируется."""
+        with self.connection:
+            return self._record(
+                subscriber, homework, status, changed_at, comment)
+
+    def record_many(self, transitions):
+        """Сохраняем пачку переходов одной транзакцией."""
+        with self.connection:
+            return sum(
+                self._record(*transition) for transition in transitions)
+
+    def _record(self, subscriber, homework, status, changed_at, comment=None):
+        execute = self.connection.execute
+        inserted = execute(
+            'INSERT OR IGNORE INTO transitions '
+            '(subscriber, homework, status, changed_at, comment) '
+            'VALUES (?, ?, ?, ?, ?)',
+            (subscriber, homework, status, changed_at, comment)).rowcount
+        if not inserted:
+            return 0
+        if status == 'reviewing':
+            execute(
+                'INSERT OR IGNORE INTO open_reviews '
+                '(subscriber, homework, started_at) VALUES (?, ?, ?)',
+                (subscriber, homework, changed_at))
+        elif status in VERDICTS:
+            self._close_review(subscriber, homework, status, changed_at)
+        return 1
+
+    def _close_review(self, subscriber, homework, verdict, finished_at):
+        execute = self.connection.execute
+        row = execute(
+            'DELETE FROM open_reviews WHERE subscriber = ? AND homework = ? '
+            'RETURNING started_at', (subscriber, homework)).fetchone()
+        if row is None:
+            return
+        duration = max(finished_at - row[0], 0.0)
+        execute(
+            'INSERT INTO reviews '
+            '(subscriber, homework, verdict, finished_at, duration) '
+            'VALUES (?, ?, ?, ?, ?)',
+            (subscriber, homework, verdict, finished_at, duration))
+        execute(
+            'INSERT INTO turnaround_buckets (verdict, bucket, count) '
+            'VALUES (?, ?, 1) ON CONFLICT (verdict, bucket) '
+            'DO UPDATE SET count = count + 1',
+            (verdict, bucket_of(duration)))
+
+    def percentiles(self, fractions, verdict=None):
+        """Приближённые перцентили времени проверки по корзинам."""
+        query = 'SELECT bucket, SUM(count) FROM turnaround_buckets'
+        params = ()
+        if verdict is not None:
+            query += ' WHERE verdict = ?'
+            params = (verdict,)
+        buckets = self.connection.execute(
+            query + ' GROUP BY bucket ORDER BY bucket', params).fetchall()
+        total = sum(count for _, count in buckets)
+        return total, {
+            fraction: percentile_of_buckets(buckets, total, fraction)
+            for fraction in fractions}
+
+    def exact_percentile(self, fraction, verdict):
+        """Точный перцентиль по индексу reviews, для сверки."""
+        total = self.connection.execute(
+            'SELECT COUNT(*) FROM reviews WHERE verdict = ?',
+            (verdict,)).fetchone()[0]
+        if not total:
+            return None
+        row = self.connection.execute(
+            'SELECT duration FROM reviews WHERE verdict = ? '
+            'ORDER BY duration LIMIT 1 OFFSET ?',
+            (verdict, max(1, math.ceil(total * fraction)) - 1)).fetchone()
+        return row[0]
+
+    def close(self):
+        """Закрываем соединение."""
+        self.connection.close()
+
+
+def format_duration(seconds):
+    """Длительность в часах и минутах."""
+    if seconds is None:
+        return '—'
+    minutes = int(seconds // 60)
+    return f'{minutes // 60} ч {minutes % 60:02d} мин'
+
+
+def main(argv=None):
+    """Перцентили времени проверки по вердиктам."""
+    parser = argparse.ArgumentParser(description='Время проверки работ')
+    parser.add_argument('path', nargs='?', default='history.db')
+    parser.add_argument('--percentiles', default='50,90,99')
+    args = parser.parse_args(argv)
+    fractions = [
+        float(value) / 100 for value in args.percentiles.split(',')]
+    store = TransitionStore(args.path)
+    started = time.perf_counter()
+    for verdict in (None, *VERDICTS):
+        total, values = store.percentiles(fractions, verdict)
+        summary = ', '.join(
+            f'p{fraction * 100:g}: {format_duration(value)}'
+            for fraction, value in values.items())
+        print(f'{verdict or "все"}: проверок {total}; {summary}')
+    print(f'Посчитано за {time.perf_counter() - started:.3f} с')
+    store.close()
+
+
+if __name__ == '__main__':
+    main()
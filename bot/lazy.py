@@ -0,0 +1,68 @@
+import importlib.util
+import sys
+import threading
+import types
+
+_PENDING = {}
+_LOADING = set()
+
+
+class _LazyModule(types.ModuleType):
+    """Модуль, код которого выполнится при первом обращении к атрибуту."""
+
+    def __getattribute__(self, attribute):
+        _load(self)
+        return types.ModuleType.__getattribute__(self, attribute)
+
+    def __setattr__(self, attribute, value):
+        _load(self)
+        types.ModuleType.__setattr__(self, attribute, value)
+
+    def __delattr__(self, attribute):
+        _load(self)
+        types.ModuleType.__delattr__(self, attribute)
+
+
+def _load(module):
+    """Выполняем код модуля один раз, остальные потоки ждут на замке.
+
+    importlib.util.LazyLoader в Python 3.11 не защищён от гонки: второй
+    поток мог увидеть наполовину выполненный модуль. Поток, который
+    загружает модуль, во время загрузки обращается к нему напрямую.
+    """
+    name = object.__getattribute__(module, '__dict__')['__name__']
+    pending = _PENDING.get(name)
+    if pending is None:
+        return
+    lock, loader = pending
+    with lock:
+        if name not in _PENDING or name in _LOADING:
+            return
+        _LOADING.add(name)
+        try:
+            loader.exec_module(module)
+            module.__class__ = types.ModuleType
+            del _PENDING[name]
+        finally:
+            _LOADING.discard(name)
+
+
+def lazy_import(name):
+    """Модуль, который загрузится при первом обращении к атрибуту.
+
+    Модуль сразу попадает в sys.modules, поэтому обычный import в другом
+    месте вернёт тот же объект и загрузит его. Уже загруженный модуль
+    возвращается как есть.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    module = importlib.util.module_from_spec(spec)
+    _PENDING[name] = (threading.RLock(), spec.loader)
+    module.__class__ = _LazyModule
+    sys.modules[name] = module
+    parent, _, child = name.rpartition('.')
+    if parent:
+        setattr(sys.modules[parent], child, module)
+    return module
@@ -0,0 +1,119 @@
+import atexit
+import datetime
+import json
+import logging
+import logging.handlers
+import queue
+import time
+
+FORMAT = '%(asctime)s - %(levelname)s - %(message)s - %(name)s'
+STRUCTURED_FIELDS = ('subscriber', 'homework', 'latency')
+
+
+class SizeAndTimeRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Ротация лога по размеру и по времени, что наступит раньше.
+
+    Файл открывается на дозапись, поэтому лог прошлого запуска не
+    теряется; старые части хранятся как program.log.1 … .backup_count.
+    """
+
+    def __init__(self, filename, max_bytes=10 * 2 ** 20,
+                 interval=24 * 60 * 60, backup_count=7,
+                 encoding='utf-8', clock=time.time):
+        super().__init__(
+            filename, maxBytes=max_bytes, backupCount=backup_count,
+            encoding=encoding)
+        self.interval = interval
+        self.clock = clock
+        self.rollover_at = clock() + interval
+
+    def shouldRollover(self, record):
+        """Пора ли начинать новый файл."""
+        if self.interval and self.clock() >= self.rollover_at:
+            return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self):
+        """Переименовываем файлы и планируем следующую ротацию."""
+        super().doRollover()
+        self.rollover_at = self.clock() + self.interval
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна JSON-строка на запись со структурированными полями."""
+
+    def format(self, record):
+        """Запись в виде JSON."""
+        data = {
+            'time': datetime.datetime.fromtimestamp(
+                record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                data[field] = value
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler, который не форматирует запись в вызывающем потоке.
+
+    Стандартный prepare() форматирует сообщение и копирует запись до
+    постановки в очередь. Запись дальше никто не меняет, поэтому она
+    уходит в очередь как есть, а форматирует её поток QueueListener.
+    """
+
+    def prepare(self, record):
+        """Запись без форматирования."""
+        return record
+
+
+class BackgroundListener(logging.handlers.QueueListener):
+    """QueueListener, который можно останавливать повторно."""
+
+    def stop(self):
+        """Дописываем очередь и останавливаем поток, если он запущен."""
+        if self._thread is not None:
+            super().stop()
+
+
+def build_handlers(filename, json_lines=False, max_bytes=10 * 2 ** 20,
+                   interval=24 * 60 * 60, backup_count=7):
+    """Обработчики, которые работают в фоновом потоке."""
+    file_handler = SizeAndTimeRotatingFileHandler(
+        filename, max_bytes=max_bytes, interval=interval,
+        backup_count=backup_count)
+    file_handler.setFormatter(
+        JsonFormatter() if json_lines else logging.Formatter(FORMAT))
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(logging.INFO)
+    return [file_handler, console_handler]
+
+
+def setup_logging(filename, level=logging.DEBUG, json_lines=False,
+                  max_bytes=10 * 2 ** 20, interval=24 * 60 * 60,
+                  backup_count=7):
+    """Логирование через очередь: запись в файл в отдельном потоке.
+
+    Возвращает запущенный QueueListener; при выходе из процесса он
+    останавливается и дописывает очередь.
+    """
+    log_queue = queue.SimpleQueue()
+    listener = BackgroundListener(
+        log_queue,
+        *build_handlers(
+            filename, json_lines, max_bytes, interval, backup_count),
+        respect_handler_level=True)
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(DeferredQueueHandler(log_queue))
+    root.setLevel(level)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
@@ -0,0 +1,202 @@
+import bisect
+import functools
+import inspect
+import logging
+import threading
+import time
+
+from bot.tracing import TRACER
+
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0)
+
+logger = logging.getLogger(__name__)
+
+
+def format_labels(labels):
+    """Метки в формате Prometheus: {a="1",b="2"}."""
+    if not labels:
+        return ''
+    pairs = ','.join(
+        f'{key}="{value}"' for key, value in sorted(labels.items()))
+    return '{' + pairs + '}'
+
+
+class Counter:
+    """Монотонный счётчик."""
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        """Увеличиваем счётчик."""
+        with self._lock:
+            self.value += amount
+
+    def samples(self, name, labels):
+        """Строки для текстового формата Prometheus."""
+        yield f'{name}{format_labels(labels)} {self.value}'
+
+
+class Gauge:
+    """Значение, которое вычисляется функцией в момент чтения."""
+
+    def __init__(self, function):
+        self.function = function
+
+    def samples(self, name, labels):
+        """Строки для текстового формата Prometheus."""
+        try:
+            value = self.function()
+        except Exception as error:
+            logger.error(f'Ошибка метрики {name}: {error}')
+            return
+        yield f'{name}{format_labels(labels)} {value}'
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами корзин."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        """Добавляем наблюдение."""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def samples(self, name, labels):
+        """Строки для текстового формата Prometheus."""
+        cumulative = 0
+        bounds = [str(bound) for bound in self.buckets] + ['+Inf']
+        for bound, count in zip(bounds, self.counts):
+            cumulative += count
+            bucket_labels = dict(labels, le=bound)
+            yield f'{name}_bucket{format_labels(bucket_labels)} {cumulative}'
+        yield f'{name}_sum{format_labels(labels)} {self.sum}'
+        yield f'{name}_count{format_labels(labels)} {self.count}'
+
+
+class Registry:
+    """Набор метрик, сгруппированных по имени."""
+
+    def __init__(self):
+        self._families = {}
+        self._lock = threading.Lock()
+
+    def _get(self, kind, name, help, labels, factory):
+        key = tuple(sorted((labels or {}).items()))
+        with self._lock:
+            family = self._families.setdefault(
+                name, {'type': kind, 'help': help, 'series': {}})
+            series = family['series']
+            if key not in series:
+                series[key] = factory()
+            return series[key]
+
+    def counter(self, name, help, labels=None):
+        """Счётчик с метками, создаётся при первом обращении."""
+        return self._get('counter', name, help, labels, Counter)
+
+    def histogram(self, name, help, labels=None, buckets=DEFAULT_BUCKETS):
+        """Гистограмма с метками, создаётся при первом обращении."""
+        return self._get(
+            'histogram', name, help, labels, lambda: Histogram(buckets))
+
+    def gauge(self, name, help, function, labels=None, kind='gauge'):
+        """Регистрируем функцию, значение которой отдаётся при чтении.
+
+        kind='counter' — для уже накопленных где-то счётчиков.
+        """
+        key = tuple(sorted((labels or {}).items()))
+        with self._lock:
+            family = self._families.setdefault(
+                name, {'type': kind, 'help': help, 'series': {}})
+            family['series'][key] = Gauge(function)
+
+    def render(self):
+        """Все метрики в текстовом формате Prometheus."""
+        lines = []
+        with self._lock:
+            families = [
+                (name, family, list(family['series'].items()))
+                for name, family in sorted(self._families.items())
+            ]
+        for name, family, series in families:
+            lines.append(f'# HELP {name} {family["help"]}')
+            lines.append(f'# TYPE {name} {family["type"]}')
+            for key, metric in series:
+                lines.extend(metric.samples(name, dict(key)))
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def instrument(function_name, registry=REGISTRY, tracer=TRACER):
+    """Декоратор: время вызова и ошибки по классам исключений.
+
+    На каждый вызов приходятся два perf_counter и одно observe, счётчик
+    ошибок ищется в реестре только при исключении. Если трассировка
+    включена, вызов записывается как span с именем function_name.
+    """
+    histogram = registry.histogram(
+        'homework_bot_call_duration_seconds',
+        'Время выполнения функций бота', {'function': function_name})
+
+    def count_error(error):
+        registry.counter(
+            'homework_bot_errors_total', 'Исключения по функциям и классам',
+            {'function': function_name,
+             'exception': type(error).__name__}).inc()
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    with tracer.span(function_name):
+                        return await func(*args, **kwargs)
+                except Exception as error:
+                    count_error(error)
+                    raise
+                finally:
+                    histogram.observe(time.perf_counter() - started)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                with tracer.span(function_name):
+                    return func(*args, **kwargs)
+            except Exception as error:
+                count_error(error)
+                raise
+            finally:
+                histogram.observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def serve(port, host='127.0.0.1', registry=REGISTRY, health=None):
+    """Запускаем HTTP-сервер метрик в фоновом потоке.
+
+    С health сервер отвечает и на /healthz, /readyz. http.server
+    загружается только здесь, а не при импорте модуля.
+    """
+    from bot.metrics_http import start_server
+
+    server = start_server(port, host, registry, health)
+    logger.info(f'Метрики доступны на http://{host}:{port}/metrics')
+    return server
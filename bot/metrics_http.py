@@ -0,0 +1,47 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Обработчик запросов к /metrics и проверкам /healthz, /readyz."""
+
+    def log_message(self, format, *args):
+        """Не пишем каждый запрос в лог."""
+        return None
+
+    def do_GET(self):
+        """Отдаём метрики по /metrics и состояние по /healthz, /readyz."""
+        health = self.server.health
+        if self.path == '/metrics':
+            self.reply(
+                200, self.server.registry.render(),
+                'text/plain; version=0.0.4; charset=utf-8')
+        elif self.path in ('/healthz', '/readyz') and health is not None:
+            report = health.report()
+            ok = report['live' if self.path == '/healthz' else 'ready']
+            self.reply(
+                200 if ok else 503, json.dumps(report),
+                'application/json')
+        else:
+            self.send_error(404)
+
+    def reply(self, status, text, content_type):
+        """Ответ с телом text."""
+        body = text.encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_server(port, host, registry, health=None):
+    """HTTP-сервер метрик и проверок в фоновом потоке."""
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    server.registry = registry
+    server.health = health
+    threading.Thread(
+        target=server.serve_forever, name='metrics', daemon=True).start()
+    return server
@@ -0,0 +1,295 @@
+import collections
+import logging
+import threading
+import time
+
+from bot.exceptions import CircuitOpenError
+from bot.lazy import lazy_import
+from bot.metrics import REGISTRY
+from bot.tracing import TRACER
+
+telegram = lazy_import('telegram')
+
+MAX_MESSAGE_LENGTH = 4096
+SEPARATOR = '\n\n'
+
+logger = logging.getLogger(__name__)
+
+SEND_DURATION = REGISTRY.histogram(
+    'homework_bot_call_duration_seconds', 'Время выполнения функций бота',
+    {'function': 'telegram_send'})
+
+
+class RateLimit:
+    """Общий лимит отправок бота: окна через 1 / rate секунд.
+
+    Один объект делят все, кто пишет в Telegram от имени одного токена,
+    — очередь исходящих и рассылка по правилам, — чтобы вместе они не
+    превысили глобальный лимит Telegram.
+    """
+
+    def __init__(self, rate=30, clock=time.monotonic):
+        self.interval = 1 / rate if rate else 0
+        self.clock = clock
+        self.next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Занимаем ближайшее окно; возвращаем паузу до него."""
+        with self._lock:
+            now = self.clock()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        return slot - now
+
+    def postpone(self, delay):
+        """Не отправляем ничего delay секунд, например после RetryAfter."""
+        with self._lock:
+            self.next_slot = max(self.next_slot, self.clock() + delay)
+
+
+class OutboundQueue:
+    """Очередь исходящих сообщений Telegram с отдельным потоком отправки.
+
+    Повторяет интерфейс bot.send_message, поэтому подставляется вместо
+    бота в цикл опроса: вызов лишь кладёт сообщение в очередь. Сообщения
+    одному чату, накопившиеся к моменту отправки, склеиваются в одно.
+    Поток соблюдает лимиты Telegram на чат и на бота в целом и повторяет
+    отправку после RetryAfter с паузой от сервера и после сетевых ошибок.
+
+    С outbox каждое сообщение сначала пишется в журнал на диске и
+    удаляется из него только после подтверждения от Telegram. С breaker
+    отправка идёт через предохранитель: пока цепь разомкнута, поток ждёт
+    пробного вызова, не расходуя попытки. parse_mode передаётся в
+    sendMessage, тексты уже должны быть экранированы под него. rate —
+    общий с другими отправителями RateLimit, по умолчанию свой на
+    global_rate сообщений в секунду.
+    """
+
+    def __init__(self, bot, maxsize=1000, per_chat_interval=1.0,
+                 global_rate=30, max_retries=5, network_retry_delay=5,
+                 outbox=None, breaker=None, parse_mode=None, rate=None,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.bot = bot
+        self.options = {} if parse_mode is None else {
+            'parse_mode': parse_mode}
+        self.outbox = outbox
+        self.breaker = breaker
+        self.network_retry_delay = network_retry_delay
+        self.maxsize = maxsize
+        self.per_chat_interval = per_chat_interval
+        self.rate = rate or RateLimit(global_rate, clock)
+        self.global_interval = self.rate.interval
+        self.max_retries = max_retries
+        self.clock = clock
+        self.sleep = sleep
+        self.stats = collections.Counter()
+        self.latencies = collections.deque(maxlen=10_000)
+        self._pending = collections.OrderedDict()
+        self._size = 0
+        self._overflow = collections.deque()
+        self._last_sent = {}
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._thread = None
+
+    def __len__(self):
+        return self._size + len(self._overflow)
+
+    def send_message(self, chat_id, text):
+        """Ставим сообщение в очередь.
+
+        Если в памяти уже maxsize сообщений, с outbox сообщение остаётся
+        только в журнале и встанет в очередь, когда она освободится; без
+        outbox оно отбрасывается.
+        """
+        with self._condition:
+            full = self._overflow or self._size >= self.maxsize
+            if full and self.outbox is None:
+                self.stats['dropped'] += 1
+                logger.error(
+                    f'Очередь Telegram переполнена, сообщение '
+                    f'для {chat_id} отброшено: {text}')
+                return False
+            ref = (
+                self.outbox.add(chat_id, text)
+                if self.outbox is not None else None)
+            if full:
+                self._overflow.append(ref)
+                self.stats['deferred'] += 1
+            else:
+                self._enqueue(chat_id, text, ref)
+            self.stats['queued'] += 1
+            self._condition.notify()
+        return True
+
+    def _enqueue(self, chat_id, text, ref):
+        self._pending.setdefault(chat_id, []).append(
+            (text, self.clock(), ref))
+        self._size += 1
+
+    def replay(self):
+        """Возвращаем в очередь неподтверждённые сообщения из outbox."""
+        if self.outbox is None:
+            return 0
+        pending = self.outbox.pending()
+        with self._condition:
+            self._overflow.extend(ref for ref, _, _ in pending)
+            self._refill()
+            self._condition.notify()
+        if pending:
+            logger.info(
+                f'Из outbox восстановлено сообщений: {len(pending)}')
+        return len(pending)
+
+    def flush(self):
+        """Фиксируем на диске сообщения, поставленные в очередь."""
+        if self.outbox is not None:
+            self.outbox.flush()
+
+    def start(self):
+        """Запускаем поток отправки."""
+        self._thread = threading.Thread(
+            target=self._run, name='telegram-outbound', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Досылаем очередь и останавливаем поток, ждём не дольше timeout."""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return len(self) == 0
+
+    def _refill(self):
+        """Переносим в очередь сообщения, ждавшие места в outbox."""
+        while self._overflow and self._size < self.maxsize:
+            ref = self._overflow.popleft()
+            message = self.outbox.message(ref)
+            if message is not None:
+                self._enqueue(*message, ref)
+
+    def _ready_chat(self, now):
+        """Первый чат, которому уже можно писать, или пауза до него."""
+        wait = None
+        for chat_id in self._pending:
+            ready_at = max(
+                self._last_sent.get(chat_id, float('-inf'))
+                + self.per_chat_interval,
+                self.rate.next_slot)
+            if ready_at <= now:
+                return chat_id, 0
+            if wait is None or ready_at - now < wait:
+                wait = ready_at - now
+        return None, wait
+
+    def _take(self, chat_id):
+        """Забираем сообщения чата, сколько влезет в одно сообщение."""
+        items = self._pending[chat_id]
+        length = len(items[0][0])
+        count = 1
+        while count < len(items):
+            length += len(SEPARATOR) + len(items[count][0])
+            if length > MAX_MESSAGE_LENGTH:
+                break
+            count += 1
+        taken, rest = items[:count], items[count:]
+        if rest:
+            self._pending[chat_id] = rest
+        else:
+            del self._pending[chat_id]
+        self._size -= count
+        return taken
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._refill()
+                while not self._pending and not self._stopping:
+                    self._condition.wait()
+                if not self._pending:
+                    return
+                chat_id, wait = self._ready_chat(self.clock())
+                if chat_id is None:
+                    self._condition.wait(wait)
+                    continue
+                items = self._take(chat_id)
+            self.flush()
+            self._deliver(chat_id, items)
+
+    def _ack(self, items):
+        if self.outbox is not None:
+            self.outbox.ack(ref for _, _, ref in items)
+
+    def _send(self, chat_id, text):
+        started = time.perf_counter()
+        try:
+            with TRACER.span('telegram_send', chat_id=chat_id):
+                if self.breaker is None:
+                    self.bot.send_message(chat_id, text, **self.options)
+                else:
+                    self.breaker.call(
+                        self.bot.send_message, chat_id, text, **self.options)
+        except Exception as error:
+            REGISTRY.counter(
+                'homework_bot_errors_total',
+                'Исключения по функциям и классам',
+                {'function': 'telegram_send',
+                 'exception': type(error).__name__}).inc()
+            raise
+        finally:
+            SEND_DURATION.observe(time.perf_counter() - started)
+
+    def _deliver(self, chat_id, items):
+        text = SEPARATOR.join(text for text, _, _ in items)
+        attempt = 0
+        while attempt < self.max_retries:
+            attempt += 1
+            delay = self.rate.reserve()
+            if delay > 0:
+                self.sleep(delay)
+            try:
+                self._send(chat_id, text)
+                break
+            except CircuitOpenError as circuit_error:
+                attempt -= 1
+                self.sleep(circuit_error.retry_after or self.global_interval)
+            except telegram.error.RetryAfter as retry:
+                self.stats['retried'] += 1
+                logger.warning(
+                    f'Telegram просит подождать {retry.retry_after} с')
+                self.rate.postpone(retry.retry_after)
+                self.sleep(retry.retry_after)
+            except (telegram.error.BadRequest,
+                    telegram.error.Unauthorized) as telegram_error:
+                self.stats['failed'] += len(items)
+                self._ack(items)
+                logger.error(
+                    f'Сообщение в Telegram не отправлено: {telegram_error}')
+                return
+            except telegram.error.NetworkError as network_error:
+                self.stats['retried'] += 1
+                logger.warning(
+                    f'Сетевая ошибка Telegram, повтор: {network_error}')
+                self.sleep(self.network_retry_delay * attempt)
+            except telegram.TelegramError as telegram_error:
+                self.stats['failed'] += len(items)
+                self._ack(items)
+                logger.error(
+                    f'Сообщение в Telegram не отправлено: {telegram_error}')
+                return
+        else:
+            self.stats['failed'] += len(items)
+            logger.error(
+                f'Сообщение в Telegram не отправлено после '
+                f'{self.max_retries} попыток: {text}')
+            return
+        self._ack(items)
+        sent_at = self.clock()
+        self._last_sent[chat_id] = sent_at
+        self.stats['sent'] += 1
+        self.stats['coalesced'] += len(items) - 1
+        self.latencies.extend(
+            sent_at - queued_at for _, queued_at, _ in items)
@@ -0,0 +1,132 @@
+import collections
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class Outbox:
+    """Журнал неотправленных сообщений на диске, только дозапись.
+
+    Каждая строка — JSON-запись add (новое сообщение) или ack (Telegram
+    подтвердил доставку). Записи копятся в буфере и сбрасываются на диск
+    одним fsync в flush(): все сообщения одного цикла опроса фиксируются
+    вместе. Когда подтверждённых записей становится больше, чем
+    ожидающих, журнал переписывается только с ожидающими.
+    """
+
+    def __init__(self, path, compact_threshold=1000):
+        self.path = path
+        self.compact_threshold = compact_threshold
+        self.stats = collections.Counter()
+        self._pending = {}
+        self._acked = 0
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._next_id = 1
+        if os.path.exists(path):
+            self._load()
+        self._file = open(path, 'ab')
+
+    def _load(self):
+        with open(self.path, 'rb') as log_file:
+            for line in log_file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    logger.warning(
+                        f'Повреждённая запись в {self.path} пропущена')
+                    continue
+                if record['op'] == 'add':
+                    self._pending[record['id']] = (
+                        record['chat_id'], record['text'])
+                    self._next_id = max(self._next_id, record['id'] + 1)
+                else:
+                    self._pending.pop(record['id'], None)
+                    self._acked += 1
+
+    def __len__(self):
+        return len(self._pending)
+
+    def pending(self):
+        """Ожидающие сообщения: (id, chat_id, text) в порядке добавления."""
+        with self._lock:
+            return [
+                (ref, chat_id, text)
+                for ref, (chat_id, text) in self._pending.items()
+            ]
+
+    def message(self, ref):
+        """Ожидающее сообщение (chat_id, text) или None, если доставлено."""
+        with self._lock:
+            return self._pending.get(ref)
+
+    def _write(self, record):
+        data = json.dumps(record, ensure_ascii=False).encode() + b'\n'
+        self._file.write(data)
+        self._dirty = True
+        self.stats['records'] += 1
+        self.stats['bytes_written'] += len(data)
+
+    def add(self, chat_id, text):
+        """Записываем сообщение, на диск оно попадёт при flush()."""
+        with self._lock:
+            ref = self._next_id
+            self._next_id += 1
+            self._pending[ref] = (chat_id, text)
+            self._write(
+                {'op': 'add', 'id': ref, 'chat_id': chat_id, 'text': text})
+            self.stats['payload_bytes'] += len(text.encode())
+            return ref
+
+    def ack(self, refs):
+        """Отмечаем сообщения доставленными."""
+        with self._lock:
+            for ref in refs:
+                if self._pending.pop(ref, None) is not None:
+                    self._write({'op': 'ack', 'id': ref})
+                    self._acked += 1
+            if (self._acked >= self.compact_threshold
+                    and self._acked > len(self._pending)):
+                self._compact()
+
+    def flush(self):
+        """Сбрасываем накопленные записи на диск одним fsync."""
+        with self._lock:
+            self._sync()
+
+    def _sync(self):
+        if not self._dirty:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._dirty = False
+        self.stats['fsyncs'] += 1
+
+    def _compact(self):
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'wb') as tmp_file:
+            for ref, (chat_id, text) in self._pending.items():
+                data = json.dumps(
+                    {'op': 'add', 'id': ref, 'chat_id': chat_id,
+                     'text': text},
+                    ensure_ascii=False).encode() + b'\n'
+                tmp_file.write(data)
+                self.stats['bytes_written'] += len(data)
+            tmp_file.flush()
+            os.fsync(tmp_file.fileno())
+        self._file.close()
+        os.replace(tmp_path, self.path)
+        self._file = open(self.path, 'ab')
+        self._acked = 0
+        self._dirty = False
+        self.stats['compactions'] += 1
+        self.stats['fsyncs'] += 1
+
+    def close(self):
+        """Сбрасываем буфер и закрываем журнал."""
+        with self._lock:
+            self._sync()
+            self._file.close()
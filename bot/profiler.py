@@ -0,0 +1,109 @@
+import collections
+import logging
+import os
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def frame_name(frame):
+    """Кадр стека: функция, файл и строка её начала."""
+    code = frame.f_code
+    return (
+        f'{code.co_name} ({os.path.basename(code.co_filename)}:'
+        f'{code.co_firstlineno})').replace(';', ':')
+
+
+class SamplingProfiler:
+    """Сэмплирующий профилировщик всех потоков процесса.
+
+    Пока он запущен, отдельный поток раз в interval секунд снимает
+    стеки остальных потоков через sys._current_frames и считает
+    одинаковые. После остановки стеки пишутся в файл в формате collapsed
+    stacks для flamegraph.pl и speedscope: строка «поток;кадр;...;кадр
+    количество». toggle() можно вызывать из обработчика сигнала.
+    """
+
+    def __init__(self, interval=0.005,
+                 path_template='profile-{pid}-{time}.folded'):
+        self.interval = interval
+        self.path_template = path_template
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self._thread = None
+        self._stopping = threading.Event()
+
+    @property
+    def running(self):
+        """Идёт ли сбор стеков."""
+        return self._thread is not None and not self._stopping.is_set()
+
+    def toggle(self):
+        """Запускаем сбор или останавливаем его и сохраняем файл."""
+        if self.running:
+            self.stop()
+        else:
+            self.start()
+
+    def start(self):
+        """Запускаем сбор стеков в отдельном потоке."""
+        if self.running:
+            return self
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(self._stopping,), name='profiler',
+            daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Останавливаем сбор; файл сохранит поток профилировщика."""
+        self._stopping.set()
+
+    def join(self, timeout=None):
+        """Ждём, пока файл профиля будет записан."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def sample(self):
+        """Один снимок стеков всех потоков, кроме профилировщика."""
+        own = threading.get_ident()
+        names = {
+            thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(frame_name(frame))
+                frame = frame.f_back
+            stack.append(names.get(ident, str(ident)))
+            self.stacks[';'.join(reversed(stack))] += 1
+        self.samples += 1
+
+    def dump(self, path=None):
+        """Пишем стеки в файл и возвращаем его путь."""
+        path = path or self.path_template.format(
+            pid=os.getpid(), time=time.strftime('%Y%m%d-%H%M%S'))
+        with open(path, 'w', encoding='utf-8') as profile:
+            for stack, count in self.stacks.most_common():
+                profile.write(f'{stack} {count}\n')
+        return path
+
+    def _run(self, stopping):
+        started = time.perf_counter()
+        logger.info('Профилировщик запущен')
+        while not stopping.wait(self.interval):
+            self.sample()
+        try:
+            path = self.dump()
+        except OSError as error:
+            logger.error(f'Профиль не сохранён: {error}')
+            return
+        logger.info(
+            f'Профиль за {time.perf_counter() - started:.1f} с, '
+            f'снимков {self.samples}: {path}')
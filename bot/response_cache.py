@@ -0,0 +1,81 @@
+import collections
+import hashlib
+import re
+
+CURRENT_DATE = re.compile(rb'"current_date"\s*:\s*(\d+)')
+
+STATS = collections.Counter()
+
+
+class ResponseCache:
+    """Данные прошлого ответа API для одного подписчика.
+
+    Если сервер отдаёт ETag или Last-Modified, следующий запрос будет
+    условным, и ответ 304 не скачивается и не разбирается. Иначе
+    сравнивается хеш тела ответа без поля current_date, которое меняется
+    при каждом запросе: совпадение значит, что работы те же и уже
+    обработаны, поэтому JSON не декодируется и не проверяется. Хеш
+    нужен только для сравнения, поэтому берётся быстрый SHA-1.
+    """
+
+    __slots__ = ('etag', 'last_modified', 'digest', 'current_date')
+
+    def __init__(self):
+        self.etag = None
+        self.last_modified = None
+        self.digest = None
+        self.current_date = None
+
+    def request_headers(self):
+        """Заголовки условного запроса."""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    @staticmethod
+    def _digest(content):
+        position = content.rfind(b'"current_date"')
+        match = None
+        if position >= 0:
+            match = CURRENT_DATE.match(content, position)
+        digest = hashlib.sha1(usedforsecurity=False)
+        if match is None:
+            digest.update(content)
+            return digest.digest(), None
+        view = memoryview(content)
+        digest.update(view[:match.start()])
+        digest.update(view[match.end():])
+        return digest.digest(), int(match.group(1))
+
+    def lookup(self, response):
+        """Ответ без работ, если данные не изменились, иначе None.
+
+        Пустой список работ обрабатывается дальше за O(1) и не даёт
+        уведомлений, а current_date сдвигает курсор как обычно.
+        """
+        STATS['polls'] += 1
+        if response.status_code == 304:
+            STATS['not_modified'] += 1
+            return {'homeworks': [], 'current_date': self.current_date}
+        content = getattr(response, 'content', None)
+        if response.status_code != 200 or content is None:
+            return None
+        digest, current_date = self._digest(content)
+        headers = getattr(response, 'headers', None) or {}
+        self.etag = headers.get('ETag')
+        self.last_modified = headers.get('Last-Modified')
+        if digest == self.digest:
+            STATS['short_circuited'] += 1
+            self.current_date = current_date
+            return {'homeworks': [], 'current_date': current_date}
+        self.digest = digest
+        self.current_date = current_date
+        STATS['parsed'] += 1
+        return None
+
+    def forget(self):
+        """Сбрасываем кеш, например после ошибки разбора ответа."""
+        self.etag = self.last_modified = self.digest = None
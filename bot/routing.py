@@ -0,0 +1,85 @@
+import fnmatch
+import json
+
+
+class Route:
+    """Правило: куда ещё отправить смену статуса работы.
+
+    subscribers — чаты подписчиков, чьи работы подходят, homeworks —
+    шаблоны названий работ в стиле fnmatch, statuses — статусы; пустое
+    условие подходит всем. title, если задан, ставится строкой перед
+    текстом, чтобы в общем чате было видно, чья это работа.
+    """
+
+    __slots__ = ('chats', 'subscribers', 'homeworks', 'statuses', 'title')
+
+    def __init__(self, chats, subscribers=(), homeworks=(), statuses=(),
+                 title=None):
+        self.chats = tuple(map(str, chats))
+        self.subscribers = frozenset(map(str, subscribers))
+        self.homeworks = tuple(homeworks)
+        self.statuses = frozenset(statuses)
+        self.title = title
+
+    def matches(self, subscriber, homework):
+        """Подходит ли правило работе подписчика."""
+        if self.subscribers and str(
+                subscriber.chat_id) not in self.subscribers:
+            return False
+        if self.statuses and homework.get('status') not in self.statuses:
+            return False
+        if not self.homeworks:
+            return True
+        name = homework.get('homework_name') or ''
+        return any(
+            fnmatch.fnmatchcase(name, pattern) for pattern in self.homeworks)
+
+    @classmethod
+    def from_dict(cls, rule):
+        """Правило из JSON; без chats оно бессмысленно."""
+        if not isinstance(rule, dict) or not rule.get('chats'):
+            raise ValueError(f'В правиле маршрутизации нет chats: {rule}')
+        return cls(
+            rule['chats'], rule.get('subscribers', ()),
+            rule.get('homeworks', ()), rule.get('statuses', ()),
+            rule.get('title'))
+
+
+class RoutingTable:
+    """Правила маршрутизации событий о работах по чатам.
+
+    Чат самого подписчика получает сообщение как раньше, правила лишь
+    добавляют чаты; один чат из нескольких правил получает сообщение
+    один раз, с title первого подошедшего правила.
+    """
+
+    def __init__(self, routes=()):
+        self.routes = list(routes)
+
+    def __len__(self):
+        return len(self.routes)
+
+    def destinations(self, subscriber, homework):
+        """Дополнительные чаты для работы: {чат: title или None}."""
+        own = str(subscriber.chat_id)
+        chats = {}
+        for route in self.routes:
+            if not route.matches(subscriber, homework):
+                continue
+            for chat_id in route.chats:
+                if chat_id != own and chat_id not in chats:
+                    chats[chat_id] = route.title
+        return chats
+
+    def replace(self, routes):
+        """Подменяем правила целиком, например после SIGHUP."""
+        self.routes = list(routes)
+
+
+def load_routes(path):
+    """Правила из JSON-файла: список объектов с chats и условиями."""
+    with open(path, encoding='utf-8') as file:
+        rules = json.load(file)
+    if not isinstance(rules, list):
+        raise ValueError(f'Правила маршрутизации в {path} — не список')
+    return [Route.from_dict(rule) for rule in rules]
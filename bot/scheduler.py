@@ -0,0 +1,196 @@
+import collections
+import email.utils
+import heapq
+import itertools
+import random
+import threading
+import time
+
+
+class FakeClock:
+    """Поддельные часы для тестов: sleep сдвигает время без ожидания."""
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        """Текущее время."""
+        return self.now
+
+    def sleep(self, seconds):
+        """Сдвигаем время вперёд."""
+        self.now += max(seconds, 0)
+
+
+def parse_retry_after(value, now=None):
+    """Секунды из заголовка Retry-After: число или HTTP-дата."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    now = time.time() if now is None else now
+    return max(date.timestamp() - now, 0.0)
+
+
+class RetryPolicy:
+    """Интервал до следующего опроса подписчика.
+
+    Пока есть работа на проверке, опрашиваем чаще (reviewing_interval).
+    После ошибок API интервал растёт экспоненциально до max_backoff,
+    со случайным разбросом jitter, и не меньше Retry-After от сервера.
+    """
+
+    def __init__(self, interval, reviewing_interval=None, max_backoff=None,
+                 factor=2, jitter=0.2, random=random.random):
+        self.interval = interval
+        self.reviewing_interval = reviewing_interval or interval
+        self.max_backoff = max_backoff or interval
+        self.factor = factor
+        self.jitter = jitter
+        self.random = random
+
+    def backoff(self, failures):
+        """Интервал после failures ошибок подряд, с разбросом."""
+        base = min(
+            self.max_backoff, self.interval * self.factor ** (failures - 1))
+        return base * (1 + self.jitter * (2 * self.random() - 1))
+
+    def delay(self, subscriber):
+        """Через сколько секунд опросить подписчика снова."""
+        if subscriber.failures:
+            return max(
+                self.backoff(subscriber.failures),
+                subscriber.retry_after or 0)
+        if subscriber.homeworks.has_status('reviewing'):
+            return self.reviewing_interval
+        return self.interval
+
+
+class PollScheduler:
+    """Планировщик опроса API для множества подписчиков в одном процессе.
+
+    Первые опросы равномерно распределены по интервалу, чтобы не
+    создавать пиков, дальше интервал для каждого подписчика выбирает
+    policy. Если задан owns, опрашиваются только подписчики, для
+    которых он истинен; остальные остаются в очереди на случай, если
+    перейдут к этому воркеру.
+
+    Без sleep ожидание до следующего опроса прерывается stop() и
+    call_soon(): функции из call_soon выполняются в потоке планировщика
+    между опросами, поэтому могут менять очередь и настройки.
+    """
+
+    def __init__(self, subscribers, interval, poll,
+                 clock=time.monotonic, sleep=None, policy=None,
+                 owns=None):
+        self.interval = interval
+        self.poll = poll
+        self.owns = owns
+        self.clock = clock
+        self.sleep = sleep or self._wait
+        self.policy = policy or RetryPolicy(interval)
+        self._counter = itertools.count()
+        self._queue = []
+        self._callbacks = collections.deque()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._spread(subscribers, clock())
+
+    def __len__(self):
+        return len(self._queue)
+
+    def _spread(self, subscribers, start):
+        subscribers = list(subscribers)
+        step = self.interval / len(subscribers) if subscribers else 0
+        for index, subscriber in enumerate(subscribers):
+            self.schedule(subscriber, start + step * index)
+
+    def _wait(self, seconds):
+        self._wakeup.wait(seconds)
+        self._wakeup.clear()
+
+    @property
+    def stopping(self):
+        """Запрошена ли остановка."""
+        return self._stopping
+
+    def stop(self):
+        """Останавливаем цикл после текущего опроса."""
+        self._stopping = True
+        self._wakeup.set()
+
+    def call_soon(self, function):
+        """Выполнить function() в цикле планировщика между опросами.
+
+        Можно вызывать из обработчика сигнала и из другого потока.
+        """
+        self._callbacks.append(function)
+        self._wakeup.set()
+
+    def run_callbacks(self):
+        """Выполняем функции, отложенные через call_soon."""
+        while self._callbacks:
+            self._callbacks.popleft()()
+
+    def subscribers(self):
+        """Подписчики в очереди."""
+        return [subscriber for _, _, subscriber in self._queue]
+
+    def replace(self, subscribers):
+        """Новый набор подписчиков без потери состояния опроса.
+
+        Подписчики с тем же ключом остаются в очереди со своим временем
+        опроса, новые распределяются по интервалу, начиная с текущего
+        момента. Возвращает число добавленных и удалённых.
+        """
+        keys = {subscriber.key for subscriber in subscribers}
+        kept = [entry for entry in self._queue if entry[2].key in keys]
+        known = {entry[2].key for entry in kept}
+        removed = len(self._queue) - len(kept)
+        self._queue = kept
+        heapq.heapify(self._queue)
+        added = [
+            subscriber for subscriber in subscribers
+            if subscriber.key not in known]
+        self._spread(added, self.clock())
+        return len(added), removed
+
+    def schedule(self, subscriber, due):
+        """Ставим подписчика в очередь на момент due."""
+        heapq.heappush(
+            self._queue, (due, next(self._counter), subscriber))
+
+    def next_due(self):
+        """Время ближайшего опроса или None, если очередь пуста."""
+        return self._queue[0][0] if self._queue else None
+
+    def run_pending(self):
+        """Опрашиваем всех подписчиков, чьё время подошло."""
+        polled = 0
+        now = self.clock()
+        while (self._queue and self._queue[0][0] <= now
+               and not self._stopping):
+            _, _, subscriber = heapq.heappop(self._queue)
+            if self.owns is None or self.owns(subscriber):
+                self.poll(subscriber)
+                polled += 1
+            self.schedule(subscriber, now + self.policy.delay(subscriber))
+        return polled
+
+    def run_forever(self):
+        """Цикл опроса до stop()."""
+        while not self._stopping:
+            self.run_callbacks()
+            self.run_pending()
+            if self._stopping or self._callbacks:
+                continue
+            due = self.next_due()
+            delay = self.interval if due is None else due - self.clock()
+            if delay > 0:
+                self.sleep(delay)
@@ -0,0 +1,156 @@
+import socket
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NewConnectionError
+
+from bot.tracing import TRACER
+
+
+class TracedConnection:
+    """Фазы запроса как span, если трассировка включена.
+
+    http.dns — разрешение имени, http.tcp — TCP-соединение с первым
+    адресом, http.tls — рукопожатие TLS, http.send — отправка запроса,
+    http.wait — ожидание заголовков ответа.
+    """
+
+    def _new_conn(self):
+        if not TRACER.enabled:
+            return super()._new_conn()
+        host = self._dns_host
+        with TRACER.span('http.dns', host=host):
+            try:
+                address = socket.getaddrinfo(
+                    host, self.port, 0, socket.SOCK_STREAM)[0][4][0]
+            except OSError:
+                address = host
+        with TRACER.span('http.tcp', address=address):
+            self._dns_host = address
+            try:
+                sock = super()._new_conn()
+            except NewConnectionError:
+                self._dns_host = host
+                sock = super()._new_conn()
+            finally:
+                self._dns_host = host
+        self._connected_at = time.perf_counter_ns()
+        return sock
+
+    def connect(self):
+        """Соединение целиком, с TLS для HTTPS."""
+        if not TRACER.enabled:
+            return super().connect()
+        self._connected_at = None
+        with TRACER.span('http.connect'):
+            super().connect()
+            if isinstance(self, HTTPSConnection) and self._connected_at:
+                TRACER.record(
+                    'http.tls', self._connected_at, time.perf_counter_ns())
+
+    def request(self, method, url, *args, **kwargs):
+        """Отправка запроса."""
+        with TRACER.span('http.send'):
+            return super().request(method, url, *args, **kwargs)
+
+    def getresponse(self):
+        """Ожидание заголовков ответа."""
+        with TRACER.span('http.wait'):
+            return super().getresponse()
+
+
+class TracedHTTPConnection(TracedConnection, HTTPConnection):
+    """HTTP-соединение с фазами в трассировке."""
+
+
+class TracedHTTPSConnection(TracedConnection, HTTPSConnection):
+    """HTTPS-соединение с фазами в трассировке."""
+
+
+class TracedHTTPConnectionPool(HTTPConnectionPool):
+    """Пул HTTP-соединений с фазами в трассировке."""
+
+    ConnectionCls = TracedHTTPConnection
+
+
+class TracedHTTPSConnectionPool(HTTPSConnectionPool):
+    """Пул HTTPS-соединений с фазами в трассировке."""
+
+    ConnectionCls = TracedHTTPSConnection
+
+
+class PooledSession(requests.Session):
+    """Сеанс requests с пулом keep-alive соединений и таймаутами.
+
+    Таймаут подставляется во все запросы, если не передан явно, чтобы
+    зависшее соединение не блокировало цикл опроса. При включённой
+    трассировке запрос, фазы соединения и чтение тела пишутся как span.
+    """
+
+    def __init__(self, pool_size=10, connect_timeout=5, read_timeout=30):
+        super().__init__()
+        self.timeout = (connect_timeout, read_timeout)
+        self.adapter = HTTPAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size,
+            max_retries=0)
+        self.adapter.poolmanager.pool_classes_by_scheme = {
+            'http': TracedHTTPConnectionPool,
+            'https': TracedHTTPSConnectionPool,
+        }
+        self.mount('https://', self.adapter)
+        self.mount('http://', self.adapter)
+
+    def request(self, method, url, **kwargs):
+        """Запрос с таймаутом по умолчанию."""
+        kwargs.setdefault('timeout', self.timeout)
+        with TRACER.span('http.request', method=method):
+            return super().request(method, url, **kwargs)
+
+    def send(self, request, **kwargs):
+        """Отправка; при трассировке чтение тела — отдельный span."""
+        if not TRACER.enabled or kwargs.get('stream'):
+            return super().send(request, **kwargs)
+        kwargs['stream'] = True
+        response = super().send(request, **kwargs)
+        with TRACER.span('http.body'):
+            response.content
+        return response
+
+    def stats(self):
+        """Счётчики запросов, новых соединений и повторных использований."""
+        pools = self.adapter.poolmanager.pools
+        requests_count = connections = 0
+        for key in pools.keys():
+            pool = pools[key]
+            requests_count += pool.num_requests
+            connections += pool.num_connections
+        return {
+            'requests': requests_count,
+            'connections': connections,
+            'reused': requests_count - connections,
+        }
+
+
+_shared = None
+
+
+def install(pool_size=10, connect_timeout=5, read_timeout=30):
+    """Создаём общий сеанс для всех HTTP-запросов процесса."""
+    global _shared
+    if _shared is not None:
+        _shared.close()
+    _shared = PooledSession(pool_size, connect_timeout, read_timeout)
+    return _shared
+
+
+def shared():
+    """Общий сеанс или None, если он не установлен."""
+    return _shared
+
+
+def client():
+    """Общий сеанс, а без него модуль requests без пула."""
+    return _shared if _shared is not None else requests
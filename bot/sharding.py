@@ -0,0 +1,154 @@
+import bisect
+import hashlib
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS workers (
+    worker_id TEXT PRIMARY KEY,
+    heartbeat_at REAL NOT NULL
+)
+"""
+
+logger = logging.getLogger(__name__)
+
+
+def default_worker_id():
+    """Имя воркера: DYNO на Heroku, иначе хост и pid."""
+    return os.getenv('DYNO') or f'{socket.gethostname()}-{os.getpid()}'
+
+
+def worker_path(path, worker_id):
+    """Отдельный файл состояния для воркера: cursor.json -> cursor.w1.json."""
+    root, extension = os.path.splitext(path)
+    return f'{root}.{worker_id}{extension}'
+
+
+def ring_hash(value):
+    """64-битный хеш строки для кольца."""
+    digest = hashlib.blake2b(value.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+class HashRing:
+    """Консистентное хеширование с виртуальными узлами.
+
+    При добавлении или удалении воркера переезжает только его доля
+    подписчиков, остальные остаются на прежних местах.
+    """
+
+    def __init__(self, nodes, replicas=100):
+        self.nodes = tuple(sorted(nodes))
+        points = sorted(
+            (ring_hash(f'{node}#{replica}'), node)
+            for node in self.nodes
+            for replica in range(replicas))
+        self._hashes = [point for point, _ in points]
+        self._owners = [node for _, node in points]
+
+    def owner(self, key):
+        """Воркер, которому принадлежит ключ."""
+        if not self._hashes:
+            return None
+        index = bisect.bisect(self._hashes, ring_hash(key))
+        return self._owners[index % len(self._owners)]
+
+
+class LeaseStore:
+    """Аренды воркеров в SQLite-файле, общем для всех процессов."""
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(
+            path, timeout=30, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute(SCHEMA)
+        self.connection.commit()
+        self._lock = threading.Lock()
+
+    def heartbeat(self, worker_id, now):
+        """Продлеваем аренду воркера."""
+        with self._lock, self.connection:
+            self.connection.execute(
+                'INSERT INTO workers (worker_id, heartbeat_at) VALUES (?, ?) '
+                'ON CONFLICT(worker_id) DO UPDATE SET '
+                'heartbeat_at = excluded.heartbeat_at',
+                (worker_id, now))
+
+    def alive(self, now, ttl):
+        """Воркеры с непросроченной арендой."""
+        with self._lock:
+            rows = self.connection.execute(
+                'SELECT worker_id FROM workers WHERE heartbeat_at > ?',
+                (now - ttl,)).fetchall()
+        return [row[0] for row in rows]
+
+    def release(self, worker_id):
+        """Освобождаем аренду при штатной остановке."""
+        with self._lock, self.connection:
+            self.connection.execute(
+                'DELETE FROM workers WHERE worker_id = ?', (worker_id,))
+
+    def close(self):
+        """Закрываем соединение."""
+        self.connection.close()
+
+
+class ShardCoordinator:
+    """Доля подписчиков этого воркера.
+
+    Воркер продлевает аренду каждые ttl / 3 секунды и по списку живых
+    воркеров строит кольцо. Аренда упавшего воркера истекает через ttl,
+    после чего его подписчики расходятся по остальным.
+    """
+
+    def __init__(self, store, worker_id=None, ttl=60, clock=time.time):
+        self.store = store
+        self.worker_id = worker_id or default_worker_id()
+        self.ttl = ttl
+        self.clock = clock
+        self.ring = HashRing([self.worker_id])
+        self._stop = threading.Event()
+        self._thread = None
+
+    def refresh(self):
+        """Продлеваем аренду и перестраиваем кольцо, если состав изменился."""
+        now = self.clock()
+        self.store.heartbeat(self.worker_id, now)
+        members = set(self.store.alive(now, self.ttl))
+        members.add(self.worker_id)
+        if tuple(sorted(members)) != self.ring.nodes:
+            logger.info(
+                f'Состав воркеров изменился: {sorted(members)}')
+            self.ring = HashRing(members)
+        return self.ring
+
+    def owns(self, key):
+        """Принадлежит ли ключ этому воркеру."""
+        return self.ring.owner(key) == self.worker_id
+
+    def _run(self):
+        while not self._stop.wait(self.ttl / 3):
+            try:
+                self.refresh()
+            except sqlite3.Error as error:
+                logger.error(f'Не удалось продлить аренду: {error}')
+
+    def start(self):
+        """Первая аренда и фоновое продление."""
+        self.refresh()
+        self._thread = threading.Thread(
+            target=self._run, name='shard-heartbeat', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Останавливаем продление и освобождаем аренду."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.store.release(self.worker_id)
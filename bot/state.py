@@ -0,0 +1,329 @@
+import collections
+import socket
+import sqlite3
+import threading
+import urllib.parse
+
+from bot.exceptions import RespError
+
+STATE_ERRORS = (sqlite3.Error, OSError, RespError)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS homework_states (
+    owner TEXT NOT NULL,
+    homework TEXT NOT NULL,
+    status TEXT NOT NULL,
+    name TEXT,
+    PRIMARY KEY (owner, homework)
+) WITHOUT ROWID
+"""
+
+
+class MemoryStateStore:
+    """Статусы работ в памяти процесса.
+
+    Хранится не больше maxsize работ: давно не читанные и не
+    обновлённые вытесняются (LRU). Переживает перезагрузку настроек,
+    но не перезапуск процесса.
+    """
+
+    def __init__(self, maxsize=100_000):
+        self.maxsize = maxsize
+        self._states = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, owner, keys):
+        """Известные состояния работ owner: {работа: (статус, название)}."""
+        found = {}
+        with self._lock:
+            for key in keys:
+                state = self._states.get((owner, key))
+                if state is not None:
+                    self._states.move_to_end((owner, key))
+                    found[key] = state
+        return found
+
+    def set_many(self, owner, states):
+        """Запоминаем состояния работ owner."""
+        with self._lock:
+            for key, state in states.items():
+                self._states[owner, key] = state
+                self._states.move_to_end((owner, key))
+            while len(self._states) > self.maxsize:
+                self._states.popitem(last=False)
+
+    def flush(self):
+        """Писать некуда, всё уже в памяти."""
+
+    def close(self):
+        """Освобождать нечего."""
+
+    def __len__(self):
+        return len(self._states)
+
+
+class SQLiteStateStore:
+    """Статусы работ в SQLite с журналом WAL.
+
+    Записи копятся в памяти и пишутся одной транзакцией при flush()
+    или когда их набралось batch_size; чтение видит ещё не записанные
+    состояния. Файл можно делить между процессами одной машины.
+    """
+
+    def __init__(self, path=':memory:', batch_size=1000):
+        self.path = path
+        self.batch_size = batch_size
+        self.connection = sqlite3.connect(
+            path, timeout=30, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute(SCHEMA)
+        self.connection.commit()
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, owner, keys):
+        """Известные состояния работ owner: {работа: (статус, название)}."""
+        found = {}
+        missing = []
+        with self._lock:
+            for key in keys:
+                state = self._pending.get((owner, key))
+                if state is None:
+                    missing.append(key)
+                else:
+                    found[key] = state
+            for start in range(0, len(missing), 500):
+                chunk = missing[start:start + 500]
+                rows = self.connection.execute(
+                    'SELECT homework, status, name FROM homework_states '
+                    'WHERE owner = ? AND homework IN '
+                    f'({", ".join("?" * len(chunk))})', (owner, *chunk))
+                for key, status, name in rows:
+                    found[key] = (status, name)
+        return found
+
+    def set_many(self, owner, states):
+        """Ставим состояния работ owner в очередь на запись."""
+        with self._lock:
+            for key, state in states.items():
+                self._pending[owner, key] = state
+            if len(self._pending) >= self.batch_size:
+                self._flush()
+
+    def flush(self):
+        """Записываем накопленные состояния одной транзакцией."""
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        with self.connection:
+            self.connection.executemany(
+                'INSERT INTO homework_states (owner, homework, status, name) '
+                'VALUES (?, ?, ?, ?) ON CONFLICT (owner, homework) '
+                'DO UPDATE SET status = excluded.status, name = excluded.name',
+                ((owner, key, status, name)
+                 for (owner, key), (status, name) in self._pending.items()))
+        self._pending.clear()
+
+    def close(self):
+        """Дописываем очередь и закрываем соединение."""
+        self.flush()
+        self.connection.close()
+
+    def __len__(self):
+        return self.connection.execute(
+            'SELECT COUNT(*) FROM homework_states').fetchone()[0]
+
+
+def encode_command(command):
+    """Команда в формате RESP: массив bulk-строк."""
+    parts = [b'*%d\r\n' % len(command)]
+    for arg in command:
+        if not isinstance(arg, bytes):
+            arg = str(arg).encode()
+        parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+    return b''.join(parts)
+
+
+class RespClient:
+    """Минимальный клиент протокола Redis: команды и конвейер.
+
+    Соединение открывается при первой команде и закрывается после
+    сетевой ошибки, следующая команда откроет его заново.
+    """
+
+    def __init__(self, host='127.0.0.1', port=6379, db=0, timeout=5):
+        self.address = (host, port)
+        self.db = db
+        self.timeout = timeout
+        self._socket = None
+        self._file = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        self._socket = socket.create_connection(self.address, self.timeout)
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._file = self._socket.makefile('rb')
+        if self.db:
+            reply, = self._exchange([('SELECT', self.db)])
+            if isinstance(reply, RespError):
+                raise reply
+
+    def _read(self):
+        line = self._file.readline()
+        if not line.endswith(b'\r\n'):
+            raise ConnectionError('Redis закрыл соединение')
+        kind, value = line[:1], line[1:-2]
+        if kind == b'+':
+            return value.decode()
+        if kind == b'-':
+            return RespError(value.decode())
+        if kind == b':':
+            return int(value)
+        if kind == b'$':
+            size = int(value)
+            return None if size < 0 else self._file.read(size + 2)[:-2]
+        if kind == b'*':
+            size = int(value)
+            return None if size < 0 else [self._read() for _ in range(size)]
+        raise RespError(f'Неизвестный ответ Redis: {line!r}')
+
+    def _exchange(self, commands):
+        self._socket.sendall(b''.join(map(encode_command, commands)))
+        return [self._read() for _ in commands]
+
+    def pipeline(self, commands):
+        """Отправляем команды одной записью и читаем ответы по порядку."""
+        with self._lock:
+            try:
+                if self._socket is None:
+                    self._connect()
+                replies = self._exchange(commands)
+            except OSError:
+                self._close()
+                raise
+        for reply in replies:
+            if isinstance(reply, RespError):
+                raise reply
+        return replies
+
+    def execute(self, *command):
+        """Одна команда."""
+        return self.pipeline([command])[0]
+
+    def _close(self):
+        if self._socket is not None:
+            self._file.close()
+            self._socket.close()
+        self._socket = self._file = None
+
+    def close(self):
+        """Закрываем соединение."""
+        with self._lock:
+            self._close()
+
+
+class RedisStateStore:
+    """Статусы работ в Redis: хеш на подписчика, поле на работу.
+
+    Как и SQLiteStateStore, копит записи до flush() или batch_size и
+    отправляет их одним конвейером. Подходит для воркеров на разных
+    машинах.
+    """
+
+    def __init__(self, client, prefix='homework_bot:state:', batch_size=1000):
+        self.client = client
+        self.prefix = prefix
+        self.batch_size = batch_size
+        self._pending = collections.defaultdict(dict)
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get_many(self, owner, keys):
+        """Известные состояния работ owner: {работа: (статус, название)}."""
+        keys = list(keys)
+        with self._lock:
+            pending = self._pending.get(owner, {})
+            found = {key: pending[key] for key in keys if key in pending}
+        missing = [key for key in keys if key not in found]
+        if not missing:
+            return found
+        values = self.client.execute('HMGET', self.prefix + owner, *missing)
+        for key, value in zip(missing, values):
+            if value is not None:
+                status, _, name = value.decode().partition('\t')
+                found[key] = (status, name or None)
+        return found
+
+    def set_many(self, owner, states):
+        """Ставим состояния работ owner в очередь на запись."""
+        with self._lock:
+            pending = self._pending[owner]
+            before = len(pending)
+            pending.update(states)
+            self._size += len(pending) - before
+            full = self._size >= self.batch_size
+        if full:
+            self.flush()
+
+    def flush(self):
+        """Отправляем накопленные состояния одним конвейером HSET.
+
+        Если отправить не вышло, состояния возвращаются в очередь.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, collections.defaultdict(
+                dict)
+            self._size = 0
+        if not pending:
+            return
+        commands = []
+        for owner, states in pending.items():
+            command = ['HSET', self.prefix + owner]
+            for key, (status, name) in states.items():
+                command += (key, f'{status}\t{name or ""}')
+            commands.append(command)
+        try:
+            self.client.pipeline(commands)
+        except STATE_ERRORS:
+            self._restore(pending)
+            raise
+
+    def _restore(self, pending):
+        with self._lock:
+            for owner, states in pending.items():
+                newer = self._pending[owner]
+                for key, state in states.items():
+                    if key not in newer:
+                        newer[key] = state
+                        self._size += 1
+
+    def close(self):
+        """Дописываем очередь и закрываем соединение."""
+        try:
+            self.flush()
+        finally:
+            self.client.close()
+
+
+def open_state_store(url, batch_size=1000, maxsize=100_000):
+    """Хранилище по адресу: memory, sqlite:///путь или redis://хост:порт/бд.
+
+    Как в SQLAlchemy, sqlite:///state.db — относительный путь, а
+    sqlite:////var/state.db — абсолютный.
+    """
+    scheme, _, rest = url.partition('://')
+    if scheme == 'memory':
+        return MemoryStateStore(maxsize)
+    if scheme == 'sqlite':
+        return SQLiteStateStore(rest[1:] or ':memory:', batch_size)
+    if scheme == 'redis':
+        parts = urllib.parse.urlsplit(url)
+        client = RespClient(
+            parts.hostname or '127.0.0.1', parts.port or 6379,
+            int(parts.path.strip('/') or 0))
+        return RedisStateStore(client, batch_size=batch_size)
+    raise ValueError(f'Неизвестное хранилище состояния: {url}')
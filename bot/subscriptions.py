@@ -0,0 +1,108 @@
+import collections
+import hashlib
+import sqlite3
+
+from bot.response_cache import ResponseCache
+from bot.tracker import HomeworkStateIndex
+
+HISTORY_SIZE = 20
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS subscribers (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    practicum_token TEXT NOT NULL,
+    chat_id TEXT NOT NULL,
+    locale TEXT,
+    UNIQUE (practicum_token, chat_id)
+)
+"""
+
+
+class Subscriber:
+    """Подписчик: пара PRACTICUM_TOKEN/CHAT_ID и его состояние опроса."""
+
+    __slots__ = (
+        'id', 'practicum_token', 'chat_id',
+        'current_timestamp', 'homeworks', 'errors',
+        'failures', 'retry_after', 'cache', 'history', 'paused', 'locale')
+
+    def __init__(self, id, practicum_token, chat_id, locale=None,
+                 current_timestamp=None):
+        self.id = id
+        self.practicum_token = practicum_token
+        self.chat_id = chat_id
+        self.locale = locale
+        self.current_timestamp = current_timestamp
+        self.homeworks = HomeworkStateIndex()
+        self.errors = True
+        self.failures = 0
+        self.retry_after = None
+        self.cache = ResponseCache()
+        self.history = collections.deque(maxlen=HISTORY_SIZE)
+        self.paused = False
+
+    @property
+    def key(self):
+        """Стабильный ключ подписчика без токена в открытом виде."""
+        digest = hashlib.sha256(self.practicum_token.encode()).hexdigest()
+        return f'{self.chat_id}:{digest[:16]}'
+
+    def __repr__(self):
+        return f'Subscriber(id={self.id}, chat_id={self.chat_id})'
+
+
+class SubscriptionRegistry:
+    """Реестр подписчиков в SQLite."""
+
+    def __init__(self, path=':memory:'):
+        self.path = path
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(SCHEMA)
+        columns = {
+            row[1] for row in self.connection.execute(
+                'PRAGMA table_info(subscribers)')}
+        if 'locale' not in columns:
+            self.connection.execute(
+                'ALTER TABLE subscribers ADD COLUMN locale TEXT')
+        self.connection.commit()
+
+    def add(self, practicum_token, chat_id, locale=None):
+        """Добавляем подписчика, повторная запись игнорируется.
+
+        Язык сообщений уже записанного подписчика меняется, если передан.
+        """
+        with self.connection:
+            self.connection.execute(
+                'INSERT INTO subscribers (practicum_token, chat_id, locale) '
+                'VALUES (?, ?, ?) ON CONFLICT (practicum_token, chat_id) '
+                'DO UPDATE SET locale = COALESCE(excluded.locale, locale)',
+                (practicum_token, str(chat_id), locale))
+        row = self.connection.execute(
+            'SELECT id FROM subscribers '
+            'WHERE practicum_token = ? AND chat_id = ?',
+            (practicum_token, str(chat_id))).fetchone()
+        return row[0]
+
+    def remove(self, subscriber_id):
+        """Удаляем подписчика по id."""
+        with self.connection:
+            self.connection.execute(
+                'DELETE FROM subscribers WHERE id = ?', (subscriber_id,))
+
+    def load(self, current_timestamp=None):
+        """Список подписчиков с начальным состоянием опроса."""
+        rows = self.connection.execute(
+            'SELECT id, practicum_token, chat_id, locale FROM subscribers '
+            'ORDER BY id')
+        return [
+            Subscriber(*row, current_timestamp=current_timestamp)
+            for row in rows
+        ]
+
+    def __len__(self):
+        return self.connection.execute(
+            'SELECT COUNT(*) FROM subscribers').fetchone()[0]
+
+    def close(self):
+        """Закрываем соединение с базой."""
+        self.connection.close()
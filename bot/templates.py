@@ -0,0 +1,150 @@
+import collections
+import functools
+import html
+import re
+import string
+
+DEFAULT_LOCALE = 'ru'
+
+CacheInfo = collections.namedtuple(
+    'CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+TEMPLATES = {
+    'ru': {
+        'status': 'Изменился статус проверки работы "{name}". {verdict}',
+        'comment': 'Комментарий ревьюера: {comment}',
+    },
+    'en': {
+        'status': 'Homework "{name}" status changed. {verdict}',
+        'comment': 'Reviewer comment: {comment}',
+    },
+}
+
+VERDICTS = {
+    'en': {
+        'approved': 'Reviewed: the reviewer liked everything. Hooray!',
+        'reviewing': 'The reviewer has started reviewing the homework.',
+        'rejected': 'Reviewed: the reviewer found some issues.',
+    },
+}
+
+MARKDOWN_V2_SPECIAL = re.compile(r'([_*\[\]()~`>#+\-=|{}.!\\])')
+MARKDOWN_SPECIAL = re.compile(r'([_*`\[])')
+
+
+def escape_markdown_v2(text):
+    """Экранирование для parse_mode=MarkdownV2."""
+    return MARKDOWN_V2_SPECIAL.sub(r'\\\1', text)
+
+
+def escape_markdown(text):
+    """Экранирование для устаревшего parse_mode=Markdown."""
+    return MARKDOWN_SPECIAL.sub(r'\\\1', text)
+
+
+def escape_html(text):
+    """Экранирование для parse_mode=HTML."""
+    return html.escape(text, quote=False)
+
+
+ESCAPERS = {
+    None: str,
+    'MarkdownV2': escape_markdown_v2,
+    'Markdown': escape_markdown,
+    'HTML': escape_html,
+}
+
+
+def compile_template(template, escape=str, **static):
+    """Шаблон с подставленными и экранированными постоянными полями.
+
+    Возвращает функцию, которая принимает значения остальных полей по
+    порядку и склеивает их с готовыми кусками текста. Текст шаблона
+    разбирается и экранируется один раз здесь: str.format разбирал бы
+    его при каждом вызове.
+    """
+    literals = ['']
+    for literal, field, _, _ in string.Formatter().parse(template):
+        literals[-1] += escape(literal)
+        if field is None:
+            continue
+        if field in static:
+            literals[-1] += escape(static[field])
+        else:
+            literals.append('')
+    if len(literals) == 2:
+        head, tail = literals
+        return lambda value: head + value + tail
+
+    def render(*values):
+        parts = [literals[0]]
+        for value, literal in zip(values, literals[1:]):
+            parts += (value, literal)
+        return ''.join(parts)
+
+    return render
+
+
+class MessageRenderer:
+    """Сообщения о смене статуса по заранее собранным шаблонам.
+
+    Для каждой пары (язык, статус) шаблон собирается один раз: вердикт
+    уже подставлен и экранирован под parse_mode. С разметкой готовые
+    сообщения хранятся в LRU-кеше по (статус, работа, язык,
+    комментарий); без parse_mode экранировать нечего, и шаблон
+    отрисовывается быстрее, чем идёт поиск в кеше, поэтому кеша нет.
+    Неизвестный язык заменяется на default_locale; для статуса без
+    перевода берётся вердикт языка по умолчанию.
+    """
+
+    def __init__(self, verdicts, templates=TEMPLATES,
+                 default_locale=DEFAULT_LOCALE, parse_mode=None,
+                 cache_size=4096):
+        if parse_mode not in ESCAPERS:
+            raise ValueError(f'Неизвестный parse_mode: {parse_mode}')
+        self.default_locale = default_locale
+        self.parse_mode = parse_mode
+        self.escape = ESCAPERS[parse_mode]
+        default = verdicts[default_locale]
+        self.statuses = {}
+        self.comments = {}
+        for locale, template in templates.items():
+            translated = verdicts.get(locale, {})
+            self.statuses[locale] = {
+                status: compile_template(
+                    template['status'], self.escape,
+                    verdict=translated.get(status, verdict))
+                for status, verdict in default.items()}
+            self.comments[locale] = compile_template(
+                template['comment'], self.escape)
+        self._cached = (
+            self._render if self.escape is str
+            else functools.lru_cache(cache_size)(self._render))
+
+    def render(self, status, name, locale=None, comment=None):
+        """Текст сообщения; повтор тех же аргументов берётся из кеша."""
+        if locale not in self.statuses:
+            locale = self.default_locale
+        return self._cached(status, name, locale, comment or None)
+
+    def _render(self, status, name, locale, comment):
+        try:
+            template = self.statuses[locale][status]
+        except KeyError:
+            raise KeyError(status) from None
+        message = template(self.escape(str(name)))
+        if comment is not None:
+            message += '\n' + self.comments[locale](
+                self.escape(str(comment)))
+        return message
+
+    def cache_info(self):
+        """Попадания и промахи кеша, как у functools.lru_cache."""
+        if self._cached == self._render:
+            return CacheInfo(0, 0, 0, 0)
+        return self._cached.cache_info()
+
+    def clear(self):
+        """Очищаем кеш отрисованных сообщений."""
+        if self._cached != self._render:
+            self._cached.cache_clear()
@@ -0,0 +1,245 @@
+import collections
+import contextvars
+import functools
+import inspect
+import itertools
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+FORMATS = ('chrome', 'otlp')
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set(self, **args):
+        """Атрибуты выключенного span не сохраняются."""
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """Интервал внутри цикла опроса; вложенность — через contextvars."""
+
+    __slots__ = (
+        'tracer', 'name', 'args', 'trace_id', 'span_id', 'parent_id',
+        'start', '_token')
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        tracer = self.tracer
+        parent = tracer.current()
+        self.span_id = next(tracer.ids)
+        if parent is None:
+            self.trace_id, self.parent_id = self.span_id, None
+        else:
+            self.trace_id, self.parent_id = parent.trace_id, parent.span_id
+        self._token = tracer.context.set(self)
+        self.start = time.perf_counter_ns()
+        return self
+
+    def set(self, **args):
+        """Добавляем атрибуты span."""
+        self.args.update(args)
+
+    def __exit__(self, exc_type, exc, traceback):
+        end = time.perf_counter_ns()
+        self.tracer.context.reset(self._token)
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        self.tracer.finish(
+            self.name, self.trace_id, self.span_id, self.parent_id,
+            self.start, end, self.args)
+        return False
+
+
+class Tracer:
+    """Деревья span для циклов опроса в формате Chrome trace или OTLP.
+
+    Выключен, пока не вызван start(): span() возвращает пустой контекст,
+    и инструментированный код почти ничего не платит. Хранятся последние
+    max_spans интервалов; файл перезаписывается целиком не чаще раза в
+    flush_interval секунд, по завершении корневого span и при stop().
+    """
+
+    def __init__(self, max_spans=20_000, flush_interval=10.0):
+        self.enabled = False
+        self.path = None
+        self.format = 'chrome'
+        self.flush_interval = flush_interval
+        self.spans = collections.deque(maxlen=max_spans)
+        self.ids = itertools.count(1)
+        self.context = contextvars.ContextVar('span', default=None)
+        self._prefix = random.getrandbits(64)
+        self._offset = time.time_ns() - time.perf_counter_ns()
+        self._flushed_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def start(self, path, format='chrome'):
+        """Включаем запись span в файл path."""
+        if format not in FORMATS:
+            raise ValueError(f'Неизвестный формат трассировки: {format}')
+        self.path = path
+        self.format = format
+        self.enabled = True
+        return self
+
+    def stop(self):
+        """Выключаем запись и сохраняем накопленное."""
+        if self.enabled:
+            self.enabled = False
+            self.flush()
+
+    def current(self):
+        """Открытый span текущего потока или задачи asyncio."""
+        return self.context.get()
+
+    def span(self, name, **args):
+        """Контекст нового span, вложенного в текущий."""
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, args)
+
+    def record(self, name, start, end, **args):
+        """Уже завершившийся интервал внутри текущего span.
+
+        start и end — значения time.perf_counter_ns().
+        """
+        if not self.enabled:
+            return
+        parent = self.current()
+        span_id = next(self.ids)
+        if parent is None:
+            trace_id, parent_id = span_id, None
+        else:
+            trace_id, parent_id = parent.trace_id, parent.span_id
+        self.finish(name, trace_id, span_id, parent_id, start, end, args)
+
+    def finish(self, name, trace_id, span_id, parent_id, start, end, args):
+        """Сохраняем завершённый span."""
+        self.spans.append((
+            name, trace_id, span_id, parent_id, start, end,
+            threading.get_native_id(), args))
+        if parent_id is None and (
+                time.monotonic() - self._flushed_at >= self.flush_interval):
+            self.flush()
+
+    def chrome(self, spans):
+        """События Chrome trace: открываются в Perfetto и chrome://tracing."""
+        pid = os.getpid()
+        return {
+            'displayTimeUnit': 'ms',
+            'traceEvents': [
+                {
+                    'name': name, 'cat': 'homework_bot', 'ph': 'X',
+                    'ts': (start + self._offset) / 1000,
+                    'dur': (end - start) / 1000,
+                    'pid': pid, 'tid': tid,
+                    'args': {
+                        **args, 'trace_id': self.trace_id(trace_id),
+                        'span_id': span_id, 'parent_id': parent_id},
+                }
+                for name, trace_id, span_id, parent_id, start, end, tid, args
+                in spans],
+        }
+
+    def otlp(self, spans):
+        """Span в JSON-кодировке OTLP/HTTP."""
+        return {'resourceSpans': [{
+            'resource': {'attributes': [attribute(
+                'service.name', 'homework_bot')]},
+            'scopeSpans': [{
+                'scope': {'name': 'homework_bot'},
+                'spans': [
+                    {
+                        'traceId': self.trace_id(trace_id),
+                        'spanId': f'{span_id:016x}',
+                        'parentSpanId': (
+                            '' if parent_id is None
+                            else f'{parent_id:016x}'),
+                        'name': name,
+                        'kind': 1,
+                        'startTimeUnixNano': str(start + self._offset),
+                        'endTimeUnixNano': str(end + self._offset),
+                        'attributes': [
+                            attribute(key, value)
+                            for key, value in args.items()],
+                    }
+                    for name, trace_id, span_id, parent_id, start, end, _,
+                    args in spans],
+            }],
+        }]}
+
+    def trace_id(self, trace_id):
+        """Идентификатор трассы, уникальный и между процессами."""
+        return f'{self._prefix:016x}{trace_id:016x}'
+
+    def flush(self):
+        """Атомарно перезаписываем файл трассировки."""
+        if self.path is None:
+            return
+        with self._lock:
+            self._flushed_at = time.monotonic()
+            document = getattr(self, self.format)(list(self.spans))
+            directory = os.path.dirname(os.path.abspath(self.path))
+            descriptor, tmp_path = tempfile.mkstemp(
+                dir=directory, prefix='.trace-', suffix='.tmp')
+            try:
+                with os.fdopen(descriptor, 'w', encoding='utf-8') as file:
+                    json.dump(document, file, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+
+
+def attribute(key, value):
+    """Атрибут OTLP с типом по значению."""
+    if isinstance(value, bool):
+        return {'key': key, 'value': {'boolValue': value}}
+    if isinstance(value, int):
+        return {'key': key, 'value': {'intValue': str(value)}}
+    if isinstance(value, float):
+        return {'key': key, 'value': {'doubleValue': value}}
+    return {'key': key, 'value': {'stringValue': str(value)}}
+
+
+TRACER = Tracer()
+
+
+def trace(name, describe=None, tracer=TRACER):
+    """Декоратор: каждый вызов — span, атрибуты даёт describe(*args)."""
+    def decorator(func):
+        def open_span(args):
+            if not tracer.enabled:
+                return NULL_SPAN
+            return tracer.span(name, **(describe(*args) if describe else {}))
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with open_span(args):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with open_span(args):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,74 @@
+class HomeworkStateIndex:
+    """Последние известные статусы работ подписчика.
+
+    Ключ работы — её id строкой, а если его нет — homework_name. Статус
+    ещё не встречавшейся работы равен default; по умолчанию он неизвестен,
+    и любой статус такой работы считается изменением. Известные статусы
+    после перезапуска подгружаются из хранилища через seed.
+    """
+
+    __slots__ = ('statuses', 'names', 'default')
+
+    def __init__(self, default=None):
+        self.statuses = {}
+        self.names = {}
+        self.default = default
+
+    @staticmethod
+    def key(homework):
+        """Ключ работы в индексе."""
+        key = homework.get('id')
+        return homework.get('homework_name') if key is None else str(key)
+
+    def get(self, key):
+        """Известный статус работы."""
+        return self.statuses.get(key, self.default)
+
+    def items(self):
+        """Пары (название работы, статус) на текущий момент."""
+        names = self.names
+        return [
+            (names.get(key) or key, status)
+            for key, status in list(self.statuses.items())]
+
+    def missing(self, homeworks):
+        """Ключи работ из списка, статус которых ещё не известен."""
+        statuses = self.statuses
+        key = self.key
+        return [
+            homework_key for homework_key in map(key, homeworks)
+            if homework_key not in statuses]
+
+    def seed(self, states):
+        """Известные статусы из хранилища: {ключ: (статус, название)}."""
+        for homework_key, (status, name) in states.items():
+            self.statuses.setdefault(homework_key, status)
+            self.names.setdefault(homework_key, name)
+
+    def has_status(self, status):
+        """Есть ли работа с таким статусом."""
+        return status in self.statuses.values()
+
+    def diff(self, homeworks):
+        """Работы, статус которых изменился, от старых к новым.
+
+        API отдаёт работы от новых к старым, поэтому список проходим с
+        конца: уведомления уйдут в хронологическом порядке. Индекс
+        обновляется за тот же проход.
+        """
+        statuses = self.statuses
+        names = self.names
+        default = self.default
+        key = self.key
+        changed = []
+        for homework in reversed(homeworks):
+            homework_key = key(homework)
+            status = homework['status']
+            if statuses.get(homework_key, default) != status:
+                statuses[homework_key] = status
+                names[homework_key] = homework.get('homework_name')
+                changed.append(homework)
+        return changed
+
+    def __len__(self):
+        return len(self.statuses)
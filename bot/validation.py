@@ -0,0 +1,96 @@
+import json
+import logging
+import operator
+
+from bot.exceptions import EmptyDictionaryOrListError, UndocumentedStatusError
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+get_status = operator.itemgetter('status')
+get_homework_name = operator.itemgetter('homework_name')
+
+
+def loads(data):
+    """Разбор JSON через orjson, если он установлен, иначе stdlib."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def decode_response(response):
+    """JSON из ответа requests, с orjson — прямо из байтов тела."""
+    content = getattr(response, 'content', None)
+    if orjson is None or content is None:
+        return response.json()
+    return orjson.loads(content)
+
+
+def fail(error_class, message):
+    """Пишем ошибку в лог и выбрасываем исключение."""
+    logger.error(message)
+    raise error_class(message)
+
+
+class HomeworkValidator:
+    """Проверка ответа homework_statuses для набора известных статусов.
+
+    Быстрый путь обходит список работ функциями на C (itemgetter и
+    set) и не создаёт объектов на каждую работу. Если он находит
+    проблему, медленный путь проходит список ещё раз, чтобы найти
+    работу с ошибкой и выбросить то же исключение, что и раньше.
+    """
+
+    def __init__(self, statuses):
+        self.allowed = frozenset(statuses)
+
+    def __call__(self, response):
+        """Список работ из проверенного ответа."""
+        if not isinstance(response, dict):
+            fail(
+                EmptyDictionaryOrListError,
+                f'Ошибка: response не является словарём: {type(response)}')
+        homeworks = response.get('homeworks')
+        if not isinstance(homeworks, list):
+            fail(
+                EmptyDictionaryOrListError,
+                'Ошибка ключа homeworks или response'
+                'имеет неправильное значение.')
+        if 'current_date' not in response:
+            fail(
+                EmptyDictionaryOrListError,
+                'Ошибка ключа current_date в response.')
+        if not self.is_valid(homeworks):
+            self.find_error(homeworks)
+        return homeworks
+
+    def is_valid(self, homeworks):
+        """Быстрая проверка всех работ."""
+        try:
+            return (
+                set(map(get_status, homeworks)) <= self.allowed
+                and all(map(get_homework_name, homeworks)))
+        except (KeyError, TypeError):
+            return False
+
+    def find_error(self, homeworks):
+        """Находим первую некорректную работу и выбрасываем ошибку."""
+        for homework in homeworks:
+            if not isinstance(homework, dict):
+                fail(
+                    EmptyDictionaryOrListError,
+                    f'Ошибка: работа не является словарём: {homework!r}')
+            status = homework.get('status')
+            if status not in self.allowed:
+                fail(
+                    UndocumentedStatusError,
+                    f'Ошибка недокументированный статус: {status}')
+            homework_name = homework.get('homework_name')
+            if not homework_name:
+                fail(
+                    UndocumentedStatusError,
+                    f'Ошибка пустое значение homework_name: {homework_name}')
@@ -1,17 +1,92 @@
 import datetime
+import functools
 import json
 import logging
 import os
+import signal
+import sqlite3
 import time
 
-import requests
-import telegram
+from bot import metrics, response_cache, tracing
+from bot.breaker import CircuitBreaker, is_api_outage, is_telegram_outage
+from bot.coalesce import Coalescer
+from bot.commands import CommandHandler, UpdatePoller
+from bot.cursor import CursorStore
+from bot.exceptions import (  # noqa: F401
+    CircuitOpenError, EmptyDictionaryOrListError, RequestExceptionError,
+    TheAnswerIsNot200Error, UndocumentedStatusError)
+from bot.health import Health
+from bot.history import TransitionStore, parse_timestamp
+from bot.lazy import lazy_import
+from bot.logs import setup_logging
+from bot.outbound import OutboundQueue, RateLimit
+from bot.outbox import Outbox
+from bot.routing import RoutingTable, load_routes
+from bot.scheduler import PollScheduler, RetryPolicy, parse_retry_after
+from bot.sharding import (LeaseStore, ShardCoordinator, default_worker_id,
+                          worker_path)
+from bot.state import STATE_ERRORS, open_state_store
+from bot.subscriptions import Subscriber, SubscriptionRegistry
+from bot.templates import VERDICTS, MessageRenderer
+from bot.tracker import HomeworkStateIndex
+from bot.validation import HomeworkValidator, decode_response
+
+asyncio = lazy_import('asyncio')
+requests = lazy_import('requests')
+session = lazy_import('bot.session')
+telegram = lazy_import('telegram')
 
 PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 CHAT_ID = os.getenv('CHAT_ID')
+SUBSCRIBERS_DB = os.getenv('SUBSCRIBERS_DB')
+CURSOR_FILE = os.getenv('CURSOR_FILE', 'cursor.json')
+CURSOR_FLUSH_INTERVAL = float(os.getenv('CURSOR_FLUSH_INTERVAL', 1))
+HISTORY_DB = os.getenv('HISTORY_DB', 'history.db')
+STATE_STORE = os.getenv('STATE_STORE', 'sqlite:///state.db')
+OUTBOX_FILE = os.getenv('OUTBOX_FILE', 'outbox.log')
+ROUTES_FILE = os.getenv('ROUTES_FILE')
+FANOUT_WORKERS = int(os.getenv('FANOUT_WORKERS', 8))
+TELEGRAM_RATE = float(os.getenv('TELEGRAM_RATE', 30))
+FANOUT_DEDUP_WINDOW = float(os.getenv('FANOUT_DEDUP_WINDOW', 60))
+ASYNC_MODE = os.getenv('ASYNC_MODE') == '1'
+CONCURRENCY = int(os.getenv('CONCURRENCY', 50))
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', 10))
+CONNECT_TIMEOUT = float(os.getenv('CONNECT_TIMEOUT', 5))
+READ_TIMEOUT = float(os.getenv('READ_TIMEOUT', 30))
+API_COALESCE_TTL = float(os.getenv('API_COALESCE_TTL', 5))
+API_FAILURE_THRESHOLD = int(os.getenv('API_FAILURE_THRESHOLD', 5))
+API_RESET_TIMEOUT = float(os.getenv('API_RESET_TIMEOUT', 300))
+TELEGRAM_FAILURE_THRESHOLD = int(os.getenv('TELEGRAM_FAILURE_THRESHOLD', 5))
+TELEGRAM_RESET_TIMEOUT = float(os.getenv('TELEGRAM_RESET_TIMEOUT', 60))
 
-RETRY_TIME = 60 * 10
+RETRY_TIME = int(os.getenv('RETRY_TIME', 60 * 10))
+REVIEWING_RETRY_TIME = int(os.getenv('REVIEWING_RETRY_TIME', 60 * 2))
+MAX_BACKOFF_TIME = int(os.getenv('MAX_BACKOFF_TIME', 60 * 60 * 3))
+BACKOFF_JITTER = float(os.getenv('BACKOFF_JITTER', 0.2))
+OUTBOUND_QUEUE_SIZE = int(os.getenv('OUTBOUND_QUEUE_SIZE', 1000))
+METRICS_PORT = os.getenv('METRICS_PORT')
+SHARD_DB = os.getenv('SHARD_DB')
+COMMANDS = os.getenv('COMMANDS', '1') == '1'
+COMMANDS_POLL_TIMEOUT = int(os.getenv('COMMANDS_POLL_TIMEOUT', 25))
+WORKER_ID = os.getenv('WORKER_ID') or default_worker_id()
+SHARD_TTL = int(os.getenv('SHARD_TTL', 60))
+MESSAGE_LOCALE = os.getenv('MESSAGE_LOCALE', 'ru')
+MESSAGE_PARSE_MODE = os.getenv('MESSAGE_PARSE_MODE') or None
+MESSAGE_COMMENTS = os.getenv('MESSAGE_COMMENTS') == '1'
+MESSAGE_CACHE_SIZE = int(os.getenv('MESSAGE_CACHE_SIZE', 4096))
+SHUTDOWN_TIMEOUT = float(os.getenv('SHUTDOWN_TIMEOUT', 20))
+HEALTH_STALE_AFTER = float(os.getenv('HEALTH_STALE_AFTER', 60 * 30))
+ENV_FILE = os.getenv('ENV_FILE', '.env')
+TRACE_FILE = os.getenv('TRACE_FILE')
+TRACE_FORMAT = os.getenv('TRACE_FORMAT', 'chrome')
+PROFILE_FILE = os.getenv('PROFILE_FILE', 'profile-{pid}-{time}.folded')
+PROFILE_INTERVAL = float(os.getenv('PROFILE_INTERVAL', 0.005))
+LOG_FILE = os.getenv('LOG_FILE', 'program.log')
+LOG_JSON = os.getenv('LOG_JSON') == '1'
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', 10 * 2 ** 20))
+LOG_ROTATE_INTERVAL = int(os.getenv('LOG_ROTATE_INTERVAL', 60 * 60 * 24))
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', 7))
 ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
 
 HOMEWORK_STATUSES = {
@@ -20,59 +95,113 @@ HOMEWORK_STATUSES = {
     'rejected': 'Работа проверена, в ней нашлись ошибки.'
 }
 
-logging.basicConfig(
-    level=logging.DEBUG,
-    filename='program.log',
-    filemode='w',
-    format='%(asctime)s - %(levelname)s - %(message)s - %(name)s'
-)
-logger = logging.getLogger(__name__)
-logger.addHandler(
-    logging.StreamHandler()
-)
-
-
-class TheAnswerIsNot200Error(Exception):
-    """Ответ сервера не равен 200."""
-
-
-class EmptyDictionaryOrListError(Exception):
-    """Пустой словарь или список."""
+RELOADABLE = {
+    'PRACTICUM_TOKEN': str,
+    'CHAT_ID': str,
+    'RETRY_TIME': int,
+    'REVIEWING_RETRY_TIME': int,
+    'MAX_BACKOFF_TIME': int,
+    'BACKOFF_JITTER': float,
+    'ROUTES_FILE': str,
+}
 
+logger = logging.getLogger(__name__)
+health = Health(HEALTH_STALE_AFTER)
+validate_response = HomeworkValidator(HOMEWORK_STATUSES)
+renderer = MessageRenderer(
+    {'ru': HOMEWORK_STATUSES, **VERDICTS}, default_locale=MESSAGE_LOCALE,
+    parse_mode=MESSAGE_PARSE_MODE, cache_size=MESSAGE_CACHE_SIZE)
+coalescer = Coalescer(ttl=API_COALESCE_TTL)
+routes = RoutingTable()
+api_breaker = CircuitBreaker(
+    'API YP', API_FAILURE_THRESHOLD, API_RESET_TIMEOUT,
+    is_failure=is_api_outage)
+telegram_breaker = CircuitBreaker(
+    'Telegram', TELEGRAM_FAILURE_THRESHOLD, TELEGRAM_RESET_TIMEOUT,
+    is_failure=is_telegram_outage)
+telegram_rate = RateLimit(TELEGRAM_RATE)
 
-class UndocumentedStatusError(Exception):
-    """Недокументированный статус."""
 
+def send_message(bot, message):
+    """Отправка сообщения в Телеграм."""
+    send_message_to(bot, CHAT_ID, message)
 
-class RequestExceptionError(Exception):
-    """Ошибка запроса."""
 
+@metrics.instrument('send_message')
+def send_message_to(bot, chat_id, message):
+    """Отправка сообщения в указанный чат Телеграм.
 
-def send_message(bot, message):
-    """Отправка сообщения в Телеграм."""
+    Очередь принимает сообщение всегда, прямой вызов бота идёт через
+    предохранитель Telegram.
+    """
+    if isinstance(bot, OutboundQueue):
+        bot.send_message(chat_id, message)
+        return
     try:
-        bot.send_message(CHAT_ID, message)
+        telegram_breaker.call(
+            bot.send_message, chat_id, message, **send_options())
         logger.info(
             f'Сообщение в Telegram отправлено: {message}')
-    except telegram.TelegramError as telegram_error:
+    except (telegram.TelegramError, CircuitOpenError) as telegram_error:
         logger.error(
             f'Сообщение в Telegram не отправлено: {telegram_error}')
 
 
+def send_options():
+    """Параметры sendMessage: parse_mode, если он задан."""
+    if renderer.parse_mode is None:
+        return {}
+    return {'parse_mode': renderer.parse_mode}
+
+
 def get_api_answer(url, current_timestamp):
     """Получение данных с API YP."""
+    return fetch_homework_statuses(url, current_timestamp, PRACTICUM_TOKEN)
+
+
+def fetch_homework_statuses(url, current_timestamp, token, cache=None):
+    """Получение данных с API YP по токену подписчика.
+
+    Одновременные вызовы с тем же токеном, from_date и cache делят один
+    запрос. Ответ без cache ещё API_COALESCE_TTL секунд отдаётся из
+    памяти; с cache подписчик сам решает, что делать с повтором.
+    """
     current_timestamp = current_timestamp or int(time.time())
-    headers = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
+    return coalescer.call(
+        (url, token, current_timestamp, cache),
+        lambda: api_breaker.call(
+            request_homework_statuses, url, current_timestamp, token, cache),
+        remember=cache is None)
+
+
+@metrics.instrument('get_api_answer')
+def request_homework_statuses(url, current_timestamp, token, cache=None):
+    """Запрос к API YP.
+
+    С cache запрос условный, а неизменившийся ответ не разбирается.
+    """
+    headers = {'Authorization': f'OAuth {token}'}
+    if cache is not None:
+        headers.update(cache.request_headers())
     payload = {'from_date': current_timestamp}
     try:
-        response = requests.get(url, headers=headers, params=payload)
+        response = session.client().get(
+            url, headers=headers, params=payload,
+            timeout=(CONNECT_TIMEOUT, READ_TIMEOUT))
+        cached = cache.lookup(response) if cache is not None else None
+        if cached is not None:
+            return cached
         if response.status_code != 200:
             code_api_msg = (
                 f'Эндпоинт {url} недоступен.'
                 f' Код ответа API: {response.status_code}')
             logger.error(code_api_msg)
-            raise TheAnswerIsNot200Error(code_api_msg)
-        return response.json()
+            headers = getattr(response, 'headers', None) or {}
+            raise TheAnswerIsNot200Error(
+                code_api_msg, parse_retry_after(headers.get('Retry-After')),
+                response.status_code)
+        with tracing.TRACER.span('json.decode'):
+            return decode_response(response)
     except requests.exceptions.RequestException as request_error:
         code_api_msg = f'Код ответа API (RequestException): {request_error}'
         logger.error(code_api_msg)
@@ -80,11 +209,21 @@ def get_api_answer(url, current_timestamp):
     except json.JSONDecodeError as value_error:
         code_api_msg = f'Код ответа API (ValueError): {value_error}'
         logger.error(code_api_msg)
-        raise json.JSONDecodeError(code_api_msg) from value_error
+        raise json.JSONDecodeError(
+            code_api_msg, value_error.doc, value_error.pos) from value_error
 
 
 def parse_status(homework):
     """Анализируем статус если изменился."""
+    return render_status(homework)
+
+
+@metrics.instrument('parse_status')
+def render_status(homework, locale=None):
+    """Сообщение о статусе работы на языке подписчика.
+
+    Комментарий ревьюера добавляется, если включён MESSAGE_COMMENTS.
+    """
     status = homework.get('status')
     homework_name = homework.get('homework_name')
     if status is None:
@@ -93,8 +232,8 @@ def parse_status(homework):
     if homework_name is None:
         extracted_from_parse_status(
             'Ошибка пустое значение homework_name: ', homework_name)
-    verdict = HOMEWORK_STATUSES[status]
-    return f'Изменился статус проверки работы "{homework_name}". {verdict}'
+    comment = homework.get('reviewer_comment') if MESSAGE_COMMENTS else None
+    return renderer.render(status, homework_name, locale, comment)
 
 
 def extracted_from_parse_status(arg0, arg1):
@@ -105,20 +244,16 @@ def extracted_from_parse_status(arg0, arg1):
 
 def check_response(response):
     """Проверяем данные в response."""
-    if response.get('homeworks') is None:
-        code_api_msg = (
-            'Ошибка ключа homeworks или response'
-            'имеет неправильное значение.')
-        logger.error(code_api_msg)
-        raise EmptyDictionaryOrListError(code_api_msg)
-    if response['homeworks'] == []:
+    homeworks = check_homeworks(response)
+    if homeworks == []:
         return {}
-    status = response['homeworks'][0].get('status')
-    if status not in HOMEWORK_STATUSES:
-        code_api_msg = f'Ошибка недокументированный статус: {status}'
-        logger.error(code_api_msg)
-        raise UndocumentedStatusError(code_api_msg)
-    return response['homeworks'][0]
+    return homeworks[0]
+
+
+@metrics.instrument('check_response')
+def check_homeworks(response):
+    """Проверяем все работы в response за один проход."""
+    return validate_response(response)
 
 
 def check_tokens():
@@ -127,14 +262,16 @@ def check_tokens():
         'Программа принудительно остановлена. '
         'Отсутствует обязательная переменная окружения:')
     tokens_bool = True
-    if PRACTICUM_TOKEN is None:
-        tokens_bool = False
-        logger.critical(
-            f'{no_tokens_msg} PRACTICUM_TOKEN')
     if TELEGRAM_TOKEN is None:
         tokens_bool = False
         logger.critical(
             f'{no_tokens_msg} TELEGRAM_TOKEN')
+    if SUBSCRIBERS_DB is not None:
+        return tokens_bool
+    if PRACTICUM_TOKEN is None:
+        tokens_bool = False
+        logger.critical(
+            f'{no_tokens_msg} PRACTICUM_TOKEN')
     if CHAT_ID is None:
         tokens_bool = False
         logger.critical(
@@ -142,36 +279,738 @@ def check_tokens():
     return tokens_bool
 
 
+def load_subscribers(cursors):
+    """Подписчики из реестра и из переменных окружения.
+
+    Пара PRACTICUM_TOKEN/CHAT_ID в реестр не записывается: после SIGHUP
+    с другими значениями прежняя пара перестаёт опрашиваться.
+    """
+    registry = SubscriptionRegistry(SUBSCRIBERS_DB or ':memory:')
+    now = int(time.time())
+    subscribers = registry.load(current_timestamp=now)
+    registry.close()
+    if PRACTICUM_TOKEN is not None and CHAT_ID is not None:
+        configured = Subscriber(0, PRACTICUM_TOKEN, str(CHAT_ID))
+        if configured.key not in {
+                subscriber.key for subscriber in subscribers}:
+            subscribers.insert(0, configured)
+    for subscriber in subscribers:
+        subscriber.current_timestamp = cursors.get(subscriber.key, now)
+    return subscribers
+
+
+def advance_cursor(subscriber, response, cursors=None):
+    """Сдвигаем from_date подписчика на current_date из ответа."""
+    current_date = response.get('current_date')
+    if not isinstance(current_date, int):
+        return
+    if current_date > (subscriber.current_timestamp or 0):
+        subscriber.current_timestamp = current_date
+    if cursors is not None:
+        cursors.advance(subscriber.key, current_date)
+
+
+def commit_cursors(cursors, force=False):
+    """Записываем сдвинутые курсоры, не прерывая опрос.
+
+    Без force — не чаще CURSOR_FLUSH_INTERVAL; при ошибке курсоры
+    остаются в памяти и запишутся в следующий раз.
+    """
+    if cursors is None:
+        return
+    try:
+        if force:
+            cursors.flush()
+        else:
+            cursors.commit()
+    except OSError as error:
+        logger.error(f'Не удалось сохранить курсоры: {error}')
+
+
+def detect_changes(subscriber, response, transitions=None, state=None):
+    """Сообщения обо всех изменившихся статусах работ в ответе.
+
+    Со state статусы работ, которых ещё нет в памяти, берутся из
+    хранилища, а новые статусы сохраняются в него.
+    """
+    return [
+        message for _, message in detect_events(
+            subscriber, response, transitions, state)]
+
+
+def detect_events(subscriber, response, transitions=None, state=None):
+    """Изменившиеся работы вместе с сообщениями о них."""
+    homeworks = check_homeworks(response)
+    if state is not None:
+        restore_state(state, subscriber, homeworks)
+    changed = subscriber.homeworks.diff(homeworks)
+    if not changed:
+        logger.info(
+            f'Изменений нет для {subscriber}, проверим API позже',
+            extra={'subscriber': subscriber.key})
+    now = time.time()
+    for homework in changed:
+        changed_at = parse_timestamp(homework.get('date_updated'), now)
+        subscriber.history.append(
+            (changed_at, homework.get('homework_name'), homework['status']))
+        logger.info(
+            f'Новый статус {homework["status"]} у {subscriber}',
+            extra={
+                'subscriber': subscriber.key,
+                'homework': homework.get('homework_name')})
+    if changed and transitions is not None:
+        record_transitions(transitions, subscriber, changed, now)
+    if changed and state is not None:
+        save_state(state, subscriber, changed)
+    return [
+        (homework, render_status(homework, subscriber.locale))
+        for homework in changed]
+
+
+def routed_messages(subscriber, homework, message):
+    """Чаты из правил маршрутизации и текст для них.
+
+    Чаты группируются по title правила: перед текстом ставится строка
+    с title, чтобы в общем чате было видно, чья это работа.
+    """
+    if homework is None or not routes:
+        return []
+    groups = {}
+    for chat_id, title in routes.destinations(subscriber, homework).items():
+        groups.setdefault(title, []).append(chat_id)
+    return [
+        (chats, message if title is None
+         else f'{renderer.escape(title)}\n{message}')
+        for title, chats in groups.items()]
+
+
+def route_message(fanout, subscriber, homework, message):
+    """Ставим рассылку смены статуса в чаты из правил."""
+    if fanout is None:
+        return
+    for chats, text in routed_messages(subscriber, homework, message):
+        fanout.submit(chats, text)
+
+
+def restore_state(state, subscriber, homeworks):
+    """Подгружаем из хранилища статусы работ, неизвестные в памяти."""
+    index = subscriber.homeworks
+    missing = index.missing(homeworks)
+    if not missing:
+        return
+    try:
+        index.seed(state.get_many(subscriber.key, missing))
+    except STATE_ERRORS as error:
+        logger.error(f'Хранилище статусов недоступно: {error}')
+
+
+def save_state(state, subscriber, changed):
+    """Ставим новые статусы работ в очередь на запись в хранилище."""
+    key = subscriber.homeworks.key
+    try:
+        state.set_many(subscriber.key, {
+            key(homework): (homework['status'], homework.get('homework_name'))
+            for homework in changed})
+    except STATE_ERRORS as error:
+        logger.error(f'Не удалось сохранить статусы работ: {error}')
+
+
+def commit_state(state):
+    """Записываем накопленные статусы после того, как сообщения в outbox."""
+    if state is None:
+        return
+    try:
+        state.flush()
+    except STATE_ERRORS as error:
+        logger.error(f'Не удалось сохранить статусы работ: {error}')
+
+
+def close_state(state):
+    """Дописываем очередь статусов и закрываем хранилище."""
+    try:
+        state.close()
+    except STATE_ERRORS as error:
+        logger.error(f'Статусы работ не сохранены при остановке: {error}')
+
+
+def record_transitions(transitions, subscriber, changed, now):
+    """Сохраняем переходы статусов в историю, не прерывая опрос."""
+    try:
+        transitions.record_many(
+            (subscriber.key,
+             homework.get('homework_name') or str(homework.get('id')),
+             homework['status'],
+             parse_timestamp(homework.get('date_updated'), now),
+             homework.get('reviewer_comment'))
+            for homework in changed)
+    except sqlite3.Error as error:
+        logger.error(f'Не удалось сохранить историю статусов: {error}')
+
+
+def record_outcome(subscriber, error=None):
+    """Запоминаем ошибки API подряд для расчёта паузы до опроса.
+
+    После любой ошибки кеш ответа сбрасывается, чтобы тот же ответ
+    разобрали и проверили заново.
+    """
+    if error is None:
+        subscriber.failures = 0
+        subscriber.retry_after = None
+        return
+    subscriber.cache.forget()
+    if isinstance(error, (
+            TheAnswerIsNot200Error, RequestExceptionError, CircuitOpenError)):
+        subscriber.failures += 1
+        subscriber.retry_after = getattr(error, 'retry_after', None)
+
+
+def circuit_message(breaker, state):
+    """Текст уведомления о размыкании или восстановлении цепи."""
+    if state == 'open':
+        return renderer.escape(
+            f'{breaker.name} недоступен, запросы приостановлены на '
+            f'{breaker.reset_timeout:g} с')
+    return renderer.escape(f'{breaker.name} снова доступен')
+
+
+def watch_circuits(notify, subscribers):
+    """Сообщаем в CHAT_ID о размыкании и восстановлении цепей.
+
+    О недоступности Telegram можно только написать в лог: сообщение
+    ушло бы через ту же разомкнутую цепь. Когда API восстановилось,
+    подписчики снова узнают о следующем сбое.
+    """
+    def on_change(breaker, state):
+        message = circuit_message(breaker, state)
+        logger.critical(message)
+        if breaker is api_breaker and state == 'closed':
+            for subscriber in subscribers:
+                subscriber.errors = True
+        if CHAT_ID is None:
+            return
+        if breaker is telegram_breaker and state == 'open':
+            return
+        notify(message)
+
+    api_breaker.on_change = on_change
+    telegram_breaker.on_change = on_change
+
+
+def retry_policy():
+    """Политика интервалов опроса из настроек."""
+    return RetryPolicy(
+        RETRY_TIME, reviewing_interval=REVIEWING_RETRY_TIME,
+        max_backoff=MAX_BACKOFF_TIME, jitter=BACKOFF_JITTER)
+
+
+def failure_message(subscriber, error):
+    """Сообщение о сбое, отправляется подписчику только первый раз.
+
+    Следующий сбой снова попадёт в чат после цикла, в котором ответ
+    получен и прошёл проверку.
+    """
+    message = f'Сбой в работе программы: {error}'
+    logger.critical(message)
+    message = renderer.escape(message)
+    if subscriber.errors:
+        subscriber.errors = False
+        return [message]
+    return []
+
+
+def commit_messages(bot):
+    """Фиксируем сообщения в outbox до того, как сдвинуть курсор."""
+    if isinstance(bot, OutboundQueue):
+        bot.flush()
+
+
+def commit_cycle(bot, state):
+    """Фиксируем сообщения цикла в outbox, затем статусы работ."""
+    commit_messages(bot)
+    commit_state(state)
+
+
+@tracing.trace(
+    'poll_cycle', lambda bot, subscriber, *args: {
+        'subscriber': subscriber.key})
+def poll_subscriber(
+        bot, subscriber, cursors=None, transitions=None, state=None,
+        fanout=None):
+    """Один цикл проверки статуса для подписчика.
+
+    Смены статусов дополнительно рассылаются через fanout в чаты из
+    правил маршрутизации.
+    """
+    if subscriber.paused:
+        return
+    started = time.perf_counter()
+    try:
+        response = fetch_homework_statuses(
+            ENDPOINT, subscriber.current_timestamp,
+            subscriber.practicum_token, subscriber.cache)
+        latency = time.perf_counter() - started
+        logger.debug(
+            f'Ответ API для {subscriber} за {latency:.3f} с',
+            extra={'subscriber': subscriber.key, 'latency': latency})
+        record_outcome(subscriber)
+        events = detect_events(subscriber, response, transitions, state)
+        subscriber.errors = True
+    except Exception as error:
+        response = None
+        record_outcome(subscriber, error)
+        events = [
+            (None, message)
+            for message in failure_message(subscriber, error)]
+    for homework, message in events:
+        send_message_to(bot, subscriber.chat_id, message)
+        route_message(fanout, subscriber, homework, message)
+    if events:
+        commit_cycle(bot, state)
+    if response is not None:
+        advance_cursor(subscriber, response, cursors)
+        commit_cursors(cursors)
+        health.polled()
+
+
+@tracing.trace(
+    'poll_cycle', lambda client, bot, subscriber, *args: {
+        'subscriber': subscriber.key})
+async def poll_subscriber_async(
+        client, bot, subscriber, cursors=None, transitions=None, state=None,
+        fanout=None):
+    """Один цикл проверки статуса для подписчика в asyncio-режиме.
+
+    API опрашивается через client, а сообщения ставятся в очередь bot,
+    как в poll_subscriber. Запись outbox, статусов и курсоров идёт в
+    потоке, чтобы медленный диск или Redis не задерживал другие опросы.
+    """
+    if subscriber.paused:
+        return
+    try:
+        token = subscriber.practicum_token
+        current_timestamp = subscriber.current_timestamp
+        response = await coalescer.call_async(
+            (ENDPOINT, token, current_timestamp, None),
+            lambda: api_breaker.call_async(
+                client.get_api_answer, ENDPOINT, current_timestamp, token))
+        record_outcome(subscriber)
+        events = detect_events(subscriber, response, transitions, state)
+        subscriber.errors = True
+    except Exception as error:
+        response = None
+        record_outcome(subscriber, error)
+        events = [
+            (None, message)
+            for message in failure_message(subscriber, error)]
+    for homework, message in events:
+        send_message_to(bot, subscriber.chat_id, message)
+        if fanout is not None:
+            for chats, text in routed_messages(subscriber, homework, message):
+                fanout.submit_async(chats, text)
+    if events:
+        await asyncio.to_thread(commit_cycle, bot, state)
+    if response is not None:
+        advance_cursor(subscriber, response, cursors)
+        if cursors is not None and cursors.due():
+            await asyncio.to_thread(commit_cursors, cursors)
+        health.polled()
+
+
+async def main_async(
+        bot, subscribers, cursors, owns=None, transitions=None, reload=None,
+        state=None):
+    """Опрос подписчиков корутинами с ограничением параллельности.
+
+    Сообщения подписчикам уходят через ту же очередь с outbox, что и в
+    синхронном режиме. Рассылка по правилам идёт отдельными задачами и
+    не занимает слот опроса.
+    """
+    from bot.aio import AsyncClient, AsyncPollScheduler
+
+    outbound = start_outbound(bot, subscribers)
+    try:
+        async with AsyncClient(
+                TELEGRAM_TOKEN, connect_timeout=CONNECT_TIMEOUT,
+                read_timeout=READ_TIMEOUT, limit=HTTP_POOL_SIZE,
+                breaker=telegram_breaker,
+                parse_mode=renderer.parse_mode) as client:
+            fanout = make_fanout(client.deliver, outbound.outbox)
+            scheduler = AsyncPollScheduler(
+                subscribers, RETRY_TIME,
+                poll=lambda subscriber: poll_subscriber_async(
+                    client, outbound, subscriber, cursors, transitions,
+                    state, fanout),
+                concurrency=CONCURRENCY, policy=retry_policy(), owns=owns)
+            handle_signals(
+                scheduler, reload,
+                asyncio.get_running_loop().add_signal_handler)
+            try:
+                await scheduler.run_forever(drain_timeout=SHUTDOWN_TIMEOUT)
+            finally:
+                if not await fanout.close_async(
+                        timeout=health.time_left(SHUTDOWN_TIMEOUT)):
+                    logger.warning('Рассылка по правилам не завершена')
+    finally:
+        stop_outbound(outbound)
+
+
+def configure_logging():
+    """Логирование в LOG_FILE; вызывается при запуске, а не при импорте."""
+    setup_logging(
+        LOG_FILE,
+        level=logging.DEBUG,
+        json_lines=LOG_JSON,
+        max_bytes=LOG_MAX_BYTES,
+        interval=LOG_ROTATE_INTERVAL,
+        backup_count=LOG_BACKUP_COUNT
+    )
+
+
 def main():
     """Главная функция запуска бота."""
+    from telegram.utils.request import Request
+
+    configure_logging()
+    try:
+        apply_config()
+    except ValueError as error:
+        logger.critical(f'Ошибка в {ENV_FILE}: {error}')
+        exit()
     if not check_tokens():
         exit()
-    bot = telegram.Bot(token=TELEGRAM_TOKEN)
+    session.install(HTTP_POOL_SIZE, CONNECT_TIMEOUT, READ_TIMEOUT)
+    bot = telegram.Bot(
+        token=TELEGRAM_TOKEN,
+        request=Request(
+            con_pool_size=HTTP_POOL_SIZE,
+            connect_timeout=CONNECT_TIMEOUT,
+            read_timeout=READ_TIMEOUT))
     now = datetime.datetime.now()
-    send_message(
-        bot,
-        f'Я начал свою работу: {now.strftime("%d-%m-%Y %H:%M")}')
-    current_timestamp = int(time.time())
-    tmp_status = 'reviewing'
-    errors = True
-    while True:
-        try:
-            response = get_api_answer(ENDPOINT, current_timestamp)
-            homework = check_response(response)
-            if homework and tmp_status != homework['status']:
-                message = parse_status(homework)
-                send_message(bot, message)
-                tmp_status = homework['status']
+    if CHAT_ID is not None and SHARD_DB is None:
+        send_message(
+            bot,
+            renderer.escape(
+                f'Я начал свою работу: {now.strftime("%d-%m-%Y %H:%M")}'))
+    coordinator = start_sharding()
+    cursors = CursorStore(
+        state_path(CURSOR_FILE), flush_interval=CURSOR_FLUSH_INTERVAL)
+    owns = ownership(coordinator, cursors)
+    subscribers = load_subscribers(cursors)
+    load_routing()
+    if METRICS_PORT is not None:
+        metrics.serve(int(METRICS_PORT), health=health)
+    commands = start_commands(bot, subscribers)
+    transitions = TransitionStore(HISTORY_DB)
+    state = open_state_store(STATE_STORE)
+    reload = functools.partial(
+        reload_config, subscribers=subscribers, cursors=cursors,
+        handler=commands and commands.handler)
+    profiler = start_profiling()
+    health.start()
+    try:
+        if ASYNC_MODE:
             logger.info(
-                'Изменений нет, ждем 10 минут и проверяем API')
-            time.sleep(RETRY_TIME)
-        except Exception as error:
-            message = f'Сбой в работе программы: {error}'
-            if errors:
-                errors = False
-                send_message(bot, message)
-            logger.critical(message)
-            time.sleep(RETRY_TIME)
+                f'Подписчиков в работе: {len(subscribers)}, '
+                f'asyncio, параллельно до {CONCURRENCY}')
+            asyncio.run(main_async(
+                bot, subscribers, cursors, owns, transitions, reload, state))
+        else:
+            run_sync(
+                bot, subscribers, cursors, owns, transitions, reload, state)
+    finally:
+        profiler.stop()
+        profiler.join(timeout=1)
+        tracing.TRACER.stop()
+        commit_cursors(cursors, force=True)
+        transitions.close()
+        close_state(state)
+        if commands is not None:
+            commands.stop(timeout=1)
+        if coordinator is not None:
+            coordinator.stop()
+
+
+def state_path(path):
+    """Файл состояния; при шардировании у каждого воркера свой."""
+    if SHARD_DB is None:
+        return path
+    return worker_path(path, WORKER_ID)
+
+
+def start_commands(bot, subscribers):
+    """Приём команд в отдельном потоке.
+
+    При шардировании getUpdates может читать только один процесс,
+    поэтому команды отключены.
+    """
+    if not COMMANDS or SHARD_DB is not None:
+        return None
+    handler = CommandHandler(subscribers, HOMEWORK_STATUSES)
+    return UpdatePoller(bot, handler, timeout=COMMANDS_POLL_TIMEOUT).start()
+
+
+def read_config(path):
+    """Настройки из RELOADABLE: окружение, поверх него файл path."""
+    from dotenv import dotenv_values
+
+    values = {**os.environ}
+    if os.path.exists(path):
+        values.update(dotenv_values(path))
+    return {
+        name: convert(values[name])
+        for name, convert in RELOADABLE.items()
+        if values.get(name) is not None}
+
+
+def apply_config():
+    """Применяем настройки из ENV_FILE, при запуске и по SIGHUP."""
+    globals().update(read_config(ENV_FILE))
+
+
+def reload_config(scheduler, subscribers, cursors, handler=None):
+    """Перечитываем ENV_FILE и реестр подписчиков, не теряя состояния.
+
+    Подписчики с тем же токеном и чатом остаются прежними объектами со
+    статусами работ, курсором и историей; интервалы опроса меняются
+    со следующего опроса.
+    """
+    try:
+        apply_config()
+        fresh = load_subscribers(cursors)
+    except (ValueError, sqlite3.Error) as error:
+        logger.error(f'Настройки не перечитаны: {error}')
+        return
+    scheduler.interval = RETRY_TIME
+    scheduler.policy = retry_policy()
+    known = {subscriber.key: subscriber for subscriber in subscribers}
+    subscribers[:] = [
+        known.get(subscriber.key, subscriber) for subscriber in fresh]
+    added, removed = scheduler.replace(subscribers)
+    load_routing()
+    if handler is not None:
+        handler.update(subscribers)
+    logger.info(
+        f'Настройки перечитаны, подписчиков: {len(subscribers)}, '
+        f'добавлено {added}, удалено {removed}')
+
+
+def handle_signals(scheduler, reload=None, install=signal.signal):
+    """SIGTERM и SIGINT останавливают опрос, SIGHUP перечитывает настройки.
+
+    Обработчики только ставят флаги, работа идёт в цикле планировщика.
+    """
+    def stop(*args):
+        health.stop()
+        scheduler.stop()
+
+    install(signal.SIGTERM, stop)
+    install(signal.SIGINT, stop)
+    if reload is not None and hasattr(signal, 'SIGHUP'):
+        install(
+            signal.SIGHUP,
+            lambda *args: scheduler.call_soon(lambda: reload(scheduler)))
+
+
+def load_routing():
+    """Правила маршрутизации из ROUTES_FILE.
+
+    Если файл не читается, остаются прежние правила.
+    """
+    if not ROUTES_FILE:
+        routes.replace(())
+        return
+    try:
+        routes.replace(load_routes(ROUTES_FILE))
+    except (OSError, ValueError) as error:
+        logger.error(f'Правила маршрутизации не загружены: {error}')
+        return
+    logger.info(f'Правил маршрутизации: {len(routes)}')
+
+
+def make_fanout(send, outbox=None):
+    """Рассылка по правилам маршрутизации с лимитами из настроек.
+
+    Копии пишутся в тот же outbox, что и сообщения подписчикам, и
+    фиксируются на диске вместе с ними в commit_messages.
+    """
+    from bot.fanout import FanOut
+
+    return FanOut(
+        send, rate=telegram_rate, workers=FANOUT_WORKERS,
+        dedup_window=FANOUT_DEDUP_WINDOW, outbox=outbox)
+
+
+def start_profiling(install=signal.signal):
+    """Трассировка циклов в TRACE_FILE и профилировщик по SIGUSR1.
+
+    Первый SIGUSR1 запускает сбор стеков, второй сохраняет их в
+    PROFILE_FILE в формате для flamegraph.pl и speedscope.
+    """
+    from bot.profiler import SamplingProfiler
+
+    if TRACE_FILE:
+        tracing.TRACER.start(TRACE_FILE, TRACE_FORMAT)
+        logger.info(f'Трассировка циклов опроса пишется в {TRACE_FILE}')
+    profiler = SamplingProfiler(PROFILE_INTERVAL, PROFILE_FILE)
+    if hasattr(signal, 'SIGUSR1'):
+        install(signal.SIGUSR1, lambda *args: profiler.toggle())
+    return profiler
+
+
+def start_sharding():
+    """Координатор шардирования, если задан SHARD_DB."""
+    if SHARD_DB is None:
+        return None
+    coordinator = ShardCoordinator(
+        LeaseStore(SHARD_DB), WORKER_ID, ttl=SHARD_TTL).start()
+    logger.info(
+        f'Воркер {WORKER_ID}, живых воркеров: '
+        f'{len(coordinator.ring.nodes)}')
+    return coordinator
+
+
+def ownership(coordinator, cursors):
+    """Проверка для планировщика, опрашивает ли воркер подписчика.
+
+    Пока кольцо менялось, подписчика мог опрашивать другой воркер,
+    поэтому после смены состава статусы работ в памяти забываются и
+    берутся из общего хранилища, а from_date — из курсора.
+    """
+    if coordinator is None:
+        return None
+    rings = {}
+
+    def owns(subscriber):
+        key = subscriber.key
+        if not coordinator.owns(key):
+            if key in rings:
+                rings[key] = None
+            return False
+        ring = coordinator.ring
+        if rings.get(key) is not ring:
+            if key in rings:
+                subscriber.homeworks = HomeworkStateIndex()
+                subscriber.cache.forget()
+                subscriber.current_timestamp = cursors.get(
+                    key, subscriber.current_timestamp)
+            rings[key] = ring
+        return True
+
+    return owns
+
+
+def register_metrics(scheduler, outbound, outbox, fanout):
+    """Глубины очередей и счётчики компонентов для /metrics."""
+    registry = metrics.REGISTRY
+    registry.gauge(
+        'homework_bot_subscribers', 'Подписчиков в планировщике',
+        lambda: len(scheduler))
+    registry.gauge(
+        'homework_bot_outbound_queue_depth',
+        'Сообщений в очереди на отправку', lambda: len(outbound))
+    registry.gauge(
+        'homework_bot_outbox_pending', 'Неподтверждённых сообщений в outbox',
+        lambda: len(outbox))
+    for name in (
+            'sent', 'dropped', 'deferred', 'failed', 'retried', 'coalesced'):
+        registry.gauge(
+            'homework_bot_outbound_messages_total',
+            'Сообщения очереди Telegram по исходу',
+            lambda name=name: outbound.stats[name], {'outcome': name},
+            kind='counter')
+    for name in ('sent', 'duplicate', 'failed', 'retried'):
+        registry.gauge(
+            'homework_bot_fanout_messages_total',
+            'Сообщения рассылки по правилам маршрутизации по исходу',
+            lambda name=name: fanout.stats[name], {'outcome': name},
+            kind='counter')
+    for name in ('polls', 'parsed', 'not_modified', 'short_circuited'):
+        registry.gauge(
+            'homework_bot_response_cache_total',
+            'Опросы API по исходу проверки кеша ответа',
+            lambda name=name: response_cache.STATS[name],
+            {'outcome': name}, kind='counter')
+    for name in ('request', 'shared', 'cached'):
+        registry.gauge(
+            'homework_bot_api_calls_total',
+            'Вызовы API YP: запрос, ожидание чужого запроса или кеш',
+            lambda name=name: coalescer.stats[name], {'outcome': name},
+            kind='counter')
+    for name in ('hits', 'misses'):
+        registry.gauge(
+            'homework_bot_message_cache_total',
+            'Сообщения о статусе из кеша и отрисованные заново',
+            lambda name=name: getattr(renderer.cache_info(), name),
+            {'outcome': name}, kind='counter')
+    for breaker in (api_breaker, telegram_breaker):
+        registry.gauge(
+            'homework_bot_circuit_state',
+            'Состояние предохранителя: 0 — замкнут, 1 — проба, 2 — разомкнут',
+            breaker.value, {'dependency': breaker.name})
+        for name in ('opened', 'rejected'):
+            registry.gauge(
+                'homework_bot_circuit_events_total',
+                'Размыкания предохранителя и пропущенные вызовы',
+                lambda breaker=breaker, name=name: breaker.stats[name],
+                {'dependency': breaker.name, 'event': name}, kind='counter')
+    pooled = session.shared()
+    if pooled is not None:
+        for name in ('requests', 'connections', 'reused'):
+            registry.gauge(
+                'homework_bot_http_total', 'Запросы и соединения пула HTTP',
+                lambda name=name: pooled.stats()[name], {'kind': name},
+                kind='counter')
+
+
+def run_sync(
+        bot, subscribers, cursors, owns=None, transitions=None, reload=None,
+        state=None):
+    """Опрос в одном потоке, отправка в Telegram — в отдельном.
+
+    После SIGTERM очередь сообщений досылается не дольше
+    SHUTDOWN_TIMEOUT секунд; неотправленное остаётся в outbox.
+    """
+    outbound = start_outbound(bot, subscribers)
+    fanout = make_fanout(
+        lambda chat_id, text: telegram_breaker.call(
+            bot.send_message, chat_id, text, **send_options()),
+        outbound.outbox)
+    scheduler = PollScheduler(
+        subscribers, RETRY_TIME,
+        poll=health.watch(lambda subscriber: poll_subscriber(
+            outbound, subscriber, cursors, transitions, state, fanout)),
+        policy=retry_policy(), owns=owns)
+    logger.info(f'Подписчиков в работе: {len(scheduler)}')
+    register_metrics(scheduler, outbound, outbound.outbox, fanout)
+    handle_signals(scheduler, reload)
+    try:
+        scheduler.run_forever()
+    finally:
+        if not fanout.close(timeout=health.time_left(SHUTDOWN_TIMEOUT)):
+            logger.warning('Рассылка по правилам не завершена')
+        stop_outbound(outbound)
+
+
+def start_outbound(bot, subscribers):
+    """Очередь отправки в Telegram с outbox и досылкой прошлых сообщений."""
+    outbound = OutboundQueue(
+        bot, maxsize=OUTBOUND_QUEUE_SIZE,
+        outbox=Outbox(state_path(OUTBOX_FILE)), breaker=telegram_breaker,
+        parse_mode=renderer.parse_mode, rate=telegram_rate)
+    watch_circuits(
+        lambda text: outbound.send_message(CHAT_ID, text), subscribers)
+    outbound.replay()
+    return outbound.start()
+
+
+def stop_outbound(outbound):
+    """Досылаем очередь не дольше оставшегося SHUTDOWN_TIMEOUT."""
+    if not outbound.stop(timeout=health.time_left(SHUTDOWN_TIMEOUT)):
+        logger.warning(
+            f'Не отправлено сообщений: {len(outbound)}, '
+            'они останутся в outbox до запуска')
+    outbound.outbox.close()
+    logger.info('Опрос остановлен')
 
 
 if __name__ == '__main__':
@@ -1,9 +1,30 @@
+import collections
 import sys
 from os.path import abspath, dirname
 
+import pytest
+
 root_dir = dirname(dirname(abspath(__file__)))
 sys.path.append(root_dir)
 
 pytest_plugins = [
     'tests.fixtures.fixture_data'
 ]
+
+
+@pytest.fixture(autouse=True)
+def isolated_homework_state(monkeypatch):
+    """Цепи и кеш запросов homework не переходят из теста в тест."""
+    import homework
+    from bot.breaker import CLOSED
+    from bot.coalesce import Coalescer
+
+    for breaker in (homework.api_breaker, homework.telegram_breaker):
+        monkeypatch.setattr(breaker, 'state', CLOSED)
+        monkeypatch.setattr(breaker, 'failures', 0)
+        monkeypatch.setattr(breaker, 'opened_at', None)
+        monkeypatch.setattr(breaker, '_probing', False)
+        monkeypatch.setattr(breaker, 'on_change', None)
+        monkeypatch.setattr(breaker, 'stats', collections.Counter())
+    monkeypatch.setattr(
+        homework, 'coalescer', Coalescer(ttl=homework.API_COALESCE_TTL))
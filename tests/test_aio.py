@@ -0,0 +1,86 @@
+import asyncio
+import threading
+
+import pytest
+import telegram
+
+from benchmarks.stub_server import StubServer
+from bot.aio import AsyncClient, AsyncPollScheduler
+from bot.cursor import CursorStore
+from bot.exceptions import TheAnswerIsNot200Error
+from bot.outbound import OutboundQueue
+from bot.state import MemoryStateStore
+from bot.subscriptions import Subscriber
+
+
+def test_scheduler_respects_concurrency_limit():
+    active = 0
+    peak = 0
+
+    async def poll(subscriber):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.001)
+        active -= 1
+
+    subscribers = [Subscriber(i, f't{i}', i) for i in range(20)]
+    scheduler = AsyncPollScheduler(subscribers, 600, poll, concurrency=3)
+    asyncio.run(scheduler.run_once())
+    assert peak == 3, 'Одновременно должно выполняться не больше 3 опросов'
+
+
+class ThreadRecordingState(MemoryStateStore):
+
+    def __init__(self):
+        super().__init__()
+        self.flushed_in = []
+
+    def flush(self):
+        self.flushed_in.append(threading.current_thread())
+
+
+def test_poll_subscriber_async_sends_status(monkeypatch, tmp_path):
+    import homework
+
+    homeworks = [{'homework_name': 'hw1', 'status': 'approved'}]
+    with StubServer(homeworks=homeworks) as server:
+        monkeypatch.setattr(homework, 'ENDPOINT', server.endpoint)
+        subscriber = Subscriber(1, 'token', 42, current_timestamp=1)
+
+        bot = telegram.Bot('123:abc', base_url=server.base_url + '/bot')
+        outbound = OutboundQueue(bot).start()
+        cursors = CursorStore(str(tmp_path / 'cursor.json'))
+        state = ThreadRecordingState()
+
+        async def run():
+            async with AsyncClient(
+                    'bot-token', telegram_api=server.base_url) as client:
+                await homework.poll_subscriber_async(
+                    client, outbound, subscriber, cursors, state=state)
+                await homework.poll_subscriber_async(
+                    client, outbound, subscriber, cursors, state=state)
+
+        asyncio.run(run())
+        assert outbound.stop(timeout=2)
+    assert subscriber.homeworks.get('hw1') == 'approved'
+    assert CursorStore(cursors.path).get(subscriber.key) == (
+        subscriber.current_timestamp)
+    assert len(state.flushed_in) == 1
+    assert state.flushed_in[0] is not threading.main_thread(), (
+        'Статусы не должны записываться в цикле событий')
+    assert len(server.sent) == 1
+    assert int(server.sent[0]['chat_id']) == 42
+    assert server.sent[0]['text'].startswith(
+        'Изменился статус проверки работы "hw1"')
+
+
+def test_async_get_api_answer_not_200():
+    with StubServer() as server:
+        async def run():
+            async with AsyncClient('bot-token') as client:
+                await client.get_api_answer(
+                    server.base_url + '/missing/', 1, 'token')
+
+        with pytest.raises(TheAnswerIsNot200Error):
+            asyncio.run(run())
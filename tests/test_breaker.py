@@ -0,0 +1,134 @@
+import pytest
+import telegram
+
+import homework
+from benchmarks.stub_server import StubServer
+from bot.breaker import (CLOSED, HALF_OPEN, OPEN, CircuitBreaker,
+                         is_api_outage, is_telegram_outage)
+from bot.coalesce import Coalescer
+from bot.exceptions import CircuitOpenError, TheAnswerIsNot200Error
+from bot.outbound import OutboundQueue
+from bot.scheduler import FakeClock
+from bot.subscriptions import Subscriber
+
+
+def fail():
+    raise TheAnswerIsNot200Error('503', status_code=503)
+
+
+def make_breaker(changes):
+    clock = FakeClock()
+    breaker = CircuitBreaker(
+        'API', failure_threshold=3, reset_timeout=60,
+        is_failure=is_api_outage, clock=clock,
+        on_change=lambda breaker, state: changes.append(state))
+    return breaker, clock
+
+
+def test_breaker_opens_probes_and_recovers():
+    changes = []
+    breaker, clock = make_breaker(changes)
+    for _ in range(3):
+        with pytest.raises(TheAnswerIsNot200Error):
+            breaker.call(fail)
+    assert breaker.state == OPEN
+    calls = []
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.call(calls.append, 1)
+    assert calls == []
+    assert error.value.retry_after == 60
+    clock.sleep(60)
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow(), 'Во время пробы другие вызовы пропускаются'
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    clock.sleep(60)
+    assert breaker.call(lambda: 'ok') == 'ok'
+    assert breaker.state == CLOSED
+    assert changes == [OPEN, CLOSED]
+    assert breaker.stats == {'opened': 1, 'rejected': 2}
+
+
+def test_subscriber_errors_do_not_open_circuit():
+    breaker, _ = make_breaker([])
+
+    def unauthorized():
+        raise TheAnswerIsNot200Error('401', status_code=401)
+
+    for _ in range(5):
+        with pytest.raises(TheAnswerIsNot200Error):
+            breaker.call(unauthorized)
+    assert breaker.state == CLOSED
+
+
+def test_telegram_outage_classification():
+    assert is_telegram_outage(telegram.error.TimedOut())
+    assert not is_telegram_outage(telegram.error.BadRequest('chat'))
+    assert not is_telegram_outage(telegram.error.RetryAfter(1))
+
+
+def test_outbound_waits_for_open_circuit_without_spending_retries():
+    clock = FakeClock()
+    breaker = CircuitBreaker(
+        'Telegram', failure_threshold=1, reset_timeout=30,
+        is_failure=is_telegram_outage, clock=clock)
+    breaker.record_failure()
+    sent = []
+
+    class Bot:
+        def send_message(self, chat_id, text):
+            sent.append((clock(), text))
+
+    queue = OutboundQueue(
+        Bot(), max_retries=1, breaker=breaker, clock=clock,
+        sleep=clock.sleep)
+    queue._deliver(1, [('text', 0, None)])
+    assert sent == [(30, 'text')]
+    assert breaker.state == CLOSED
+
+
+def test_new_outage_is_reported_after_recovery(monkeypatch):
+    subscriber = Subscriber(1, 'token', 1)
+    notified = []
+    monkeypatch.setattr(homework, 'CHAT_ID', '1')
+    monkeypatch.setattr(homework.api_breaker, 'on_change', None)
+    monkeypatch.setattr(homework.telegram_breaker, 'on_change', None)
+    homework.watch_circuits(notified.append, [subscriber])
+    error = CircuitOpenError('API YP недоступен', 60)
+    assert homework.failure_message(subscriber, error)
+    assert not homework.failure_message(subscriber, error)
+    homework.api_breaker.on_change(homework.api_breaker, OPEN)
+    homework.api_breaker.on_change(homework.api_breaker, CLOSED)
+    assert homework.failure_message(subscriber, error)
+    assert notified == [
+        'API YP недоступен, запросы приостановлены на 300 с',
+        'API YP снова доступен']
+
+
+def poll_statuses(monkeypatch, statuses):
+    class Bot:
+        sent = []
+
+        def send_message(self, chat_id, text, **kwargs):
+            self.sent.append(text)
+
+    monkeypatch.setattr(homework, 'coalescer', Coalescer(ttl=0))
+    subscriber = Subscriber(1, 'token', 1, current_timestamp=1)
+    bot = Bot()
+    with StubServer() as server:
+        monkeypatch.setattr(homework, 'ENDPOINT', server.endpoint)
+        for status in statuses:
+            server.homeworks = [{'homework_name': 'hw', 'status': status}]
+            homework.poll_subscriber(bot, subscriber)
+    return [text.startswith('Сбой в работе программы') for text in bot.sent]
+
+
+def test_invalid_response_is_reported_once(monkeypatch):
+    assert poll_statuses(monkeypatch, ['weird'] * 4) == [True]
+
+
+def test_failure_is_reported_again_after_successful_poll(monkeypatch):
+    assert poll_statuses(
+        monkeypatch, ['weird', 'weird', 'reviewing', 'weird']) == [
+        True, False, True]
@@ -0,0 +1,84 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from bot.coalesce import Coalescer
+from bot.scheduler import FakeClock
+
+
+def test_concurrent_calls_share_one_request():
+    coalescer = Coalescer(ttl=5)
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait()
+        return {'homeworks': []}
+
+    results = []
+    leader = threading.Thread(
+        target=lambda: results.append(coalescer.call('key', fetch)))
+    leader.start()
+    started.wait()
+    followers = [
+        threading.Thread(
+            target=lambda: results.append(coalescer.call('key', fetch)))
+        for _ in range(9)]
+    for thread in followers:
+        thread.start()
+    while coalescer.stats['shared'] < 9:
+        time.sleep(0.001)
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join()
+    assert calls == [1]
+    assert len(results) == 10
+    assert all(result is results[0] for result in results)
+    assert coalescer.stats == {'request': 1, 'shared': 9}
+
+
+def test_result_is_remembered_for_ttl():
+    clock = FakeClock()
+    coalescer = Coalescer(ttl=5, clock=clock)
+    assert coalescer.call('key', lambda: 1) == 1
+    assert coalescer.call('key', lambda: 2) == 1
+    assert coalescer.call('key', lambda: 3, remember=False) == 1
+    clock.sleep(5)
+    assert coalescer.call('key', lambda: 4, remember=False) == 4
+    assert coalescer.call('key', lambda: 5) == 5
+    assert coalescer.stats == {'request': 3, 'cached': 2}
+
+
+def test_errors_are_not_remembered():
+    coalescer = Coalescer(ttl=5)
+
+    def fail():
+        raise ValueError('boom')
+
+    with pytest.raises(ValueError):
+        coalescer.call('key', fail)
+    assert coalescer.call('key', lambda: 'ok') == 'ok'
+    assert len(coalescer) == 1
+
+
+def test_async_calls_share_one_request():
+    coalescer = Coalescer(ttl=5)
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return 'answer'
+
+    async def burst():
+        return await asyncio.gather(*(
+            coalescer.call_async('key', fetch) for _ in range(20)))
+
+    assert asyncio.run(burst()) == ['answer'] * 20
+    assert calls == [1]
+    assert coalescer.stats == {'request': 1, 'shared': 19}
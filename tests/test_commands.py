@@ -0,0 +1,57 @@
+import statistics
+import time
+
+import telegram
+
+import homework
+from benchmarks.stub_server import StubServer
+from bot.commands import CommandHandler, UpdatePoller
+from bot.subscriptions import Subscriber
+
+
+def make_handler():
+    subscriber = Subscriber(1, 'token', '42')
+    homework.detect_changes(subscriber, {
+        'homeworks': [{'id': 7, 'homework_name': 'hw1', 'status': 'approved'}],
+        'current_date': 1,
+    })
+    return subscriber, CommandHandler([subscriber], homework.HOMEWORK_STATUSES)
+
+
+def test_status_and_history_answer_from_memory():
+    _, handler = make_handler()
+    approved = homework.HOMEWORK_STATUSES['approved']
+    assert handler.handle(42, '/status') == f'hw1: {approved}'
+    assert handler.handle(42, '/history@homework_bot').endswith(
+        f'hw1: {approved}')
+    assert handler.handle(42, 'hello') is None
+    assert 'не подписан' in handler.handle(1, '/status')
+
+
+def test_pause_skips_polling(monkeypatch):
+    subscriber, handler = make_handler()
+    calls = []
+    monkeypatch.setattr(
+        homework, 'fetch_homework_statuses', lambda *args: calls.append(1))
+    assert 'приостановлены' in handler.handle(42, '/pause')
+    homework.poll_subscriber(None, subscriber)
+    assert calls == []
+    assert 'возобновлены' in handler.handle(42, '/pause')
+    assert not subscriber.paused
+
+
+def test_reply_latency_against_fake_telegram():
+    _, handler = make_handler()
+    with StubServer() as server:
+        bot = telegram.Bot('123:abc', base_url=server.base_url + '/bot')
+        poller = UpdatePoller(bot, handler, timeout=1).start()
+        latencies = []
+        for number in range(20):
+            started = time.perf_counter()
+            server.push_update(42, '/status')
+            while len(server.sent) <= number:
+                time.sleep(0.0005)
+            latencies.append(time.perf_counter() - started)
+        poller.stop(timeout=2)
+    assert server.sent[0]['text'].startswith('hw1: ')
+    assert statistics.median(latencies) < 0.05
@@ -0,0 +1,93 @@
+import requests
+
+from bot.cursor import CursorStore
+from bot.scheduler import FakeClock
+from bot.subscriptions import Subscriber
+from tests.test_bot import MockResponseGET
+
+
+class NullBot:
+
+    def send_message(self, chat_id, text):
+        return None
+
+
+def test_cursor_store_survives_restart(tmp_path):
+    path = str(tmp_path / 'cursor.json')
+    store = CursorStore(path)
+    assert store.advance('a', 100)
+    assert not store.advance('a', 50), 'Курсор не должен двигаться назад'
+    store.flush()
+    assert CursorStore(path).get('a') == 100
+    assert list(tmp_path.iterdir()) == [tmp_path / 'cursor.json']
+
+
+def test_poll_advances_from_date(monkeypatch, tmp_path):
+    import homework
+
+    sent_from_dates = []
+
+    def mock_response_get(url, params=None, **kwargs):
+        sent_from_dates.append(params['from_date'])
+        return MockResponseGET(
+            url, params=params, random_sid=params['from_date'] + 600,
+            current_timestamp=params['from_date'], **kwargs)
+
+    monkeypatch.setattr(requests, 'get', mock_response_get)
+    cursors = CursorStore(str(tmp_path / 'cursor.json'))
+    subscriber = Subscriber(1, 'token', 1, current_timestamp=1000)
+    for _ in range(3):
+        homework.poll_subscriber(NullBot(), subscriber, cursors)
+    assert sent_from_dates == [1000, 1600, 2200]
+    restored = CursorStore(str(tmp_path / 'cursor.json'))
+    assert restored.get(subscriber.key) == 2800
+
+
+def test_cursor_not_advanced_on_error(monkeypatch, tmp_path):
+    import homework
+
+    def mock_500_response_get(url, params=None, **kwargs):
+        return MockResponseGET(
+            url, params=params, current_timestamp=params['from_date'],
+            http_status=500, **kwargs)
+
+    monkeypatch.setattr(requests, 'get', mock_500_response_get)
+    cursors = CursorStore(str(tmp_path / 'cursor.json'))
+    subscriber = Subscriber(1, 'token', 1, current_timestamp=1000)
+    homework.poll_subscriber(NullBot(), subscriber, cursors)
+    assert subscriber.current_timestamp == 1000
+    assert cursors.get(subscriber.key) is None
+
+
+def test_cursor_commit_is_batched(tmp_path):
+    path = str(tmp_path / 'cursor.json')
+    clock = FakeClock(now=100.0)
+    store = CursorStore(path, flush_interval=1, clock=clock)
+    store.advance('a', 100)
+    assert store.commit()
+    store.advance('a', 200)
+    store.advance('b', 300)
+    assert not store.commit(), 'Запись не чаще flush_interval'
+    assert CursorStore(path).cursors == {'a': 100}
+    clock.sleep(1)
+    assert store.commit()
+    assert not store.commit(), 'Без изменений файл не перезаписывается'
+    assert CursorStore(path).cursors == {'a': 200, 'b': 300}
+
+
+def test_cursor_write_error_does_not_stop_polling(
+        monkeypatch, tmp_path, caplog):
+    import homework
+
+    def mock_response_get(url, params=None, **kwargs):
+        return MockResponseGET(
+            url, params=params, random_sid=params['from_date'] + 600,
+            current_timestamp=params['from_date'], **kwargs)
+
+    monkeypatch.setattr(requests, 'get', mock_response_get)
+    cursors = CursorStore(str(tmp_path / 'missing' / 'cursor.json'))
+    subscriber = Subscriber(1, 'token', 1, current_timestamp=1000)
+    homework.poll_subscriber(NullBot(), subscriber, cursors)
+    assert subscriber.current_timestamp == 1600
+    assert cursors.get(subscriber.key) == 1600
+    assert 'Не удалось сохранить курсоры' in caplog.text
@@ -0,0 +1,257 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+import telegram
+
+from benchmarks.stub_server import StubServer
+from bot.aio import AsyncClient
+from bot.fanout import DUPLICATE, FAILED, SENT, FanOut
+from bot.outbound import OutboundQueue, RateLimit
+from bot.outbox import Outbox
+from bot.routing import Route, RoutingTable, load_routes
+from bot.scheduler import FakeClock
+from bot.subscriptions import Subscriber
+
+
+class FakeSend:
+
+    def __init__(self, latency=0.0, errors=None):
+        self.latency = latency
+        self.errors = dict(errors or {})
+        self.sent = []
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, chat_id, text):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            error = self.errors.get(chat_id)
+            if isinstance(error, list):
+                error = error.pop(0) if error else None
+        try:
+            time.sleep(self.latency)
+            if error is not None:
+                raise error
+            with self.lock:
+                self.sent.append((chat_id, text))
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+def test_routes_match_subscriber_homework_and_status():
+    student = Subscriber(1, 'token', 42)
+    table = RoutingTable([
+        Route(['mentor', 42], subscribers=[42], statuses=['approved']),
+        Route(['group', 'mentor'], homeworks=['sprint-*'], title='Аня'),
+        Route(['other'], subscribers=[7]),
+    ])
+    approved = {'homework_name': 'sprint-1', 'status': 'approved'}
+    assert table.destinations(student, approved) == {
+        'mentor': None, 'group': 'Аня'}
+    reviewing = {'homework_name': 'sprint-1', 'status': 'reviewing'}
+    assert table.destinations(student, reviewing) == {
+        'group': 'Аня', 'mentor': 'Аня'}
+    assert table.destinations(
+        student, {'homework_name': 'final', 'status': 'reviewing'}) == {}
+
+
+def test_load_routes(tmp_path):
+    path = tmp_path / 'routes.json'
+    path.write_text(json.dumps([
+        {'chats': [1, '2'], 'homeworks': ['hw*'], 'title': 'Группа'}]))
+    route, = load_routes(str(path))
+    assert route.chats == ('1', '2')
+    assert route.title == 'Группа'
+    for broken in ({'chats': [1]}, [{'homeworks': ['hw']}], ['chat']):
+        path.write_text(json.dumps(broken))
+        with pytest.raises(ValueError):
+            load_routes(str(path))
+
+
+def test_broadcast_runs_in_parallel_and_reports_each_chat():
+    send = FakeSend(
+        latency=0.02, errors={'blocked': telegram.error.Unauthorized('no')})
+    fanout = FanOut(send, global_rate=0, per_chat_interval=0, workers=4)
+    chats = [str(number) for number in range(12)] + ['blocked', '3']
+    started = time.perf_counter()
+    results = fanout.broadcast(chats, 'text')
+    elapsed = time.perf_counter() - started
+    fanout.close()
+    assert send.peak == 4
+    assert elapsed < 12 * 0.02, 'Отправки должны идти параллельно'
+    assert len(results) == 13
+    assert results['blocked'].status == FAILED
+    assert isinstance(results['blocked'].error, telegram.error.Unauthorized)
+    assert {results[chat].status for chat in chats[:12]} == {SENT}
+    assert fanout.stats == {SENT: 12, FAILED: 1}
+
+
+def test_same_text_to_same_chat_is_sent_once():
+    clock = FakeClock(now=100.0)
+    send = FakeSend()
+    fanout = FanOut(
+        send, global_rate=0, per_chat_interval=0, dedup_window=60,
+        clock=clock)
+    assert fanout.broadcast([1, 2], 'text')['1'].status == SENT
+    results = fanout.broadcast([1, 3], 'text')
+    assert results['1'].status == DUPLICATE
+    assert results['3'].status == SENT
+    assert fanout.broadcast([1], 'other')['1'].status == SENT
+    clock.now += 61
+    assert fanout.broadcast([1], 'text')['1'].status == SENT
+    fanout.close()
+    assert sorted(send.sent) == [
+        ('1', 'other'), ('1', 'text'), ('1', 'text'), ('2', 'text'),
+        ('3', 'text')]
+
+
+def test_failed_chat_can_receive_same_text_later():
+    send = FakeSend(errors={'1': [telegram.error.BadRequest('down')]})
+    fanout = FanOut(send, global_rate=0, per_chat_interval=0)
+    assert fanout.broadcast([1], 'text')['1'].status == FAILED
+    assert fanout.broadcast([1], 'text')['1'].status == SENT
+    fanout.close()
+
+
+def test_retry_after_pauses_and_retries():
+    send = FakeSend(errors={'1': [telegram.error.RetryAfter(0.05)]})
+    fanout = FanOut(send, global_rate=0, per_chat_interval=0)
+    started = time.perf_counter()
+    delivery = fanout.broadcast([1], 'text')['1']
+    fanout.close()
+    assert delivery.status == SENT
+    assert delivery.attempts == 2
+    assert time.perf_counter() - started >= 0.05
+    assert fanout.stats['retried'] == 1
+
+
+def test_reserve_spaces_sends_globally_and_per_chat():
+    clock = FakeClock(now=100.0)
+    fanout = FanOut(
+        None, global_rate=10, per_chat_interval=1.0, clock=clock)
+    assert fanout._reserve('a') == (0, True)
+    assert fanout._reserve('b') == pytest.approx((0.1, True))
+    assert fanout._reserve('c') == pytest.approx((0.2, True))
+    assert fanout._reserve('a') == pytest.approx((1.0, False))
+    clock.now += 1.0
+    assert fanout._reserve('a') == pytest.approx((0, True))
+
+
+def test_async_broadcast_through_fake_telegram():
+    with StubServer() as server:
+        async def run():
+            async with AsyncClient(
+                    'bot-token', telegram_api=server.base_url) as client:
+                fanout = FanOut(
+                    client.deliver, global_rate=0, per_chat_interval=0,
+                    workers=5)
+                return await fanout.broadcast_async(
+                    list(range(20)) + [3], 'Статус')
+
+        results = asyncio.run(run())
+    assert len(results) == 20
+    assert {delivery.status for delivery in results.values()} == {SENT}
+    assert sorted(int(payload['chat_id']) for payload in server.sent) == (
+        list(range(20)))
+
+
+def test_poll_subscriber_routes_status_changes(monkeypatch):
+    import homework
+
+    class NullBot:
+        def __init__(self):
+            self.sent = []
+
+        def send_message(self, chat_id, text, **kwargs):
+            self.sent.append((chat_id, text))
+
+    send = FakeSend()
+    fanout = FanOut(send, global_rate=0, per_chat_interval=0)
+    monkeypatch.setattr(homework, 'routes', RoutingTable([
+        Route(['mentor', 'group'], statuses=['approved'], title='Аня'),
+        Route(['group'], homeworks=['hw*']),
+    ]))
+    bot = NullBot()
+    homeworks = [{'homework_name': 'hw1', 'status': 'approved'}]
+    with StubServer(homeworks=homeworks) as server:
+        monkeypatch.setattr(homework, 'ENDPOINT', server.endpoint)
+        subscriber = Subscriber(1, 'token', 42, current_timestamp=3)
+        homework.poll_subscriber(bot, subscriber, fanout=fanout)
+    fanout.close()
+    message = homework.parse_status(homeworks[0])
+    assert bot.sent == [(42, message)]
+    assert sorted(send.sent) == [
+        ('group', f'Аня\n{message}'), ('mentor', f'Аня\n{message}')]
+
+
+def test_fanout_and_outbound_share_global_rate():
+    clock = FakeClock(now=100.0)
+    rate = RateLimit(10, clock)
+    sent = []
+
+    class Bot:
+        def send_message(self, chat_id, text):
+            sent.append((chat_id, clock()))
+
+    fanout = FanOut(
+        lambda chat_id, text: sent.append((chat_id, clock())),
+        per_chat_interval=0, rate=rate, clock=clock, sleep=clock.sleep)
+    queue = OutboundQueue(Bot(), rate=rate, clock=clock, sleep=clock.sleep)
+    fanout.deliver('group', 'text')
+    queue._deliver('student', [('text', clock(), None)])
+    fanout.deliver('mentor', 'text')
+    assert sent == [
+        ('group', 100.0), ('student', pytest.approx(100.1)),
+        ('mentor', pytest.approx(100.2))]
+
+
+def test_submit_async_does_not_wait_for_delivery():
+    async def run():
+        sent = []
+        release = asyncio.Event()
+
+        async def send(chat_id, text):
+            await release.wait()
+            sent.append(chat_id)
+
+        fanout = FanOut(send, global_rate=0, per_chat_interval=0)
+        task = fanout.submit_async([1, 2], 'text')
+        await asyncio.sleep(0)
+        assert not task.done() and sent == []
+        assert not await fanout.close_async(timeout=0.01)
+        fanout.submit_async([3], 'text')
+        release.set()
+        assert await fanout.close_async(timeout=1)
+        return sent
+
+    assert asyncio.run(run()) == ['3']
+
+
+def test_routed_copies_stay_in_outbox_until_sent(tmp_path):
+    path = str(tmp_path / 'outbox.log')
+    outbox = Outbox(path)
+    send = FakeSend(errors={'mentor': telegram.error.NetworkError('down')})
+    fanout = FanOut(send, global_rate=0, per_chat_interval=0, outbox=outbox)
+    fanout.broadcast(['group', 'mentor'], 'text')
+    fanout.close()
+
+    async def run():
+        async def never(chat_id, text):
+            await asyncio.Event().wait()
+
+        fanout = FanOut(
+            never, global_rate=0, per_chat_interval=0, outbox=outbox)
+        fanout.submit_async(['student'], 'async')
+        assert len(outbox) == 2, 'Копия пишется в outbox до отправки'
+        await fanout.close_async(timeout=0)
+
+    asyncio.run(run())
+    outbox.close()
+    assert [(chat, text) for _, chat, text in Outbox(path).pending()] == [
+        ('mentor', 'text'), ('student', 'async')]
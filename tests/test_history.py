@@ -0,0 +1,68 @@
+import random
+
+import homework
+from bot.history import TransitionStore, main, parse_timestamp
+from bot.subscriptions import Subscriber
+
+HOUR = 3600
+
+
+def test_verdict_closes_review_and_updates_buckets():
+    store = TransitionStore()
+    store.record('s1', 'hw1', 'reviewing', 1000)
+    store.record('s1', 'hw1', 'approved', 1000 + 5 * HOUR, 'Отлично')
+    store.record('s1', 'hw1', 'approved', 1000 + 5 * HOUR, 'Отлично')
+    store.record('s1', 'hw2', 'rejected', 2000)
+    total, values = store.percentiles([0.5])
+    assert total == 1
+    assert 5 * HOUR <= values[0.5] <= 5 * HOUR * 1.05
+    assert store.exact_percentile(0.5, 'approved') == 5 * HOUR
+    assert store.connection.execute(
+        'SELECT COUNT(*) FROM transitions').fetchone()[0] == 3
+
+
+def test_bucket_percentiles_are_within_bucket_width():
+    store = TransitionStore()
+    generator = random.Random(1)
+    transitions = []
+    for number in range(2000):
+        started = number * 10.0
+        transitions.append(('s', f'hw{number}', 'reviewing', started))
+        transitions.append((
+            's', f'hw{number}', 'approved',
+            started + generator.lognormvariate(10, 1)))
+    store.record_many(transitions)
+    total, values = store.percentiles([0.5, 0.9, 0.99], 'approved')
+    assert total == 2000
+    for fraction, value in values.items():
+        exact = store.exact_percentile(fraction, 'approved')
+        assert exact <= value <= exact * 1.05 ** 2
+
+
+def test_detect_changes_persists_transitions():
+    store = TransitionStore()
+    subscriber = Subscriber(1, 'token', 1)
+    homework.detect_changes(subscriber, {
+        'homeworks': [{
+            'homework_name': 'hw', 'status': 'approved',
+            'reviewer_comment': 'Принято',
+            'date_updated': '2022-05-20T12:00:00Z'}],
+        'current_date': 1,
+    }, store)
+    row = store.connection.execute(
+        'SELECT subscriber, homework, status, changed_at, comment '
+        'FROM transitions').fetchone()
+    assert row == (
+        subscriber.key, 'hw', 'approved',
+        parse_timestamp('2022-05-20T12:00:00Z', None), 'Принято')
+
+
+def test_cli_prints_percentiles(tmp_path, capsys):
+    path = str(tmp_path / 'history.db')
+    store = TransitionStore(path)
+    store.record('s', 'hw', 'reviewing', 0)
+    store.record('s', 'hw', 'approved', 2 * HOUR)
+    store.close()
+    main([path, '--percentiles', '50'])
+    output = capsys.readouterr().out
+    assert 'approved: проверок 1; p50: 2 ч' in output
@@ -0,0 +1,37 @@
+from benchmarks.bench_import import measure
+
+
+def test_import_defers_heavy_dependencies_and_side_effects():
+    _, _, loaded, created = measure()
+    assert loaded == [], (
+        'telegram, requests и aiohttp грузятся при первом вызове')
+    assert created == [], (
+        'Импорт не должен создавать program.log и другие файлы')
+
+
+def test_lazy_module_loads_once_across_threads(tmp_path, monkeypatch):
+    import sys
+    import threading
+
+    from bot.lazy import lazy_import
+
+    (tmp_path / 'slow_lazy_module.py').write_text(
+        'import time\n'
+        'LOADS.append(1)\n'
+        'time.sleep(0.1)\n'
+        'VALUE = 42\n')
+    monkeypatch.syspath_prepend(str(tmp_path))
+    loads = []
+    monkeypatch.setattr('builtins.LOADS', loads, raising=False)
+    module = lazy_import('slow_lazy_module')
+    values = []
+    threads = [
+        threading.Thread(target=lambda: values.append(module.VALUE))
+        for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    sys.modules.pop('slow_lazy_module')
+    assert values == [42] * 8
+    assert loads == [1]
@@ -0,0 +1,209 @@
+import asyncio
+import json
+import os
+import signal
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+import homework
+from bot import metrics
+from bot.aio import AsyncPollScheduler
+from bot.commands import CommandHandler
+from bot.cursor import CursorStore
+from bot.health import Health
+from bot.scheduler import FakeClock, PollScheduler
+from bot.subscriptions import Subscriber, SubscriptionRegistry
+
+
+def test_stop_interrupts_wait():
+    scheduler = PollScheduler([Subscriber(1, 'token', 1)], 600, lambda s: 0)
+    threading.Timer(0.05, scheduler.stop).start()
+    started = time.monotonic()
+    scheduler.run_forever()
+    assert time.monotonic() - started < 5
+
+
+def test_sigterm_stops_loop_and_marks_health(monkeypatch):
+    monkeypatch.setattr(homework, 'health', Health())
+    polled = []
+    scheduler = PollScheduler(
+        [Subscriber(1, 'token', 1)], 600, polled.append)
+    handlers = {
+        signum: signal.getsignal(signum)
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP)}
+    reloaded = []
+    try:
+        homework.handle_signals(scheduler, reloaded.append)
+        threading.Timer(
+            0.05, os.kill, (os.getpid(), signal.SIGHUP)).start()
+        threading.Timer(
+            0.2, os.kill, (os.getpid(), signal.SIGTERM)).start()
+        scheduler.run_forever()
+    finally:
+        for signum, handler in handlers.items():
+            signal.signal(signum, handler)
+    assert len(polled) == 1
+    assert reloaded == [scheduler]
+    assert homework.health.stopping_at is not None
+    assert not homework.health.ready()
+
+
+def test_replace_keeps_due_times():
+    clock = FakeClock(0)
+    first, second, third = (
+        Subscriber(number, f'token{number}', number) for number in range(3))
+    scheduler = PollScheduler(
+        [first, second], 600, lambda s: 0, clock=clock, sleep=clock.sleep)
+    due = {subscriber.key: at for at, _, subscriber in scheduler._queue}
+    clock.now = 100
+    assert scheduler.replace([first, third]) == (1, 1)
+    queue = {subscriber.key: at for at, _, subscriber in scheduler._queue}
+    assert queue == {first.key: due[first.key], third.key: 100}
+
+
+def test_reload_config_keeps_subscriber_state(tmp_path, monkeypatch):
+    database = str(tmp_path / 'subscribers.db')
+    registry = SubscriptionRegistry(database)
+    registry.add('old', 1)
+    registry.add('kept', 2)
+    env_file = tmp_path / '.env'
+    env_file.write_text('RETRY_TIME=30\nBACKOFF_JITTER=0\n')
+    monkeypatch.setattr(homework, 'SUBSCRIBERS_DB', database)
+    monkeypatch.setattr(homework, 'PRACTICUM_TOKEN', None)
+    monkeypatch.setattr(homework, 'ENV_FILE', str(env_file))
+    monkeypatch.setattr(homework, 'RETRY_TIME', homework.RETRY_TIME)
+    monkeypatch.setattr(homework, 'BACKOFF_JITTER', homework.BACKOFF_JITTER)
+    cursors = CursorStore(str(tmp_path / 'cursor.json'))
+    subscribers = homework.load_subscribers(cursors)
+    kept = subscribers[1]
+    kept.homeworks.diff([{'homework_name': 'hw', 'status': 'reviewing'}])
+    handler = CommandHandler(subscribers, homework.HOMEWORK_STATUSES)
+    scheduler = PollScheduler(subscribers, 600, lambda s: 0)
+    registry.remove(1)
+    registry.add('new', 3)
+    registry.close()
+    homework.reload_config(scheduler, subscribers, cursors, handler)
+    assert [subscriber.practicum_token for subscriber in subscribers] == [
+        'kept', 'new']
+    assert subscribers[0] is kept
+    assert kept.homeworks.get('hw') == 'reviewing'
+    assert scheduler.interval == 30 and scheduler.policy.interval == 30
+    assert len(scheduler) == 2
+    assert set(handler.chats) == {'2', '3'}
+    env_file.write_text('RETRY_TIME=soon\n')
+    homework.reload_config(scheduler, subscribers, cursors, handler)
+    assert scheduler.interval == 30
+
+
+def test_env_file_is_applied_at_startup(tmp_path, monkeypatch):
+    env_file = tmp_path / '.env'
+    env_file.write_text('RETRY_TIME=60\n')
+    monkeypatch.setattr(homework, 'ENV_FILE', str(env_file))
+    monkeypatch.setattr(homework, 'RETRY_TIME', homework.RETRY_TIME)
+    monkeypatch.delenv('RETRY_TIME', raising=False)
+    monkeypatch.setattr(homework, 'configure_logging', lambda: None)
+    seen = []
+    monkeypatch.setattr(
+        homework, 'check_tokens', lambda: seen.append(homework.RETRY_TIME))
+    with pytest.raises(SystemExit):
+        homework.main()
+    assert seen == [60]
+
+
+def test_env_subscriber_is_not_stored(tmp_path, monkeypatch):
+    database = str(tmp_path / 'subscribers.db')
+    registry = SubscriptionRegistry(database)
+    registry.add('stored', 1)
+    registry.close()
+    env_file = tmp_path / '.env'
+    env_file.write_text('PRACTICUM_TOKEN=second\nCHAT_ID=7\n')
+    monkeypatch.setattr(homework, 'SUBSCRIBERS_DB', database)
+    monkeypatch.setattr(homework, 'PRACTICUM_TOKEN', 'first')
+    monkeypatch.setattr(homework, 'CHAT_ID', '7')
+    monkeypatch.setattr(homework, 'ENV_FILE', str(env_file))
+    monkeypatch.delenv('PRACTICUM_TOKEN', raising=False)
+    monkeypatch.delenv('CHAT_ID', raising=False)
+    cursors = CursorStore(str(tmp_path / 'cursor.json'))
+    subscribers = homework.load_subscribers(cursors)
+    assert [subscriber.practicum_token for subscriber in subscribers] == [
+        'first', 'stored']
+    scheduler = PollScheduler(subscribers, 600, lambda s: 0)
+    homework.reload_config(scheduler, subscribers, cursors)
+    assert [subscriber.practicum_token for subscriber in subscribers] == [
+        'second', 'stored']
+    assert len(scheduler) == 2
+    assert len(SubscriptionRegistry(database)) == 1
+
+
+def test_async_scheduler_stop_and_replace():
+    polled = []
+
+    async def poll(subscriber):
+        polled.append(subscriber.id)
+
+    async def run():
+        first, second = Subscriber(1, 'a', 1), Subscriber(2, 'b', 2)
+        scheduler = AsyncPollScheduler([first], 600, poll)
+        task = asyncio.ensure_future(scheduler.run_forever(drain_timeout=1))
+        await asyncio.sleep(0.01)
+        assert scheduler.replace([second]) == (1, 1)
+        await asyncio.sleep(0.01)
+        scheduler.stop()
+        await asyncio.wait_for(task, 1)
+
+    asyncio.run(run())
+    assert polled == [1, 2]
+
+
+def test_health_probes():
+    clock = FakeClock(1000)
+    health = Health(stale_after=60, clock=clock)
+    assert health.live() and not health.ready()
+    health.start()
+    assert health.ready()
+    clock.now += 61
+    assert not health.ready()
+    health.polled()
+    assert health.ready()
+    stuck = threading.Event()
+    done = threading.Event()
+    watched = health.watch(lambda: (stuck.set(), done.wait()))
+    thread = threading.Thread(target=watched)
+    thread.start()
+    stuck.wait()
+    clock.now += 61
+    assert not health.live()
+    done.set()
+    thread.join()
+    assert health.live()
+    health.stop()
+    clock.now += 5
+    assert health.time_left(20) == 15
+    assert health.report()['stopping']
+
+
+def test_health_endpoints():
+    health = Health(stale_after=60)
+    server = metrics.serve(0, registry=metrics.Registry(), health=health)
+    url = f'http://127.0.0.1:{server.server_address[1]}'
+    try:
+        with urllib.request.urlopen(f'{url}/healthz') as response:
+            assert json.loads(response.read())['live']
+        try:
+            urllib.request.urlopen(f'{url}/readyz')
+        except urllib.error.HTTPError as error:
+            assert error.code == 503
+        else:
+            raise AssertionError('/readyz до запуска должен отвечать 503')
+        health.start()
+        health.polled()
+        with urllib.request.urlopen(f'{url}/readyz') as response:
+            report = json.loads(response.read())
+        assert report['ready'] and report['last_poll_age'] < 1
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,60 @@
+import json
+import logging
+import queue
+
+from bot.logs import (DeferredQueueHandler, JsonFormatter,
+                      SizeAndTimeRotatingFileHandler)
+from bot.scheduler import FakeClock
+
+
+def make_record(message, **extra):
+    record = logging.LogRecord(
+        'homework', logging.INFO, __file__, 1, message, None, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_rotation_by_size_and_time(tmp_path):
+    clock = FakeClock(now=1000.0)
+    path = tmp_path / 'program.log'
+    handler = SizeAndTimeRotatingFileHandler(
+        str(path), max_bytes=100, interval=60, backup_count=2, clock=clock)
+    handler.emit(make_record('x' * 80))
+    handler.emit(make_record('y' * 80))
+    assert (tmp_path / 'program.log.1').exists(), 'Ротация по размеру'
+    clock.now += 61
+    handler.emit(make_record('z'))
+    assert (tmp_path / 'program.log.2').exists(), 'Ротация по времени'
+    handler.close()
+
+
+def test_log_is_appended_across_restarts(tmp_path):
+    path = tmp_path / 'program.log'
+    for message in ('first run', 'second run'):
+        handler = SizeAndTimeRotatingFileHandler(str(path))
+        handler.emit(make_record(message))
+        handler.close()
+    assert path.read_text().splitlines() == ['first run', 'second run']
+
+
+def test_json_lines_contain_structured_fields():
+    line = JsonFormatter().format(
+        make_record('Опрос', subscriber='1:abc', latency=0.25))
+    data = json.loads(line)
+    assert data['message'] == 'Опрос'
+    assert data['subscriber'] == '1:abc'
+    assert data['latency'] == 0.25
+    assert 'homework' not in data
+
+
+def test_queue_handler_defers_formatting():
+    log_queue = queue.SimpleQueue()
+    handler = DeferredQueueHandler(log_queue)
+    record = make_record('status %s', homework='hw')
+    record.args = ('approved',)
+    handler.emit(record)
+    queued = log_queue.get_nowait()
+    assert queued.msg == 'status %s', (
+        'Сообщение должно форматироваться в потоке QueueListener'
+    )
+    assert queued.getMessage() == 'status approved'
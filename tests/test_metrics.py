@@ -0,0 +1,102 @@
+import asyncio
+import time
+import urllib.request
+
+import pytest
+import requests
+
+from bot import metrics
+from tests.test_bot import MockResponseGET
+
+
+@pytest.fixture
+def registry():
+    return metrics.Registry()
+
+
+def test_histogram_and_error_counter(registry):
+    @metrics.instrument('job', registry=registry)
+    def job(fail):
+        if fail:
+            raise ValueError('boom')
+        return 'ok'
+
+    assert job(False) == 'ok'
+    with pytest.raises(ValueError):
+        job(True)
+    text = registry.render()
+    assert 'homework_bot_call_duration_seconds_count{function="job"} 2' in text
+    assert (
+        'homework_bot_errors_total{exception="ValueError",function="job"} 1'
+        in text)
+    assert (
+        'homework_bot_call_duration_seconds_bucket{function="job",le="+Inf"} 2'
+        in text)
+
+
+def test_instrument_supports_coroutines(registry):
+    @metrics.instrument('job', registry=registry)
+    async def job():
+        return 1
+
+    assert asyncio.run(job()) == 1
+    assert 'duration_seconds_count{function="job"} 1' in registry.render()
+
+
+def test_gauge_is_read_on_render(registry):
+    queue = []
+    registry.gauge('depth', 'Глубина', lambda: len(queue))
+    queue.append(1)
+    assert 'depth 1' in registry.render()
+
+
+def test_api_errors_are_counted(monkeypatch, random_sid, current_timestamp):
+    import homework
+
+    def mock_500_response_get(*args, **kwargs):
+        return MockResponseGET(
+            *args, random_sid=random_sid,
+            current_timestamp=current_timestamp, http_status=500, **kwargs)
+
+    monkeypatch.setattr(requests, 'get', mock_500_response_get)
+    counter = metrics.REGISTRY.counter(
+        'homework_bot_errors_total', 'Исключения по функциям и классам',
+        {'function': 'get_api_answer',
+         'exception': 'TheAnswerIsNot200Error'})
+    before = counter.value
+    with pytest.raises(homework.TheAnswerIsNot200Error):
+        homework.get_api_answer(homework.ENDPOINT, current_timestamp)
+    assert counter.value == before + 1
+
+
+def test_metrics_endpoint(registry):
+    registry.counter('polls_total', 'Опросы').inc(3)
+    server = metrics.serve(0, registry=registry)
+    try:
+        port = server.server_address[1]
+        with urllib.request.urlopen(
+                f'http://127.0.0.1:{port}/metrics') as response:
+            body = response.read().decode()
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert 'polls_total 3' in body
+
+
+def test_instrument_overhead_is_a_few_microseconds(registry):
+    def plain():
+        return None
+
+    wrapped = metrics.instrument('noop', registry=registry)(plain)
+    calls = 20_000
+
+    def per_call(func):
+        started = time.perf_counter()
+        for _ in range(calls):
+            func()
+        return (time.perf_counter() - started) / calls
+
+    overhead = min(per_call(wrapped) for _ in range(3)) - per_call(plain)
+    assert overhead < 5e-6, (
+        f'Накладные расходы инструментирования {overhead * 1e6:.2f} мкс'
+    )
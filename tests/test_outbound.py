@@ -0,0 +1,88 @@
+import threading
+import time
+
+import telegram
+
+from bot.outbound import MAX_MESSAGE_LENGTH, OutboundQueue
+
+
+class FakeBot:
+
+    def __init__(self, retry_after=()):
+        self.sent = []
+        self.retry_after = list(retry_after)
+        self.lock = threading.Lock()
+
+    def send_message(self, chat_id, text):
+        with self.lock:
+            if self.retry_after:
+                raise telegram.error.RetryAfter(self.retry_after.pop(0))
+            self.sent.append((chat_id, text, time.monotonic()))
+
+
+def test_messages_to_same_chat_are_coalesced():
+    bot = FakeBot()
+    queue = OutboundQueue(bot)
+    for index in range(3):
+        queue.send_message(1, f'message {index}')
+    queue.send_message(2, 'other chat')
+    assert queue.start().stop(timeout=2)
+    assert [(chat, text) for chat, text, _ in bot.sent] == [
+        (1, 'message 0\n\nmessage 1\n\nmessage 2'),
+        (2, 'other chat'),
+    ]
+    assert queue.stats['coalesced'] == 2
+
+
+def test_long_batches_are_split_by_telegram_limit():
+    bot = FakeBot()
+    queue = OutboundQueue(bot, per_chat_interval=0)
+    for _ in range(3):
+        queue.send_message(1, 'x' * (MAX_MESSAGE_LENGTH // 2 - 10))
+    assert queue.start().stop(timeout=2)
+    assert len(bot.sent) == 2
+
+
+def test_per_chat_rate_limit():
+    bot = FakeBot()
+    queue = OutboundQueue(bot, per_chat_interval=0.1).start()
+    queue.send_message(1, 'first')
+    time.sleep(0.02)
+    queue.send_message(1, 'second')
+    queue.stop(timeout=2)
+    (_, _, first), (_, _, second) = bot.sent
+    assert second - first >= 0.1, 'Не чаще одного сообщения в чат за интервал'
+
+
+def test_retry_after_is_retried():
+    bot = FakeBot(retry_after=[0])
+    queue = OutboundQueue(bot)
+    queue.send_message(1, 'text')
+    assert queue.start().stop(timeout=2)
+    assert len(bot.sent) == 1
+    assert queue.stats['retried'] == 1
+
+
+def test_full_queue_drops_messages():
+    queue = OutboundQueue(FakeBot(), maxsize=2)
+    assert queue.send_message(1, 'a')
+    assert queue.send_message(2, 'b')
+    assert not queue.send_message(3, 'c')
+    assert queue.stats['dropped'] == 1
+
+
+def test_poll_does_not_wait_for_telegram(monkeypatch):
+    import homework
+
+    class SlowBot(FakeBot):
+        def send_message(self, chat_id, text):
+            time.sleep(0.3)
+            super().send_message(chat_id, text)
+
+    bot = SlowBot()
+    queue = OutboundQueue(bot).start()
+    started = time.monotonic()
+    homework.send_message_to(queue, 1, 'text')
+    assert time.monotonic() - started < 0.1
+    queue.stop(timeout=2)
+    assert len(bot.sent) == 1
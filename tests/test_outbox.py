@@ -0,0 +1,124 @@
+import telegram
+
+from bot.outbound import OutboundQueue
+from bot.outbox import Outbox
+from bot.subscriptions import Subscriber
+
+
+class FakeBot:
+
+    def __init__(self, error=None):
+        self.sent = []
+        self.error = error
+
+    def send_message(self, chat_id, text):
+        if self.error is not None:
+            raise self.error
+        self.sent.append((chat_id, text))
+
+
+def test_pending_messages_survive_restart(tmp_path):
+    path = str(tmp_path / 'outbox.log')
+    outbox = Outbox(path)
+    first = outbox.add(1, 'first')
+    outbox.add(2, 'second')
+    outbox.ack([first])
+    outbox.close()
+    restored = Outbox(path)
+    assert [(chat, text) for _, chat, text in restored.pending()] == [
+        (2, 'second')]
+    assert restored.add(3, 'third') > first
+
+
+def test_group_commit_uses_one_fsync_per_flush(tmp_path):
+    outbox = Outbox(str(tmp_path / 'outbox.log'))
+    for index in range(10):
+        outbox.add(1, f'message {index}')
+    outbox.flush()
+    outbox.flush()
+    assert outbox.stats['fsyncs'] == 1
+
+
+def test_torn_last_line_is_ignored(tmp_path):
+    path = tmp_path / 'outbox.log'
+    outbox = Outbox(str(path))
+    outbox.add(1, 'kept')
+    outbox.close()
+    with open(path, 'ab') as log_file:
+        log_file.write(b'{"op": "add", "id": 2, "ch')
+    assert len(Outbox(str(path))) == 1
+
+
+def test_compaction_keeps_only_pending(tmp_path):
+    path = tmp_path / 'outbox.log'
+    outbox = Outbox(str(path), compact_threshold=10)
+    refs = [outbox.add(1, f'message {index}') for index in range(20)]
+    outbox.ack(refs[:15])
+    assert outbox.stats['compactions'] == 1
+    outbox.close()
+    assert len(path.read_bytes().splitlines()) == 5
+    assert len(Outbox(str(path))) == 5
+
+
+def test_message_is_acked_only_after_delivery(tmp_path):
+    path = str(tmp_path / 'outbox.log')
+    queue = OutboundQueue(
+        FakeBot(error=telegram.error.NetworkError('down')),
+        outbox=Outbox(path), max_retries=2, network_retry_delay=0)
+    queue.send_message(1, 'text')
+    queue.start().stop(timeout=2)
+    queue.outbox.close()
+
+    bot = FakeBot()
+    queue = OutboundQueue(bot, outbox=Outbox(path))
+    assert queue.replay() == 1
+    queue.start().stop(timeout=2)
+    assert bot.sent == [(1, 'text')]
+    assert len(queue.outbox) == 0
+
+
+def test_poll_commits_outbox_before_cursor(monkeypatch, tmp_path):
+    import homework
+
+    monkeypatch.setattr(
+        homework, 'fetch_homework_statuses',
+        lambda url, timestamp, token, cache=None: {
+            'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+            'current_date': 100})
+    outbox = Outbox(str(tmp_path / 'outbox.log'))
+    queue = OutboundQueue(FakeBot(), outbox=outbox)
+    homework.poll_subscriber(queue, Subscriber(1, 'token', 1))
+    assert outbox.stats['fsyncs'] == 1
+    assert len(Outbox(str(tmp_path / 'outbox.log'))) == 1
+
+
+def test_full_queue_keeps_messages_in_outbox(tmp_path):
+    path = str(tmp_path / 'outbox.log')
+    bot = FakeBot()
+    queue = OutboundQueue(
+        bot, maxsize=2, per_chat_interval=0, outbox=Outbox(path))
+    for number in range(5):
+        assert queue.send_message(number, f'text {number}')
+    assert len(queue) == 5
+    assert queue.stats['deferred'] == 3
+    assert queue.stats['dropped'] == 0
+    queue.flush()
+    assert len(Outbox(path)) == 5
+    assert queue.start().stop(timeout=2)
+    assert bot.sent == [(number, f'text {number}') for number in range(5)]
+    assert len(queue.outbox) == 0
+
+
+def test_replay_respects_queue_size(tmp_path):
+    path = str(tmp_path / 'outbox.log')
+    outbox = Outbox(path)
+    for number in range(4):
+        outbox.add(number, f'text {number}')
+    outbox.close()
+    bot = FakeBot()
+    queue = OutboundQueue(
+        bot, maxsize=1, per_chat_interval=0, outbox=Outbox(path))
+    assert queue.replay() == 4
+    assert queue._size == 1
+    assert queue.start().stop(timeout=2)
+    assert [chat for chat, _ in bot.sent] == [0, 1, 2, 3]
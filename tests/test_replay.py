@@ -0,0 +1,37 @@
+from benchmarks.bench_replay import simulate
+from benchmarks.stub_server import Faults, StubServer, Timeline
+from bot.scheduler import FakeClock
+
+
+def test_timeline_returns_changes_since_from_date():
+    clock = FakeClock(1000)
+    timeline = Timeline(clock)
+    timeline.add('token', 100, 'hw1', 'reviewing')
+    timeline.add('token', 200, 'hw1', 'approved')
+    timeline.add('token', 300, 'hw2', 'reviewing')
+    timeline.add('token', 2000, 'hw2', 'rejected')
+    response = timeline.response('token', 150)
+    assert response['current_date'] == 1000
+    assert [(homework['homework_name'], homework['status'])
+            for homework in response['homeworks']] == [
+        ('hw2', 'reviewing'), ('hw1', 'approved')]
+
+
+def test_faults_are_injected():
+    import requests
+
+    timeline = Timeline(FakeClock(0))
+    faults = Faults(error_rate=0.5, malformed_rate=0.5)
+    with StubServer(timeline=timeline, faults=faults) as server:
+        statuses = {
+            requests.get(server.endpoint).status_code for _ in range(20)}
+    assert statuses == {200, 503}
+    assert server.requests['error'] + server.requests['malformed'] == 20
+
+
+def test_simulated_day_delivers_every_verdict():
+    result = simulate(subscribers=2, days=1, error_rate=0.05)
+    assert result['requests']['error'] > 0
+    assert result['missed'] == 0
+    assert result['latencies']
+    assert max(result['latencies']) < 3600
@@ -0,0 +1,66 @@
+import json
+
+from benchmarks.stub_server import StubServer
+from bot import response_cache
+from bot.response_cache import ResponseCache
+from bot.subscriptions import Subscriber
+
+
+class FakeResponse:
+
+    def __init__(self, body=None, status_code=200, headers=None):
+        self.content = json.dumps(body).encode() if body else b''
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+def body(current_date, status='approved'):
+    return {
+        'homeworks': [{'homework_name': 'hw', 'status': status}],
+        'current_date': current_date,
+    }
+
+
+def test_same_payload_is_short_circuited():
+    cache = ResponseCache()
+    assert cache.lookup(FakeResponse(body(100))) is None
+    assert cache.lookup(FakeResponse(body(200))) == {
+        'homeworks': [], 'current_date': 200}
+    assert cache.lookup(FakeResponse(body(300, 'rejected'))) is None
+
+
+def test_conditional_request_headers_and_304():
+    cache = ResponseCache()
+    cache.lookup(FakeResponse(body(100), headers={
+        'ETag': '"v1"', 'Last-Modified': 'Wed, 21 Oct 2015 07:28:00 GMT'}))
+    assert cache.request_headers() == {
+        'If-None-Match': '"v1"',
+        'If-Modified-Since': 'Wed, 21 Oct 2015 07:28:00 GMT'}
+    assert cache.lookup(FakeResponse(status_code=304)) == {
+        'homeworks': [], 'current_date': 100}
+
+
+def test_forget_after_error():
+    cache = ResponseCache()
+    cache.lookup(FakeResponse(body(100)))
+    cache.forget()
+    assert cache.lookup(FakeResponse(body(200))) is None
+
+
+def test_unchanged_polls_skip_parsing(monkeypatch):
+    import homework
+
+    class Bot:
+        def send_message(self, chat_id, text):
+            sent.append(text)
+
+    sent = []
+    homeworks = [{'homework_name': 'hw1', 'status': 'approved'}]
+    before = response_cache.STATS['short_circuited']
+    with StubServer(homeworks=homeworks) as server:
+        monkeypatch.setattr(homework, 'ENDPOINT', server.endpoint)
+        subscriber = Subscriber(1, 'token', 1, current_timestamp=1)
+        for _ in range(3):
+            homework.poll_subscriber(Bot(), subscriber)
+    assert len(sent) == 1
+    assert response_cache.STATS['short_circuited'] - before == 2
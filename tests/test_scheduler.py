@@ -0,0 +1,88 @@
+import requests
+
+from bot.exceptions import TheAnswerIsNot200Error
+from bot.scheduler import (FakeClock, PollScheduler, RetryPolicy,
+                           parse_retry_after)
+from bot.subscriptions import Subscriber
+
+
+def make_policy(**kwargs):
+    options = dict(
+        reviewing_interval=60, max_backoff=4000, random=lambda: 0.5)
+    options.update(kwargs)
+    return RetryPolicy(600, **options)
+
+
+def test_reviewing_homework_shortens_interval():
+    policy = make_policy()
+    subscriber = Subscriber(1, 'token', 1)
+    assert policy.delay(subscriber) == 600
+    subscriber.homeworks.diff(
+        [{'homework_name': 'hw', 'status': 'approved'}])
+    assert policy.delay(subscriber) == 600
+    subscriber.homeworks.diff(
+        [{'homework_name': 'hw', 'status': 'reviewing'}])
+    assert policy.delay(subscriber) == 60
+
+
+def test_backoff_grows_exponentially_with_jitter_and_cap():
+    policy = make_policy()
+    subscriber = Subscriber(1, 'token', 1)
+    delays = []
+    for failures in range(1, 6):
+        subscriber.failures = failures
+        delays.append(policy.delay(subscriber))
+    assert delays == [600, 1200, 2400, 4000, 4000]
+    jittered = make_policy(random=lambda: 1.0, jitter=0.2)
+    subscriber.failures = 1
+    assert jittered.delay(subscriber) == 720
+
+
+def test_retry_after_is_honored():
+    policy = make_policy()
+    subscriber = Subscriber(1, 'token', 1)
+    subscriber.failures = 1
+    subscriber.retry_after = 3000
+    assert policy.delay(subscriber) == 3000
+    assert parse_retry_after('120') == 120
+    assert parse_retry_after(
+        'Wed, 21 Oct 2015 07:28:00 GMT', now=1445412420) == 60
+    assert parse_retry_after('garbage') is None
+
+
+def test_scheduler_backs_off_on_api_errors(monkeypatch):
+    import homework
+
+    class Response:
+        status_code = 503
+        headers = {'Retry-After': '1000'}
+
+    monkeypatch.setattr(requests, 'get', lambda *args, **kwargs: Response())
+
+    class Bot:
+        def send_message(self, chat_id, text):
+            return None
+
+    clock = FakeClock()
+    polled_at = []
+
+    def poll(subscriber):
+        polled_at.append(clock())
+        homework.poll_subscriber(Bot(), subscriber)
+
+    subscriber = Subscriber(1, 'token', 1, current_timestamp=1)
+    scheduler = PollScheduler(
+        [subscriber], 600, poll, clock=clock,
+        policy=make_policy(max_backoff=10_000))
+    while len(polled_at) < 4:
+        scheduler.run_pending()
+        clock.sleep(scheduler.next_due() - clock())
+    assert polled_at == [0, 1000, 2200, 4600], (
+        'Интервал должен расти и учитывать Retry-After'
+    )
+    assert subscriber.failures == 4
+
+
+def test_not_200_error_carries_retry_after():
+    error = TheAnswerIsNot200Error('503', retry_after=5)
+    assert error.retry_after == 5
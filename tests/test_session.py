@@ -0,0 +1,40 @@
+import pytest
+
+from benchmarks.stub_server import StubServer
+from bot import session
+from bot.exceptions import RequestExceptionError
+
+
+@pytest.fixture
+def pooled():
+    yield session.install(pool_size=2, connect_timeout=1, read_timeout=0.2)
+    session.shared().close()
+    session._shared = None
+
+
+def test_keep_alive_connection_is_reused(pooled):
+    with StubServer() as server:
+        for _ in range(5):
+            assert pooled.get(server.endpoint).status_code == 200
+    stats = pooled.stats()
+    assert stats == {'requests': 5, 'connections': 1, 'reused': 4}, (
+        'Повторные запросы должны использовать одно соединение'
+    )
+
+
+def test_get_api_answer_uses_shared_session(pooled, monkeypatch):
+    import homework
+
+    with StubServer() as server:
+        homework.fetch_homework_statuses(server.endpoint, 1, 'token')
+        homework.fetch_homework_statuses(server.endpoint, 2, 'token')
+    assert pooled.stats()['reused'] == 1
+
+
+def test_read_timeout_raises_request_error(pooled, monkeypatch):
+    import homework
+
+    monkeypatch.setattr(homework, 'READ_TIMEOUT', 0.2)
+    with StubServer(latency=1) as server:
+        with pytest.raises(RequestExceptionError):
+            homework.fetch_homework_statuses(server.endpoint, 1, 'token')
@@ -0,0 +1,109 @@
+import collections
+
+import homework
+from bot.cursor import CursorStore
+from bot.scheduler import FakeClock, PollScheduler
+from bot.sharding import HashRing, LeaseStore, ShardCoordinator, worker_path
+from bot.state import MemoryStateStore
+from bot.subscriptions import Subscriber
+
+KEYS = [f'chat-{number}' for number in range(10000)]
+
+
+def test_ring_spreads_keys_evenly():
+    ring = HashRing(['w1', 'w2', 'w3', 'w4'])
+    counts = collections.Counter(ring.owner(key) for key in KEYS)
+    assert set(counts) == {'w1', 'w2', 'w3', 'w4'}
+    assert min(counts.values()) > len(KEYS) / 4 * 0.7
+
+
+def test_adding_worker_moves_only_its_share():
+    before = HashRing(['w1', 'w2', 'w3'])
+    after = HashRing(['w1', 'w2', 'w3', 'w4'])
+    moved = [key for key in KEYS if before.owner(key) != after.owner(key)]
+    assert all(after.owner(key) == 'w4' for key in moved)
+    assert len(moved) < len(KEYS) / 4 * 1.3
+
+
+def test_coordinators_partition_subscribers(tmp_path):
+    clock = FakeClock()
+    path = str(tmp_path / 'shards.db')
+    first = ShardCoordinator(LeaseStore(path), 'w1', ttl=60, clock=clock)
+    second = ShardCoordinator(LeaseStore(path), 'w2', ttl=60, clock=clock)
+    first.refresh()
+    second.refresh()
+    first.refresh()
+    for key in KEYS[:1000]:
+        assert first.owns(key) != second.owns(key)
+    assert any(first.owns(key) for key in KEYS[:1000])
+
+
+def test_expired_lease_hands_keys_over(tmp_path):
+    clock = FakeClock()
+    path = str(tmp_path / 'shards.db')
+    first = ShardCoordinator(LeaseStore(path), 'w1', ttl=60, clock=clock)
+    second = ShardCoordinator(LeaseStore(path), 'w2', ttl=60, clock=clock)
+    second.refresh()
+    first.refresh()
+    assert not all(first.owns(key) for key in KEYS[:100])
+    clock.sleep(61)
+    first.refresh()
+    assert first.ring.nodes == ('w1',)
+    assert all(first.owns(key) for key in KEYS[:100])
+
+
+def test_stop_releases_lease(tmp_path):
+    path = str(tmp_path / 'shards.db')
+    store = LeaseStore(path)
+    coordinator = ShardCoordinator(store, 'w1', ttl=60).start()
+    coordinator.stop()
+    assert store.alive(coordinator.clock(), 60) == []
+
+
+def test_scheduler_skips_foreign_subscribers():
+    clock = FakeClock()
+    subscribers = [Subscriber(number, 'token', number) for number in range(4)]
+    polled = []
+    scheduler = PollScheduler(
+        subscribers, 600, polled.append, clock=clock, sleep=clock.sleep,
+        owns=lambda subscriber: subscriber.chat_id % 2 == 0)
+    clock.sleep(600)
+    assert scheduler.run_pending() == 2
+    assert [subscriber.chat_id for subscriber in polled] == [0, 2]
+    assert len(scheduler) == 4
+
+
+def test_returning_subscriber_uses_shared_state(tmp_path):
+    clock = FakeClock()
+    path = str(tmp_path / 'shards.db')
+    first = ShardCoordinator(LeaseStore(path), 'w1', ttl=60, clock=clock)
+    second = ShardCoordinator(LeaseStore(path), 'w2', ttl=60, clock=clock)
+    first.refresh()
+    subscriber = next(
+        subscriber for subscriber in (
+            Subscriber(number, 'token', number) for number in range(100))
+        if HashRing(['w1', 'w2']).owner(subscriber.key) == 'w2')
+    cursors = CursorStore(str(tmp_path / 'cursor.json'))
+    owns = homework.ownership(first, cursors)
+    state = MemoryStateStore()
+    hw = {'homework_name': 'hw', 'status': 'reviewing'}
+    assert owns(subscriber)
+    assert homework.detect_events(
+        subscriber, {'homeworks': [hw], 'current_date': 1}, state=state)
+    second.refresh()
+    first.refresh()
+    assert not owns(subscriber)
+    approved = {'homework_name': 'hw', 'status': 'approved'}
+    state.set_many(subscriber.key, {'hw': ('approved', 'hw')})
+    cursors.advance(subscriber.key, 500)
+    clock.sleep(61)
+    first.refresh()
+    assert owns(subscriber)
+    assert subscriber.current_timestamp == 500
+    assert homework.detect_events(
+        subscriber, {'homeworks': [approved], 'current_date': 2},
+        state=state) == [], 'Вердикт уже отправил другой воркер'
+
+
+def test_worker_path_keeps_extension():
+    assert worker_path('cursor.json', 'worker.1') == 'cursor.worker.1.json'
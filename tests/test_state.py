@@ -0,0 +1,115 @@
+import pytest
+
+import homework
+from benchmarks.stub_server import FakeRedis
+from bot.exceptions import RespError
+from bot.state import (MemoryStateStore, RedisStateStore, RespClient,
+                       SQLiteStateStore, open_state_store)
+from bot.subscriptions import Subscriber
+
+
+@pytest.fixture
+def redis():
+    with FakeRedis() as server:
+        yield server
+
+
+@pytest.fixture(params=['memory', 'sqlite', 'redis'])
+def store(request, tmp_path):
+    if request.param == 'memory':
+        store = MemoryStateStore()
+    elif request.param == 'sqlite':
+        store = SQLiteStateStore(str(tmp_path / 'state.db'), batch_size=3)
+    else:
+        server = request.getfixturevalue('redis')
+        store = RedisStateStore(RespClient(*server.address), batch_size=3)
+    yield store
+    store.close()
+
+
+def test_store_reads_own_writes(store):
+    store.set_many('s1', {'1': ('approved', 'hw1'), '2': ('reviewing', None)})
+    store.set_many('s2', {'1': ('rejected', 'other')})
+    assert store.get_many('s1', ['1', '2', '3']) == {
+        '1': ('approved', 'hw1'), '2': ('reviewing', None)}
+    store.flush()
+    store.set_many('s1', {'1': ('rejected', 'hw1')})
+    assert store.get_many('s1', ['1']) == {'1': ('rejected', 'hw1')}
+    store.flush()
+    assert store.get_many('s1', ['1']) == {'1': ('rejected', 'hw1')}
+    assert store.get_many('s2', ['1']) == {'1': ('rejected', 'other')}
+
+
+def test_memory_store_evicts_least_recently_used():
+    store = MemoryStateStore(maxsize=2)
+    store.set_many('s', {'1': ('approved', None), '2': ('approved', None)})
+    store.get_many('s', ['1'])
+    store.set_many('s', {'3': ('approved', None)})
+    assert set(store.get_many('s', ['1', '2', '3'])) == {'1', '3'}
+
+
+def test_sqlite_batches_and_survives_reopen(tmp_path):
+    path = str(tmp_path / 'state.db')
+    store = SQLiteStateStore(path, batch_size=2)
+    store.set_many('s', {'1': ('approved', 'hw1')})
+    assert len(store) == 0
+    store.set_many('s', {'2': ('rejected', 'hw2')})
+    assert len(store) == 2
+    store.set_many('s', {'3': ('reviewing', 'hw3')})
+    store.close()
+    reopened = SQLiteStateStore(path)
+    assert len(reopened) == 3
+    assert reopened.connection.execute(
+        'PRAGMA journal_mode').fetchone()[0] == 'wal'
+
+
+def test_redis_pipelines_writes(redis):
+    store = RedisStateStore(RespClient(*redis.address), batch_size=100)
+    for number in range(10):
+        store.set_many(f's{number % 2}', {str(number): ('approved', 'hw')})
+    assert redis.commands['HSET'] == 0
+    store.flush()
+    assert redis.commands['HSET'] == 2
+    assert store.get_many('s1', ['1', '2']) == {'1': ('approved', 'hw')}
+    with pytest.raises(RespError):
+        store.client.execute('LPUSH', 'list', 'x')
+
+
+def test_redis_keeps_pending_when_unreachable(redis):
+    client = RespClient(*redis.address)
+    store = RedisStateStore(client)
+    store.set_many('s', {'1': ('approved', 'hw')})
+    client.address = ('127.0.0.1', 1)
+    with pytest.raises(OSError):
+        store.flush()
+    client.address = redis.address
+    store.flush()
+    assert redis.data[b'homework_bot:state:s'] == {b'1': b'approved\thw'}
+
+
+def test_open_state_store(tmp_path, redis):
+    assert isinstance(open_state_store('memory'), MemoryStateStore)
+    sqlite = open_state_store(f'sqlite:///{tmp_path}/state.db')
+    assert sqlite.path == f'{tmp_path}/state.db'
+    store = open_state_store(redis.url)
+    assert store.client.address == redis.address
+    with pytest.raises(ValueError):
+        open_state_store('mongodb://localhost')
+
+
+def test_restart_does_not_resend_or_swallow(tmp_path):
+    path = str(tmp_path / 'state.db')
+    response = {'homeworks': [
+        {'id': 1, 'homework_name': 'hw1', 'status': 'approved'},
+        {'id': 2, 'homework_name': 'hw2', 'status': 'reviewing'},
+    ], 'current_date': 100}
+    state = SQLiteStateStore(path)
+    first = Subscriber(1, 'token', 1)
+    assert len(homework.detect_changes(first, response, state=state)) == 2
+    state.close()
+    state = SQLiteStateStore(path)
+    restarted = Subscriber(1, 'token', 1)
+    assert homework.detect_changes(restarted, response, state=state) == []
+    assert restarted.homeworks.get('2') == 'reviewing'
+    response['homeworks'][1]['status'] = 'rejected'
+    assert len(homework.detect_changes(restarted, response, state=state)) == 1
@@ -0,0 +1,61 @@
+from bot.scheduler import FakeClock, PollScheduler
+from bot.subscriptions import SubscriptionRegistry
+
+
+def test_registry_add_is_idempotent(tmp_path):
+    registry = SubscriptionRegistry(str(tmp_path / 'subs.db'))
+    first = registry.add('token-1', 100)
+    assert registry.add('token-1', 100) == first
+    registry.add('token-2', 200)
+    assert len(registry) == 2
+    registry.remove(first)
+    subscribers = registry.load(current_timestamp=42)
+    assert [s.practicum_token for s in subscribers] == ['token-2']
+    assert subscribers[0].current_timestamp == 42
+    assert len(subscribers[0].homeworks) == 0
+
+
+def test_scheduler_polls_every_subscriber_once_per_interval():
+    registry = SubscriptionRegistry()
+    for index in range(10):
+        registry.add(f'token-{index}', index)
+    clock = FakeClock()
+    polled = []
+    scheduler = PollScheduler(
+        registry.load(), 600, polled.append, clock=clock)
+    for _ in range(600):
+        scheduler.run_pending()
+        clock.sleep(1)
+    assert sorted(s.id for s in polled) == list(range(1, 11)), (
+        'Каждый подписчик должен быть опрошен ровно один раз за интервал'
+    )
+
+
+def test_poll_subscriber_keeps_state_per_subscriber(monkeypatch):
+    import homework
+
+    responses = {
+        'token-a': {'homeworks': [
+            {'homework_name': 'hw1', 'status': 'approved'}],
+            'current_date': 100},
+        'token-b': {'homeworks': [], 'current_date': 100},
+    }
+    monkeypatch.setattr(
+        homework, 'fetch_homework_statuses',
+        lambda url, timestamp, token, cache=None: responses[token])
+    sent = []
+
+    class Bot:
+        def send_message(self, chat_id, text):
+            sent.append(chat_id)
+
+    registry = SubscriptionRegistry()
+    registry.add('token-a', 1)
+    registry.add('token-b', 2)
+    first, second = registry.load()
+    for _ in range(3):
+        homework.poll_subscriber(Bot(), first)
+        homework.poll_subscriber(Bot(), second)
+    assert sent == ['1']
+    assert first.homeworks.get('hw1') == 'approved'
+    assert len(second.homeworks) == 0
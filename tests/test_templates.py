@@ -0,0 +1,102 @@
+import pytest
+
+import homework
+from bot.subscriptions import Subscriber, SubscriptionRegistry
+from bot.templates import (VERDICTS, MessageRenderer, compile_template,
+                           escape_markdown_v2)
+
+STATUSES = {'ru': homework.HOMEWORK_STATUSES, **VERDICTS}
+
+
+def test_default_locale_matches_fstring():
+    renderer = MessageRenderer(STATUSES)
+    for status, verdict in homework.HOMEWORK_STATUSES.items():
+        assert renderer.render(status, 'hw') == (
+            f'Изменился статус проверки работы "hw". {verdict}')
+
+
+def test_locales_and_fallback():
+    renderer = MessageRenderer(STATUSES)
+    assert renderer.render('approved', 'hw', 'en') == (
+        'Homework "hw" status changed. ' + VERDICTS['en']['approved'])
+    assert renderer.render('approved', 'hw', 'de') == renderer.render(
+        'approved', 'hw')
+    with pytest.raises(KeyError):
+        renderer.render('unknown', 'hw')
+
+
+def test_comment_line():
+    renderer = MessageRenderer(STATUSES)
+    message = renderer.render('rejected', 'hw', comment='Поправь тесты')
+    assert message.endswith('\nКомментарий ревьюера: Поправь тесты')
+    assert renderer.render('rejected', 'hw', comment='') == renderer.render(
+        'rejected', 'hw')
+
+
+def test_escaping_covers_template_and_values():
+    markdown = MessageRenderer(STATUSES, parse_mode='MarkdownV2')
+    assert markdown.render('reviewing', 'a_b.py', 'en') == (
+        'Homework "a\\_b\\.py" status changed\\. '
+        'The reviewer has started reviewing the homework\\.')
+    html = MessageRenderer(STATUSES, parse_mode='HTML')
+    assert html.render('approved', '<b>&', comment='1 < 2').startswith(
+        'Изменился статус проверки работы "&lt;b&gt;&amp;"')
+    assert html.render('approved', 'x', comment='1 < 2').endswith('1 &lt; 2')
+    with pytest.raises(ValueError):
+        MessageRenderer(STATUSES, parse_mode='BBCode')
+
+
+def test_compile_template_keeps_braces_literal():
+    render = compile_template('{{x}} {name}: {verdict}', verdict='{ok}')
+    assert render('hw') == '{x} hw: {ok}'
+    render = compile_template('{a}-{b}.', escape_markdown_v2)
+    assert render('1', '2') == '1\\-2\\.'
+
+
+def test_render_cache_hits():
+    renderer = MessageRenderer(STATUSES, parse_mode='HTML', cache_size=2)
+    for _ in range(3):
+        renderer.render('approved', 'hw')
+    info = renderer.cache_info()
+    assert (info.hits, info.misses) == (2, 1)
+    renderer.render('approved', 'hw2')
+    renderer.render('approved', 'hw3')
+    assert renderer.cache_info().currsize == 2
+
+
+def test_plain_text_is_rendered_without_cache():
+    renderer = MessageRenderer(STATUSES)
+    assert renderer.render('approved', 'hw') == renderer.render(
+        'approved', 'hw')
+    assert renderer.cache_info() == (0, 0, 0, 0)
+
+
+def test_detect_changes_uses_subscriber_locale(monkeypatch):
+    monkeypatch.setattr(homework, 'MESSAGE_COMMENTS', True)
+    subscriber = Subscriber(1, 'token', 1, locale='en')
+    messages = homework.detect_changes(subscriber, {'homeworks': [{
+        'homework_name': 'hw', 'status': 'approved',
+        'reviewer_comment': 'Nice'}], 'current_date': 1})
+    assert messages == [
+        'Homework "hw" status changed. ' + VERDICTS['en']['approved']
+        + '\nReviewer comment: Nice']
+
+
+def test_registry_stores_locale(tmp_path):
+    path = str(tmp_path / 'subscribers.db')
+    registry = SubscriptionRegistry(path)
+    registry.connection.execute('DROP TABLE subscribers')
+    registry.connection.execute(
+        'CREATE TABLE subscribers (id INTEGER PRIMARY KEY AUTOINCREMENT, '
+        'practicum_token TEXT NOT NULL, chat_id TEXT NOT NULL, '
+        'UNIQUE (practicum_token, chat_id))')
+    registry.connection.execute(
+        "INSERT INTO subscribers (practicum_token, chat_id) VALUES ('t', 1)")
+    registry.connection.commit()
+    registry.close()
+    registry = SubscriptionRegistry(path)
+    registry.add('t', 1, 'en')
+    registry.add('t', 1)
+    registry.add('u', 2)
+    assert [subscriber.locale for subscriber in registry.load()] == [
+        'en', None]
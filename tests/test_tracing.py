@@ -0,0 +1,170 @@
+import asyncio
+import json
+import os
+import time
+
+import pytest
+
+from benchmarks.stub_server import StubServer
+from bot import session
+from bot.profiler import SamplingProfiler
+from bot.subscriptions import Subscriber
+from bot.tracing import NULL_SPAN, TRACER, Tracer, trace
+
+
+class NullBot:
+    def send_message(self, chat_id, text, **kwargs):
+        pass
+
+
+@pytest.fixture
+def tracer(tmp_path):
+    TRACER.start(str(tmp_path / 'trace.json'))
+    TRACER.spans.clear()
+    yield TRACER
+    TRACER.stop()
+    TRACER.path = None
+    TRACER.spans.clear()
+
+
+def by_name(spans):
+    return {span[0]: span for span in spans}
+
+
+def test_disabled_tracer_returns_null_span():
+    tracer = Tracer()
+    assert tracer.span('cycle') is NULL_SPAN
+    tracer.record('phase', 0, 1)
+    assert list(tracer.spans) == []
+
+
+def test_spans_nest_and_record_errors(tmp_path):
+    tracer = Tracer().start(str(tmp_path / 'trace.json'))
+
+    @trace('inner', lambda value: {'value': value}, tracer=tracer)
+    def inner(value):
+        raise ValueError(value)
+
+    with tracer.span('cycle') as root:
+        with pytest.raises(ValueError):
+            inner(1)
+    with tracer.span('next'):
+        pass
+    spans = by_name(tracer.spans)
+    _, trace_id, span_id, parent_id, start, end, _, args = spans['inner']
+    assert (trace_id, parent_id) == (root.span_id, root.span_id)
+    assert args == {'value': 1, 'error': 'ValueError'}
+    assert spans['cycle'][3] is None
+    assert spans['next'][1] != root.trace_id
+    assert spans['cycle'][4] <= start <= end <= spans['cycle'][5]
+
+
+def test_async_spans_follow_tasks(tmp_path):
+    tracer = Tracer().start(str(tmp_path / 'trace.json'))
+
+    @trace('cycle', lambda key: {'subscriber': key}, tracer=tracer)
+    async def cycle(key):
+        with tracer.span('request'):
+            await asyncio.sleep(0.01)
+
+    async def run():
+        await asyncio.gather(cycle('a'), cycle('b'))
+
+    asyncio.run(run())
+    roots = {
+        span[2]: span[7]['subscriber'] for span in tracer.spans
+        if span[0] == 'cycle'}
+    children = {
+        span[3] for span in tracer.spans if span[0] == 'request'}
+    assert children == set(roots)
+
+
+@pytest.mark.parametrize('format', ['chrome', 'otlp'])
+def test_flush_writes_trace_file(tmp_path, format):
+    path = tmp_path / 'trace.json'
+    tracer = Tracer().start(str(path), format)
+    with tracer.span('cycle', subscriber='s1'):
+        with tracer.span('get_api_answer'):
+            pass
+    tracer.stop()
+    document = json.loads(path.read_text())
+    if format == 'chrome':
+        events = {event['name']: event for event in document['traceEvents']}
+        assert events['cycle']['ph'] == 'X'
+        assert events['cycle']['args']['subscriber'] == 's1'
+        assert events['get_api_answer']['args']['parent_id'] == (
+            events['cycle']['args']['span_id'])
+    else:
+        spans = {
+            span['name']: span for span in
+            document['resourceSpans'][0]['scopeSpans'][0]['spans']}
+        assert spans['cycle']['parentSpanId'] == ''
+        assert spans['get_api_answer']['parentSpanId'] == (
+            spans['cycle']['spanId'])
+        assert spans['cycle']['traceId'] == spans['get_api_answer']['traceId']
+        assert spans['cycle']['attributes'] == [
+            {'key': 'subscriber', 'value': {'stringValue': 's1'}}]
+    with pytest.raises(ValueError):
+        Tracer().start(str(path), 'zipkin')
+
+
+def test_poll_cycle_trace_has_http_phases(tracer, monkeypatch):
+    import homework
+
+    pooled = session.install(pool_size=2, connect_timeout=1, read_timeout=1)
+    homeworks = [{'homework_name': 'hw1', 'status': 'approved'}]
+    try:
+        with StubServer(homeworks=homeworks) as server:
+            monkeypatch.setattr(homework, 'ENDPOINT', server.endpoint)
+            subscriber = Subscriber(1, 'token', 42, current_timestamp=7)
+            homework.poll_subscriber(NullBot(), subscriber)
+    finally:
+        pooled.close()
+        session._shared = None
+    spans = by_name(tracer.spans)
+    root = spans['poll_cycle']
+    assert root[3] is None and root[7] == {'subscriber': subscriber.key}
+    for name in (
+            'get_api_answer', 'http.request', 'http.dns', 'http.tcp',
+            'http.connect', 'http.send', 'http.wait', 'http.body',
+            'json.decode', 'check_response', 'parse_status',
+            'send_message'):
+        assert spans[name][1] == root[1], name
+    assert spans['http.dns'][3] == spans['http.connect'][2]
+    assert spans['http.connect'][3] == spans['http.send'][2]
+    assert spans['http.send'][3] == spans['http.wait'][3]
+    assert spans['http.request'][3] == spans['get_api_answer'][2]
+
+
+def test_profiler_writes_collapsed_stacks(tmp_path):
+    profiler = SamplingProfiler(
+        interval=0.001, path_template=str(tmp_path / 'profile-{pid}.folded'))
+    profiler.toggle()
+    deadline = time.perf_counter() + 0.2
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+    profiler.toggle()
+    profiler.join(timeout=5)
+    path = tmp_path / f'profile-{os.getpid()}.folded'
+    lines = path.read_text().splitlines()
+    assert profiler.samples > 0
+    assert any(
+        line.startswith('MainThread;') and 'test_profiler_writes' in line
+        for line in lines)
+    stack, count = lines[0].rsplit(' ', 1)
+    assert int(count) >= 1
+
+
+def test_async_client_records_connection_phases(tracer):
+    from bot.aio import AsyncClient
+
+    with StubServer() as server:
+        async def run():
+            async with AsyncClient('bot-token') as client:
+                await client.get_api_answer(server.endpoint, 1, 'token')
+
+        asyncio.run(run())
+    spans = by_name(tracer.spans)
+    answer = spans['get_api_answer']
+    for name in ('http.request', 'http.connect'):
+        assert spans[name][3] == answer[2], name
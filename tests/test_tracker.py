@@ -0,0 +1,49 @@
+from bot.subscriptions import Subscriber
+from bot.tracker import HomeworkStateIndex
+
+
+def test_every_transition_in_batch_is_reported():
+    index = HomeworkStateIndex()
+    batch = [
+        {'id': 2, 'homework_name': 'hw2', 'status': 'approved'},
+        {'id': 1, 'homework_name': 'hw1', 'status': 'rejected'},
+    ]
+    changed = index.diff(batch)
+    assert [homework['id'] for homework in changed] == [1, 2], (
+        'Все изменения должны возвращаться от старых к новым'
+    )
+    assert index.diff(list(reversed(batch))) == [], (
+        'Смена порядка работ в ответе не должна давать уведомлений'
+    )
+
+
+def test_first_reviewing_is_reported():
+    index = HomeworkStateIndex()
+    homeworks = [{'homework_name': 'hw', 'status': 'reviewing'}]
+    assert index.diff(homeworks) == homeworks, (
+        'Взятие новой работы на проверку не должно теряться'
+    )
+    assert index.get('hw') == 'reviewing'
+    assert index.diff(homeworks) == []
+
+
+def test_seeded_status_is_not_reported_again():
+    index = HomeworkStateIndex()
+    homeworks = [{'id': 7, 'homework_name': 'hw', 'status': 'approved'}]
+    assert index.missing(homeworks) == ['7']
+    index.seed({'7': ('approved', 'hw')})
+    assert index.missing(homeworks) == []
+    assert index.diff(homeworks) == []
+
+
+def test_detect_changes_returns_message_per_transition():
+    import homework
+
+    subscriber = Subscriber(1, 'token', 1)
+    response = {'homeworks': [
+        {'id': index, 'homework_name': f'hw{index}', 'status': 'approved'}
+        for index in range(3)
+    ], 'current_date': 100}
+    messages = homework.detect_changes(subscriber, response)
+    assert len(messages) == 3
+    assert homework.detect_changes(subscriber, response) == []
@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+from bot import validation
+from bot.exceptions import EmptyDictionaryOrListError, UndocumentedStatusError
+from bot.validation import HomeworkValidator
+
+validate = HomeworkValidator(['approved', 'reviewing', 'rejected'])
+
+
+def response(*homeworks):
+    return {'homeworks': list(homeworks), 'current_date': 1}
+
+
+@pytest.mark.parametrize('bad_response, error', [
+    ([], EmptyDictionaryOrListError),
+    ({'current_date': 1}, EmptyDictionaryOrListError),
+    ({'homeworks': {}, 'current_date': 1}, EmptyDictionaryOrListError),
+    ({'homeworks': []}, EmptyDictionaryOrListError),
+    (response('hw'), EmptyDictionaryOrListError),
+    (response({'homework_name': 'hw', 'status': 'unknown'}),
+     UndocumentedStatusError),
+    (response({'homework_name': 'hw'}), UndocumentedStatusError),
+    (response({'status': 'approved'}), UndocumentedStatusError),
+    (response({'homework_name': None, 'status': 'approved'}),
+     UndocumentedStatusError),
+])
+def test_invalid_responses_raise_existing_errors(bad_response, error):
+    with pytest.raises(error):
+        validate(bad_response)
+
+
+def test_whole_list_is_validated():
+    homeworks = [
+        {'homework_name': f'hw{index}', 'status': 'approved'}
+        for index in range(1000)
+    ]
+    assert validate(response(*homeworks)) == homeworks
+    homeworks[-1]['status'] = 'lost'
+    with pytest.raises(UndocumentedStatusError, match='lost'):
+        validate(response(*homeworks))
+
+
+def test_decoding_falls_back_to_stdlib(monkeypatch):
+    monkeypatch.setattr(validation, 'orjson', None)
+
+    class Response:
+        content = b'{"homeworks": [], "current_date": 1}'
+
+        def json(self):
+            return json.loads(self.content)
+
+    assert validation.decode_response(Response()) == response()
+    assert validation.loads(Response.content) == response()